@@ -4,9 +4,60 @@ Integrates report generation into admin dashboard
 """
 
 import streamlit as st
-import pandas as pd
-from bson import ObjectId
+from datetime import datetime
 from db_client import get_db
+from dashboard_cache import get_dashboard_snapshot
+from doc_cache import get_document_cache
+from session_model import report_cache
+
+def queue_report(cfg, survey_doc) -> bool:
+    """Enqueue a report job for the survey; False when [REPORT_QUEUE] mode is inline"""
+    if cfg.report_queue.mode != "queue":
+        return False
+    from report_jobs import enqueue_report_job
+    enqueue_report_job(survey_doc["_id"], st.session_state.get("current_user"))
+    st.session_state["report_doc_id"] = str(survey_doc["_id"])
+    return True
+
+# Default for render_report_job_status: look the job up (None means "no job")
+FETCH_JOB = object()
+
+def render_report_job_status(cfg, col, survey_doc, job=FETCH_JOB):
+    """Show the survey's latest report job; load a finished report into the shared cache"""
+    if cfg.report_queue.mode != "queue":
+        return
+    from report_jobs import get_latest_job
+    
+    doc_id = str(survey_doc["_id"])
+    if job is FETCH_JOB:
+        job = get_latest_job(survey_doc["_id"])
+    if job is None:
+        return
+    
+    if job["status"] in ("queued", "running"):
+        since = job.get("started_at") if job["status"] == "running" else job.get("created_at")
+        elapsed = f" for {(datetime.utcnow() - since).total_seconds():.0f}s" if since else ""
+        st.info(f"⏳ Report {job['status']}{elapsed} (attempt {max(job.get('attempts', 0), 1)}). "
+                "You can leave this page; the report is saved to the survey when done.")
+        st.button("🔄 Refresh status", key=f"refresh_report_job_{doc_id}")
+    elif job["status"] == "failed":
+        st.error(f"Report generation failed after {job.get('attempts', 0)} attempt(s): {job.get('error', 'unknown error')}")
+    elif job["status"] == "done":
+        loaded_key = f"report_job_loaded_{doc_id}"
+        if st.session_state.get(loaded_key) != str(job["_id"]) or report_cache.get(doc_id) is None:
+            # The worker stored the sections on the survey; only that field is fetched
+            stored = col.find_one({"_id": survey_doc["_id"]}, {"report.sections": 1})
+            sections = ((stored or {}).get("report") or {}).get("sections")
+            if sections:
+                # The cached copy of the survey predates the worker's report
+                get_document_cache(cfg).invalidate(survey_doc["_id"])
+                from report_generator import format_report_as_markdown
+                report_cache.put(doc_id, format_report_as_markdown(sections, survey_doc))
+                st.session_state[loaded_key] = str(job["_id"])
+        if st.session_state.get("report_doc_id") == doc_id:
+            actions = (job.get("result") or {}).get("actions", {})
+            reused = sum(1 for action in actions.values() if action == "reuse")
+            st.success(f"✅ Report generated! ({reused} of {len(actions) or 4} sections reused)")
 
 def render_generate_report_tab(cfg):
     """Render the Generate Report tab in admin dashboard"""
@@ -17,49 +68,53 @@ def render_generate_report_tab(cfg):
         if db is None:
             st.error("MongoDB not connected.")
         else:
-            col = db[cfg["MONGO"]["collection_name"]]
-            rows = list(col.find().sort("_id", -1).limit(50))
+            col = db[cfg.mongo.collection]
+            # Summaries come from the shared dashboard snapshot; only the selected survey is loaded in full
+            snapshot = get_dashboard_snapshot(cfg)
+            rows = snapshot.rows(limit=50)
             
             if not rows:
                 st.info("No survey records found.")
             else:
-                # Create dataframe for selection
-                df = pd.DataFrame([
-                    {
-                        "id": str(r.get("_id")),
-                        "org": (r.get("org") or {}).get("name", ""),
-                        "submitted_by": r.get("submitted_by", ""),
-                        "status": r.get("status", ""),
-                        "created_at": r.get("created_at", "")
-                    }
-                    for r in rows
-                ])
+                # Labels and ids are built once per rerun, so format_func is a dict lookup
+                ids = {str(r["_id"]): r["_id"] for r in rows}
+                labels = {str(r["_id"]): f"{r['org'] or ''} - {r['created_at'] or ''}" for r in rows}
                 
                 st.write("Select a survey to generate assessment report:")
                 selected_id = st.selectbox(
                     "Survey Record", 
-                    options=df["id"].tolist(),
-                    format_func=lambda x: f"{df[df['id']==x]['org'].values[0]} - {df[df['id']==x]['created_at'].values[0]}"
+                    options=list(labels),
+                    format_func=labels.get
                 )
                 
                 if selected_id:
-                    selected_doc = col.find_one({"_id": ObjectId(selected_id)})
+                    documents = get_document_cache(cfg)
+                    selected_doc = documents.get(ids[selected_id])
+                    if selected_doc is None:
+                        snapshot.remove(ids[selected_id])
+                        st.warning("The selected survey was deleted; refresh to update the list.")
+                        return
                     
                     col1, col2 = st.columns(2)
                     with col1:
                         if st.button("Generate Full Report", key="gen_report"):
                             try:
+                                if queue_report(cfg, selected_doc):
+                                    st.rerun()
                                 with st.spinner("Generating comprehensive report using AI... This may take 1-2 minutes."):
-                                    from report_generator import generate_full_report, format_report_as_markdown
+                                    from report_generator import regenerate_report, format_report_as_markdown
                                     
-                                    # Generate all report sections
-                                    report_sections = generate_full_report(selected_doc)
+                                    # Generate report sections, reusing those whose inputs are unchanged
+                                    report_sections, report_record = regenerate_report(selected_doc)
+                                    col.update_one({"_id": selected_doc["_id"]},
+                                                  {"$set": {"report": report_record, "updated_at": datetime.utcnow()}})
+                                    documents.invalidate(selected_doc["_id"])
                                     
                                     # Format as markdown
                                     markdown_report = format_report_as_markdown(report_sections, selected_doc)
                                     
-                                    # Save to session state
-                                    st.session_state["generated_report"] = markdown_report
+                                    # Save to the shared report cache; the session only keeps the id
+                                    report_cache.put(selected_id, markdown_report)
                                     st.session_state["report_doc_id"] = selected_id
                                     
                                     st.success("Report generated successfully!")
@@ -71,10 +126,13 @@ def render_generate_report_tab(cfg):
                         if st.button("Preview Survey Data", key="preview_data"):
                             st.json(selected_doc)
                     
+                    render_report_job_status(cfg, col, selected_doc)
+                    
                     # Display generated report if available
-                    if st.session_state.get("generated_report") and st.session_state.get("report_doc_id") == selected_id:
+                    generated_report = report_cache.get(selected_id)
+                    if generated_report and st.session_state.get("report_doc_id") == selected_id:
                         st.markdown("---")
-                        st.markdown(st.session_state["generated_report"])
+                        st.markdown(generated_report)
                         
                         # Export options
                         col1, col2 = st.columns(2)
@@ -82,7 +140,7 @@ def render_generate_report_tab(cfg):
                             if st.button("Download as Markdown", key="dl_md"):
                                 st.download_button(
                                     label="Download Markdown",
-                                    data=st.session_state["generated_report"],
+                                    data=generated_report,
                                     file_name=f"assessment_report_{selected_id[:8]}.md",
                                     mime="text/markdown"
                                 )
@@ -96,7 +154,7 @@ def render_generate_report_tab(cfg):
                                     with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
                                         pdf_path = tmp.name
                                     
-                                    if export_report_to_pdf(st.session_state["generated_report"], pdf_path):
+                                    if export_report_to_pdf(generated_report, pdf_path):
                                         with open(pdf_path, "rb") as f:
                                             st.download_button(
                                                 label="Download PDF",
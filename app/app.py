@@ -6,13 +6,11 @@ Version: 2.2 (Fixed)
 """
 
 import streamlit as st
-import configparser
 import json
 import time
 from datetime import datetime
 import os
 import sys
-import pandas as pd
 
 # Load environment variables - handle gracefully if dotenv not available
 try:
@@ -23,7 +21,14 @@ except ImportError:
     # (useful for cloud deployments like Streamlit Cloud)
     pass
 
-from dynamic_questions_enhanced import generate_tooltip
+from app_config import AppConfig, get_config
+from db_client import get_collection
+from question_catalog import AI_GENAI_QUESTIONS, get_current_catalog, register_catalog
+from survey_schema import encode_answers, decode_answers
+from session_model import (get_survey_state, restore_session, persist_session, clear_session,
+                           report_cache, track_session_memory, get_memory_report)
+from report_jobs import start_embedded_workers
+from render_profiler import profiled, profile_block, profile_rerun, set_page, render_profiler_panel
 
 # Configure Streamlit
 st.set_page_config(
@@ -45,37 +50,11 @@ def init_session_state():
     if "user_type" not in st.session_state:
         st.session_state["user_type"] = None  # "user" or "admin"
     
-    if "current_step" not in st.session_state:
-        st.session_state["current_step"] = 0
-    
-    if "user_role" not in st.session_state:
-        st.session_state["user_role"] = None
-    
-    if "survey_started" not in st.session_state:
-        st.session_state["survey_started"] = False
-    
-    if "step1_complete" not in st.session_state:
-        st.session_state["step1_complete"] = False
-    
-    if "step2_complete" not in st.session_state:
-        st.session_state["step2_complete"] = False
-    
-    if "step3_complete" not in st.session_state:
-        st.session_state["step3_complete"] = False
-    
-    if "step1_answers" not in st.session_state:
-        st.session_state["step1_answers"] = {}
-    
-    if "step3_answers" not in st.session_state:
-        st.session_state["step3_answers"] = {}
-
-    if "section2_answers" not in st.session_state:
-        st.session_state["section2_answers"] = []
-    
-    if "section2_questions" not in st.session_state:
-        st.session_state["section2_questions"] = []
+    # Survey progress lives in one compact SurveyState object
+    get_survey_state()
 
 # Login Page
+@profiled()
 def render_login_page():
     """Render login page"""
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -108,31 +87,19 @@ def render_login_page():
                     st.error("❌ Invalid User ID or Password")
 
 # Load configuration
+@profiled()
 def load_config():
-    """Load configuration from config.ini"""
+    """Get the process-wide configuration (parsed once, reloaded when config.ini changes)"""
     try:
-        cfg = configparser.ConfigParser()
-        
-        # Try multiple possible locations
-        config_paths = [
-            "config.ini",
-            "./config.ini",
-            "../config.ini",
-            "config/config.ini"
-        ]
-        
-        for path in config_paths:
-            if os.path.exists(path):
-                cfg.read(path)
-                st.session_state["config_loaded"] = True
-                return cfg
-        
-        # If no config found, create a default one
-        st.warning("⚠️ config.ini not found. Using default configuration.")
+        cfg = get_config()
+        if cfg.path:
+            st.session_state["config_loaded"] = True
+        else:
+            st.warning("⚠️ config.ini not found. Using default configuration.")
         return cfg
     except Exception as e:
         st.error(f"Error loading config: {str(e)}")
-        return configparser.ConfigParser()
+        return AppConfig()
 
 # Load questions from config.ini
 def load_questions_from_config(cfg):
@@ -182,6 +149,7 @@ def load_questions_from_json():
         return []
 
 # Load questions - try both methods
+@profiled()
 def load_questions(cfg):
     """Load questions from config or JSON file"""
     # First try config.ini
@@ -193,8 +161,112 @@ def load_questions(cfg):
     
     return questions
 
+# Input mode for Step 1 / Step 3 ("single" page of live widgets or "paged" forms)
+def get_input_mode(cfg):
+    """Get the configured questionnaire input mode"""
+    return cfg.app.input_mode
+
+def group_questions_by_category(questions):
+    """Group questions into pages by category, preserving question order"""
+    pages = []
+    for q in questions:
+        category = q.get("category") or "General"
+        if not pages or pages[-1][0] != category:
+            pages.append((category, []))
+        pages[-1][1].append(q)
+    return pages
+
+def render_paged_form(step_key, questions, answers, text_height=80):
+    """Render one category page of questions inside a form.
+
+    Widgets inside st.form do not trigger reruns, so the script only reruns
+    when a page is submitted. Returns True once the last page is submitted
+    with all of its required questions answered.
+    """
+    pages = group_questions_by_category(questions)
+    state = get_survey_state()
+    page_attr = f"{step_key}_page"
+    page_idx = min(getattr(state, page_attr), len(pages) - 1)
+    category, page_questions = pages[page_idx]
+    is_last_page = page_idx == len(pages) - 1
+
+    answered = len([q for q in questions if str(answers.get(q.get("id"), "")).strip()])
+    st.progress(answered / len(questions), text=f"Page {page_idx + 1} of {len(pages)} · {answered} of {len(questions)} answered")
+
+    values = {}
+    with st.form(key=f"{step_key}_form_{page_idx}"):
+        st.markdown(f"### 📋 {category}")
+
+        for q in page_questions:
+            q_id = q.get("id")
+            q_num = q.get("num") or questions.index(q) + 1
+            required_indicator = " *" if q.get("required", False) else ""
+            st.markdown(f"**Q{q_num}. {q.get('text', 'Question not found')}**{required_indicator}")
+
+            options = q.get("options", [])
+            if q.get("type") == "multiple_choice" and options:
+                previous = answers.get(q_id)
+                values[q_id] = st.radio(
+                    label=f"Select answer for {q_id}",
+                    options=options,
+                    index=options.index(previous) if previous in options else 0,
+                    key=f"{step_key}_{q_id}",
+                    label_visibility="collapsed"
+                )
+            else:
+                values[q_id] = st.text_area(
+                    label=f"Answer for {q_id}",
+                    value=answers.get(q_id, ""),
+                    key=f"{step_key}_{q_id}",
+                    height=text_height,
+                    placeholder="Provide a detailed answer...",
+                    label_visibility="collapsed"
+                )
+            st.divider()
+
+        col1, col2, col3 = st.columns([0.2, 0.6, 0.2])
+        with col1:
+            go_back = st.form_submit_button("← Previous page", disabled=page_idx == 0, use_container_width=True)
+        with col3:
+            go_next = st.form_submit_button(
+                "Complete →" if is_last_page else "Next page →",
+                type="primary",
+                use_container_width=True
+            )
+
+    if not (go_back or go_next):
+        return False
+
+    # Commit the whole page at once
+    for q_id, value in values.items():
+        if str(value).strip():
+            answers[q_id] = value
+        else:
+            answers.pop(q_id, None)
+
+    if go_back:
+        setattr(state, page_attr, page_idx - 1)
+        st.rerun()
+
+    missing_required = [
+        q for q in page_questions
+        if q.get("required", False) and not str(answers.get(q.get("id"), "")).strip()
+    ]
+    if missing_required:
+        st.error("Please answer all required questions on this page before proceeding.")
+        for q in missing_required:
+            st.warning(f"Required: {q.get('text', q.get('id'))}")
+        return False
+
+    if is_last_page:
+        return True
+
+    setattr(state, page_attr, page_idx + 1)
+    st.rerun()
+
 # Render Step 1: Fixed Questions
-def render_step1(questions):
+@profiled()
+def render_step1(questions, input_mode="single"):
     """Render Step 1: Fixed Questions"""
     st.subheader("Step 1: Baseline Assessment")
     st.info("Answer the following fixed questions about your current state.")
@@ -208,6 +280,15 @@ def render_step1(questions):
     
     st.write(f"📋 Total questions: {len(questions)}")
     st.divider()
+
+    state = get_survey_state()
+
+    if input_mode == "paged":
+        if render_paged_form("step1", questions, state.step1_answers):
+            state.step1_complete = True
+            state.current_step = 1
+            st.rerun()
+        return True
     
     for i, q in enumerate(questions, 1):
         q_id = q.get("id", f"Q{i}")
@@ -222,7 +303,7 @@ def render_step1(questions):
         if q_type == "multiple_choice":
             options = q.get("options", [])
             if options:
-                st.session_state["step1_answers"][q_id] = st.radio(
+                state.step1_answers[q_id] = st.radio(
                     label=f"Select answer for {q_id}",
                     options=options,
                     key=f"step1_{q_id}",
@@ -232,7 +313,7 @@ def render_step1(questions):
                 st.warning(f"No options provided for {q_id}")
         else:
             # Text input
-            st.session_state["step1_answers"][q_id] = st.text_area(
+            state.step1_answers[q_id] = st.text_area(
                 label=f"Enter answer for {q_id}",
                 key=f"step1_{q_id}",
                 height=80,
@@ -250,7 +331,7 @@ def render_step1(questions):
             for q in questions:
                 if q.get("required", False):
                     q_id = q.get("id", "")
-                    if not st.session_state["step1_answers"].get(q_id, "").strip():
+                    if not state.step1_answers.get(q_id, "").strip():
                         missing_required.append(q.get("text", q_id))
 
             if missing_required:
@@ -258,18 +339,19 @@ def render_step1(questions):
                 for text in missing_required:
                     st.warning(f"Required: {text}")
             else:
-                st.session_state["step1_complete"] = True
-                st.session_state["current_step"] = 1
+                state.step1_complete = True
+                state.current_step = 1
                 st.rerun()
     
     return True
 
 # Render Step 2: Dynamic Questions with Tooltips
+@profiled()
 def render_step2(cfg):
     """Render Step 2: Dynamic Questions with Tooltips"""
     try:
         from step2_dynamic_ui_enhanced import render_step2_dynamic_questions_enhanced
-        render_step2_dynamic_questions_enhanced(cfg, st.session_state.get("user_role"))
+        render_step2_dynamic_questions_enhanced(cfg, get_survey_state().user_role)
     except ImportError as e:
         st.error(f"❌ Dynamic questions module not found: {str(e)}")
         st.info("Please ensure `step2_dynamic_ui_enhanced.py` is in the app directory.")
@@ -278,6 +360,7 @@ def render_step2(cfg):
         st.info("Please check the logs for more details.")
 
 # Render Step 3: AI/GenAI Questions
+@profiled()
 def render_step3_ai_genai(cfg):
     """Render Step 3: AI/GenAI Discovery Questions"""
     st.subheader("Step 3: AI/GenAI Discovery Questions")
@@ -287,119 +370,23 @@ def render_step3_ai_genai(cfg):
     """)
     
     # AI/GenAI Questions organized by category
-    ai_questions = [
-        # Infrastructure (1-5)
-        {
-            "id": "AI_Q1",
-            "num": 1,
-            "category": "INFRASTRUCTURE",
-            "text": "What GPU and computing infrastructure do you currently have available, and is it sufficient to support GenAI model training and inference?",
-            "required": True
-        },
-        {
-            "id": "AI_Q2",
-            "num": 2,
-            "category": "INFRASTRUCTURE",
-            "text": "Do you have access to commercial LLMs (OpenAI, Azure OpenAI, Anthropic Claude, Google Gemini) or are you planning to use open-source models (Llama, Mistral, etc.)?",
-            "required": True
-        },
-        {
-            "id": "AI_Q3",
-            "num": 3,
-            "category": "INFRASTRUCTURE",
-            "text": "Which cloud environments (AWS, Azure, GCP) are approved for your organization, and do you have access to AI/ML platforms like AWS SageMaker, Azure AI Foundry, or Google Vertex AI?",
-            "required": True
-        },
-        {
-            "id": "AI_Q4",
-            "num": 4,
-            "category": "INFRASTRUCTURE",
-            "text": "What data storage infrastructure do you have (data lakes, data warehouses, databases), and can it support the data volumes required for GenAI model training and inference?",
-            "required": True
-        },
-        {
-            "id": "AI_Q5",
-            "num": 5,
-            "category": "INFRASTRUCTURE",
-            "text": "Do you have monitoring, logging, and observability infrastructure in place to support AI/GenAI model monitoring and governance?",
-            "required": True
-        },
-        # Governance & Approvals (6-10)
-        {
-            "id": "AI_Q6",
-            "num": 6,
-            "category": "GOVERNANCE & APPROVALS",
-            "text": "Does your organization have an AI Council, AI Governance Board, or similar body that reviews and approves AI/GenAI projects before they start?",
-            "required": True
-        },
-        {
-            "id": "AI_Q7",
-            "num": 7,
-            "category": "GOVERNANCE & APPROVALS",
-            "text": "Before starting an AI/GenAI project, do we need to get approval from the Security team, Compliance team, or other governance bodies? What's the typical lead time?",
-            "required": True
-        },
-        {
-            "id": "AI_Q8",
-            "num": 8,
-            "category": "GOVERNANCE & APPROVALS",
-            "text": "What data privacy and regulatory compliance requirements apply to AI/GenAI projects, especially regarding data usage, model transparency, and audit trails?",
-            "required": True
-        },
-        {
-            "id": "AI_Q9",
-            "num": 9,
-            "category": "GOVERNANCE & APPROVALS",
-            "text": "Does your organization have an AI Ethics framework or Responsible AI guidelines that AI/GenAI projects must follow?",
-            "required": True
-        },
-        {
-            "id": "AI_Q10",
-            "num": 10,
-            "category": "GOVERNANCE & APPROVALS",
-            "text": "What change management and organizational approval processes are required before deploying AI/GenAI solutions to production?",
-            "required": True
-        },
-        # Frameworks & Standards (11-15)
-        {
-            "id": "AI_Q11",
-            "num": 11,
-            "category": "FRAMEWORKS & STANDARDS",
-            "text": "Is there a common framework or standard that needs to be adopted to build GenAI applications, or can we write our own framework?",
-            "required": True
-        },
-        {
-            "id": "AI_Q12",
-            "num": 12,
-            "category": "FRAMEWORKS & STANDARDS",
-            "text": "Do you have a model registry or model management system in place, and what are the requirements for model versioning, documentation, and governance?",
-            "required": True
-        },
-        {
-            "id": "AI_Q13",
-            "num": 13,
-            "category": "FRAMEWORKS & STANDARDS",
-            "text": "What testing, validation, and quality assurance standards apply to AI/GenAI models before they're deployed to production?",
-            "required": True
-        },
-        {
-            "id": "AI_Q14",
-            "num": 14,
-            "category": "FRAMEWORKS & STANDARDS",
-            "text": "What documentation and audit trail requirements apply to AI/GenAI projects, especially for regulatory compliance and internal governance?",
-            "required": True
-        },
-        {
-            "id": "AI_Q15",
-            "num": 15,
-            "category": "FRAMEWORKS & STANDARDS",
-            "text": "How should AI/GenAI projects integrate with your existing development, testing, and deployment processes (CI/CD, DevOps)?",
-            "required": True
-        }
-    ]
+    ai_questions = AI_GENAI_QUESTIONS
+    state = get_survey_state()
+
+    if get_input_mode(cfg) == "paged":
+        if render_paged_form("step3", ai_questions, state.step3_answers, text_height=100):
+            state.step3_complete = True
+            state.current_step = 3
+            st.success("✅ Step 3 completed!")
+            st.rerun()
+
+        if st.button("← Back to Step 2"):
+            state.current_step = 1
+            st.rerun()
+        return
     
     # Progress bar
-    current_category_count = len([q for q in ai_questions if q.get("id") in st.session_state["step3_answers"]])
+    current_category_count = len([q for q in ai_questions if q.get("id") in state.step3_answers])
     progress = current_category_count / len(ai_questions)
     st.progress(progress, text=f"Progress: {current_category_count} of {len(ai_questions)} answered")
     
@@ -427,7 +414,7 @@ def render_step3_ai_genai(cfg):
         # Answer input
         answer = st.text_area(
             label=f"Answer for {q_id}",
-            value=st.session_state["step3_answers"].get(q_id, ""),
+            value=state.step3_answers.get(q_id, ""),
             key=f"step3_{q_id}",
             height=100,
             placeholder="Provide a detailed answer...",
@@ -436,7 +423,7 @@ def render_step3_ai_genai(cfg):
         
         # Save answer
         if answer:
-            st.session_state["step3_answers"][q_id] = answer
+            state.step3_answers[q_id] = answer
         
         # Validation
         if answer:
@@ -450,7 +437,7 @@ def render_step3_ai_genai(cfg):
     
     with col1:
         if st.button("← Back to Step 2", use_container_width=True):
-            st.session_state["current_step"] = 1
+            state.current_step = 1
             st.rerun()
     
     with col3:
@@ -460,7 +447,7 @@ def render_step3_ai_genai(cfg):
             for question in ai_questions:
                 if question.get("required"):
                     q_id = question.get("id")
-                    if not st.session_state["step3_answers"].get(q_id, "").strip():
+                    if not state.step3_answers.get(q_id, "").strip():
                         missing_answers.append(f"Q{question.get('num')}: {question.get('text')[:50]}...")
             
             if missing_answers:
@@ -468,15 +455,17 @@ def render_step3_ai_genai(cfg):
                 for ans in missing_answers:
                     st.warning(f"Missing: {ans}")
             else:
-                st.session_state["step3_complete"] = True
-                st.session_state["current_step"] = 3
+                state.step3_complete = True
+                state.current_step = 3
                 st.success("✅ Step 3 completed!")
                 st.rerun()
 
 # Render Step 4: Summary and Submit
+@profiled()
 def render_step4(cfg):
     """Render Step 4: Summary and Submit"""
     st.subheader("Step 4: Review & Submit")
+    state = get_survey_state()
     
     # Only show summary to admin users
     if st.session_state.get("user_type") == "admin":
@@ -484,8 +473,8 @@ def render_step4(cfg):
         
         with col1:
             st.markdown("### Step 1: Fixed Questions")
-            if "step1_answers" in st.session_state and st.session_state["step1_answers"]:
-                for i, (q_id, answer) in enumerate(st.session_state["step1_answers"].items(), 1):
+            if state.step1_answers:
+                for i, (q_id, answer) in enumerate(state.step1_answers.items(), 1):
                     st.write(f"**Q{i}:** {q_id}")
                     st.write(f"**A:** {answer}")
                     st.divider()
@@ -494,10 +483,10 @@ def render_step4(cfg):
         
         with col2:
             st.markdown("### Step 2: Open-Ended Questions")
-            if "section2_answers" in st.session_state and st.session_state["section2_answers"]:
-                for i, answer in enumerate(st.session_state["section2_answers"], 1):
-                    st.write(f"**Q{i}:** {st.session_state['section2_questions'][i-1] if i <= len(st.session_state['section2_questions']) else f'Question {i}'}")
-                    st.write(f"**A:** {answer}")
+            if state.section2_answers:
+                for i, item in enumerate(state.section2_history, 1):
+                    st.write(f"**Q{i}:** {item['question']}")
+                    st.write(f"**A:** {item['answer']}")
                     st.divider()
             else:
                 st.info("No answers from Step 2")
@@ -513,7 +502,7 @@ def render_step4(cfg):
             save_survey_response(cfg)
             st.success("✅ Survey submitted successfully!")
             st.balloons()
-            st.session_state["survey_complete"] = True
+            state.survey_complete = True
         except Exception as e:
             st.error(f"Error submitting survey: {str(e)}")
 
@@ -521,409 +510,495 @@ def render_step4(cfg):
 def save_survey_response(cfg):
     """Save survey response to MongoDB"""
     try:
-        from pymongo import MongoClient
-        
-        # Get MongoDB connection string from config
-        mongo_uri = cfg.get("MONGODB", "uri", fallback="mongodb://localhost:27017")
-        db_name = cfg.get("MONGODB", "database", fallback="uob_survey")
-        collection_name = cfg.get("MONGODB", "collection", fallback="responses")
-        
-        # Connect to MongoDB
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-        db = client[db_name]
-        collection = db[collection_name]
-        
-        # Load questions to get question text
-        questions = load_questions(cfg)
-        if not questions:
-            questions = load_questions_from_json()
-        
-        question_map = {q.get("id"): q.get("text") for q in questions}
+        # Shared, pooled MongoDB connection
+        collection = get_collection(cfg)
         
-        # Debug: Check if questions loaded
-        if not question_map:
-            st.warning("Warning: Could not load question text mapping. Question IDs will be stored instead.")
+        state = get_survey_state()
         
-        # Format step1 answers with question text
-        step1_with_questions = []
-        for q_id, answer in st.session_state.get("step1_answers", {}).items():
-            step1_with_questions.append({
-                "question_id": q_id,
-                "question_text": question_map.get(q_id, q_id),
-                "answer": answer
-            })
-        
-        # Format step2 answers with questions
-        step2_with_questions = []
-        for i, (question, answer) in enumerate(zip(st.session_state.get("section2_questions", []), st.session_state.get("section2_answers", []))):
-            step2_with_questions.append({
-                "question_num": i + 1,
-                "question_text": question,
-                "answer": answer
-            })
-        
-        # Format step3 (AI/GenAI) answers with question text
-        step3_with_questions = []
-        ai_questions = [
-            {"id": "AI_Q1", "text": "What GPU and computing infrastructure do you currently have available, and is it sufficient to support GenAI model training and inference?"},
-            {"id": "AI_Q2", "text": "Do you have access to commercial LLMs (OpenAI, Azure OpenAI, Anthropic Claude, Google Gemini) or are you planning to use open-source models (Llama, Mistral, etc.)?"},
-            {"id": "AI_Q3", "text": "Which cloud environments (AWS, Azure, GCP) are approved for your organization, and do you have access to AI/ML platforms like AWS SageMaker, Azure AI Foundry, or Google Vertex AI?"},
-            {"id": "AI_Q4", "text": "What data storage infrastructure do you have (data lakes, data warehouses, databases), and can it support the data volumes required for GenAI model training and inference?"},
-            {"id": "AI_Q5", "text": "Do you have monitoring, logging, and observability infrastructure in place to support AI/GenAI model monitoring and governance?"},
-            {"id": "AI_Q6", "text": "Does your organization have an AI Council, AI Governance Board, or similar body that reviews and approves AI/GenAI projects before they start?"},
-            {"id": "AI_Q7", "text": "Before starting an AI/GenAI project, do we need to get approval from the Security team, Compliance team, or other governance bodies? What's the typical lead time?"},
-            {"id": "AI_Q8", "text": "What data privacy and regulatory compliance requirements apply to AI/GenAI projects, especially regarding data usage, model transparency, and audit trails?"},
-            {"id": "AI_Q9", "text": "Does your organization have an AI Ethics framework or Responsible AI guidelines that AI/GenAI projects must follow?"},
-            {"id": "AI_Q10", "text": "What change management and organizational approval processes are required before deploying AI/GenAI solutions to production?"},
-            {"id": "AI_Q11", "text": "Is there a common framework or standard that needs to be adopted to build GenAI applications, or can we write our own framework?"},
-            {"id": "AI_Q12", "text": "Do you have a model registry or model management system in place, and what are the requirements for model versioning, documentation, and governance?"},
-            {"id": "AI_Q13", "text": "What testing, validation, and quality assurance standards apply to AI/GenAI models before they're deployed to production?"},
-            {"id": "AI_Q14", "text": "What documentation and audit trail requirements apply to AI/GenAI projects, especially for regulatory compliance and internal governance?"},
-            {"id": "AI_Q15", "text": "How should AI/GenAI projects integrate with your existing development, testing, and deployment processes (CI/CD, DevOps)?"}
-        ]
-        ai_q_map = {q.get("id"): q.get("text") for q in ai_questions}
-        
-        for q_id, answer in st.session_state.get("step3_answers", {}).items():
-            step3_with_questions.append({
-                "question_id": q_id,
-                "question_text": ai_q_map.get(q_id, q_id),
-                "answer": answer
-            })
+        # Fixed questions are stored by id against the catalog version the respondent saw
+        catalog = get_current_catalog()
+        if not catalog.step1:
+            st.warning("Warning: Could not load question text mapping. Question IDs will be shown instead.")
+        register_catalog(catalog)
         
         # Prepare document
         document = {
             "timestamp": datetime.now(),
-            "user_role": st.session_state.get("user_role"),
-            "step1_answers": step1_with_questions,
-            "step2_answers": step2_with_questions,
-            "step3_answers": step3_with_questions
+            "updated_at": datetime.utcnow(),
+            "user_role": state.user_role,
+            **encode_answers(
+                catalog,
+                state.step1_answers,
+                zip(state.section2_questions, state.section2_answers),
+                state.step3_answers,
+            ),
+            "client_metrics": {
+                "input_mode": get_input_mode(cfg),
+                "step2_mode": cfg.followups.mode,
+                "step2_llm_calls": state.section2_llm_calls,
+                "step2_replans": state.section2_replans,
+                "reruns_by_step": dict(state.survey_reruns),
+                "total_reruns": sum(state.survey_reruns.values())
+            }
         }
         
+        # Numeric scores are computed once here so dashboards never re-read answer text
+        try:
+            from survey_metrics import score_survey
+            document["metrics"] = score_survey(document, catalog)
+        except Exception as e:
+            print(f"Survey scoring failed (backfill later with app/survey_metrics.py): {e}")
+        
         # Insert document
         result = collection.insert_one(document)
-        st.session_state["survey_id"] = str(result.inserted_id)
-        
-        client.close()
+        state.survey_id = str(result.inserted_id)
     except Exception as e:
         st.warning(f"Could not save to MongoDB: {str(e)}")
         st.info("Survey data saved in session memory. MongoDB is optional.")
 
+def schedule_dashboard_refresh(seconds: float):
+    """Have the browser rerun the page after `seconds`; the script thread never waits for it"""
+    try:
+        from streamlit_autorefresh import st_autorefresh
+    except ImportError:
+        st.caption("Auto-refresh needs the `streamlit-autorefresh` package.")
+        return
+    st_autorefresh(interval=int(seconds * 1000), key="dashboard_refresh_timer")
+
 # Admin Dashboard
+@profiled()
 def render_admin_dashboard(cfg):
     """Render Admin Dashboard"""
+    # pandas is only needed here; keep it off the respondent pages' cold start
+    import pandas as pd
+    from admin_report_ui import FETCH_JOB, queue_report, render_report_job_status
+    from async_db import Query, get_async_data_layer, get_result
+    from dashboard_cache import get_dashboard_snapshot
+    from doc_cache import get_document_cache
+    from report_jobs import JOB_STATUS_PROJECTION, QUEUE_STATS_PIPELINE, queue_stats_from_rows
+    from survey_metrics import PILLARS, cohort_pipeline
+    
     st.subheader("Admin Dashboard")
+    st.toggle(
+        "Auto-refresh", key="dashboard_auto_refresh",
+        help=f"Merge new submissions in every {cfg.dashboard.auto_refresh_seconds:.0f}s"
+    )
+    if st.session_state.get("dashboard_auto_refresh"):
+        schedule_dashboard_refresh(cfg.dashboard.auto_refresh_seconds)
+    
+    # The page's independent reads run concurrently, so it waits for the slowest rather than the sum;
+    # widget values are already in session_state, so the selected survey is fetched here too
+    prefetched_id = st.session_state.get("report_survey_id")
+    queries = {
+        "snapshot": lambda: get_dashboard_snapshot(cfg),
+        "cohorts": Query.aggregate(cfg.mongo.collection, cohort_pipeline()),
+    }
+    if prefetched_id is not None:
+        queries["selected"] = lambda: get_document_cache(cfg).get(prefetched_id)
+    if cfg.report_queue.mode == "queue":
+        queries["queue_stats"] = Query.aggregate(cfg.report_queue.collection, QUEUE_STATS_PIPELINE)
+        if prefetched_id is not None:
+            queries["latest_job"] = Query.find_one(cfg.report_queue.collection, {"survey_id": prefetched_id},
+                                                   JOB_STATUS_PROJECTION, sort=[("created_at", -1)])
+    if st.session_state.get("retention_preview"):
+        from retention import expiry_query
+        retention_days = st.session_state.get("retention_days", cfg.retention.retention_days)
+        queries["expired"] = Query.count(cfg.mongo.collection, expiry_query(retention_days))
+    with profile_block("admin:queries"):
+        page = get_async_data_layer(cfg).gather(queries)
     
     tabs = st.tabs(["Surveys", "Analytics", "Generate Report", "Settings"])
     
     # ===== TAB 1: SURVEYS =====
     with tabs[0]:
-        st.markdown("### Survey Responses")
-        try:
-            from pymongo import MongoClient
-            mongo_uri = cfg.get("MONGODB", "uri", fallback="mongodb://localhost:27017")
-            db_name = cfg.get("MONGODB", "database", fallback="uob_survey")
-            collection_name = cfg.get("MONGODB", "collection", fallback="responses")
-            
-            client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-            db = client[db_name]
-            collection = db[collection_name]
-            
-            total_surveys = collection.count_documents({})
-            st.metric("Total Surveys", total_surveys)
+        with profile_block("admin:surveys"):
+            st.markdown("### Survey Responses")
+            try:
+                # Cached summaries; only documents added since the last refresh are fetched
+                snapshot = get_result(page, "snapshot")
             
-            col1, col2 = st.columns(2)
-            with col1:
-                limit = st.slider("Display limit", 5, 100, 10)
-            with col2:
-                sort_order = st.selectbox("Sort by", ["Newest First", "Oldest First"])
+                col1, col2 = st.columns([1, 3])
+                with col1:
+                    st.metric("Total Surveys", snapshot.count())
+                with col2:
+                    new_count = snapshot.count_newer_than(st.session_state.get("dashboard_seen_id"))
+                    if new_count:
+                        st.success(f"🆕 {new_count} new submission(s) since your last refresh")
+                    latest = snapshot.rows(limit=1)
+                    st.session_state["dashboard_seen_id"] = latest[0]["_id"] if latest else None
             
-            sort_dir = -1 if sort_order == "Newest First" else 1
-            surveys = list(collection.find().sort("created_at", sort_dir).limit(limit))
+                col1, col2 = st.columns(2)
+                with col1:
+                    limit = st.slider("Display limit", 5, 100, 10)
+                with col2:
+                    sort_order = st.selectbox("Sort by", ["Newest First", "Oldest First"])
             
-            if surveys:
-                table_data = []
-                for survey in surveys:
-                    table_data.append({
-                        "ID": str(survey.get("_id"))[:8] + "...",
-                        "Organization": survey.get("org", {}).get("name", "N/A"),
-                        "Submitted By": survey.get("submitted_by", "N/A"),
-                        "Status": survey.get("status", "Completed"),
-                        "Date": str(survey.get("created_at", "N/A"))[:10]
-                    })
-                df = pd.DataFrame(table_data)
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("No survey records found.")
+                surveys = snapshot.rows(limit=limit, newest_first=sort_order == "Newest First")
             
-            client.close()
-        except Exception as e:
-            st.warning(f"MongoDB not available: {str(e)}")
-            st.info("Database is optional for local testing.")
+                if surveys:
+                    table_data = []
+                    for survey in surveys:
+                        table_data.append({
+                            "ID": str(survey["_id"])[:8] + "...",
+                            "Organization": survey["org"] or "N/A",
+                            "Submitted By": survey["submitted_by"] or "N/A",
+                            "Status": survey["status"] or "Completed",
+                            "Date": str(survey["created_at"] or survey["timestamp"] or "N/A")[:10]
+                        })
+                    df = pd.DataFrame(table_data)
+                    st.dataframe(df, use_container_width=True)
+                else:
+                    st.info("No survey records found.")
+            except Exception as e:
+                st.warning(f"MongoDB not available: {str(e)}")
+                st.info("Database is optional for local testing.")
     
     # ===== TAB 2: ANALYTICS =====
     with tabs[1]:
-        st.markdown("### Analytics Dashboard")
-        try:
-            from pymongo import MongoClient
-            mongo_uri = cfg.get("MONGODB", "uri", fallback="mongodb://localhost:27017")
-            db_name = cfg.get("MONGODB", "database", fallback="uob_survey")
-            collection_name = cfg.get("MONGODB", "collection", fallback="responses")
-            
-            client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-            db = client[db_name]
-            collection = db[collection_name]
+        with profile_block("admin:analytics"):
+            st.markdown("### Analytics Dashboard")
+            try:
+                snapshot = get_result(page, "snapshot")
+                status_counts = snapshot.status_counts()
             
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("Total Surveys", collection.count_documents({}))
-            with col2:
-                completed = collection.count_documents({"status": "Completed"})
-                st.metric("Completed", completed)
-            with col3:
-                in_progress = collection.count_documents({"status": "In Progress"})
-                st.metric("In Progress", in_progress)
-            with col4:
-                pending = collection.count_documents({"status": "Pending"})
-                st.metric("Pending", pending)
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Total Surveys", snapshot.count())
+                with col2:
+                    st.metric("Completed", status_counts.get("Completed", 0))
+                with col3:
+                    st.metric("In Progress", status_counts.get("In Progress", 0))
+                with col4:
+                    st.metric("Pending", status_counts.get("Pending", 0))
             
-            st.divider()
+                st.divider()
             
-            st.markdown("#### Survey Status Breakdown")
-            status_counts = collection.aggregate([
-                {"$group": {"_id": "$status", "count": {"$sum": 1}}}
-            ])
-            status_data = list(status_counts)
+                st.markdown("#### Survey Status Breakdown")
+                if status_counts:
+                    status_df = pd.DataFrame(list(status_counts.items()))
+                    status_df.columns = ["Status", "Count"]
+                    st.bar_chart(status_df.set_index("Status"))
             
-            if status_data:
-                status_df = pd.DataFrame(status_data)
-                status_df.columns = ["Status", "Count"]
-                st.bar_chart(status_df.set_index("Status"))
+                st.markdown("#### Reruns per Completed Survey")
+                rerun_stats = snapshot.rerun_stats()
+                if rerun_stats:
+                    rerun_df = pd.DataFrame(rerun_stats)
+                    rerun_df.columns = ["Input Mode", "Surveys", "Avg Reruns"]
+                    st.dataframe(rerun_df, use_container_width=True)
+                else:
+                    st.info("No rerun metrics recorded yet.")
             
-            st.markdown("#### Recent Submissions")
-            recent = list(collection.find().sort("created_at", -1).limit(5))
-            if recent:
-                timeline_data = []
-                for r in recent:
-                    timeline_data.append({
-                        "Date": str(r.get("created_at", "N/A"))[:10],
-                        "Organization": r.get("org", {}).get("name", "N/A"),
-                        "Status": r.get("status", "Completed")
-                    })
-                timeline_df = pd.DataFrame(timeline_data)
-                st.dataframe(timeline_df, use_container_width=True)
+                st.markdown("#### Maturity by Role")
+                cohorts = get_result(page, "cohorts")
+                if cohorts:
+                    cohort_df = pd.DataFrame(cohorts)
+                    cohort_df = cohort_df[["_id", "surveys", "completeness", "maturity", *PILLARS.values()]]
+                    cohort_df.columns = ["Role", "Surveys", "Completeness", "Maturity",
+                                         *[pillar.title() for pillar in PILLARS.values()]]
+                    st.dataframe(cohort_df.round(2), use_container_width=True)
+                else:
+                    st.info("No survey metrics stored yet (run app/survey_metrics.py to backfill).")
             
-            client.close()
-        except Exception as e:
-            st.warning(f"Analytics unavailable: {str(e)}")
+                st.markdown("#### Recent Submissions")
+                recent = snapshot.rows(limit=5)
+                if recent:
+                    timeline_data = []
+                    for r in recent:
+                        timeline_data.append({
+                            "Date": str(r["created_at"] or r["timestamp"] or "N/A")[:10],
+                            "Organization": r["org"] or "N/A",
+                            "Status": r["status"] or "Completed"
+                        })
+                    timeline_df = pd.DataFrame(timeline_data)
+                    st.dataframe(timeline_df, use_container_width=True)
+            except Exception as e:
+                st.warning(f"Analytics unavailable: {str(e)}")
     
     # ===== TAB 3: GENERATE REPORT =====
     with tabs[2]:
-        st.markdown("### Generate Assessment Report")
-        try:
-            from pymongo import MongoClient
-            mongo_uri = cfg.get("MONGODB", "uri", fallback="mongodb://localhost:27017")
-            db_name = cfg.get("MONGODB", "database", fallback="uob_survey")
-            collection_name = cfg.get("MONGODB", "collection", fallback="responses")
-            
-            client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-            db = client[db_name]
-            collection = db[collection_name]
+        with profile_block("admin:generate_report"):
+            st.markdown("### Generate Assessment Report")
+            try:
+                collection = get_collection(cfg)
             
-            surveys = list(collection.find().sort("timestamp", -1).limit(50))
+                # The picker only needs summaries; the full document is fetched for the selected survey
+                snapshot = get_result(page, "snapshot")
+                surveys = snapshot.rows(limit=50)
             
-            if not surveys:
-                st.info("No surveys available for report generation.")
-            else:
-                survey_options = [
-                    f"Survey {idx + 1} - {str(s.get('timestamp', 'N/A'))[:10]} ({s.get('user_role', 'User')})"
-                    for idx, s in enumerate(surveys)
-                ]
-                selected_idx = st.selectbox("Select Survey", range(len(survey_options)), format_func=lambda i: survey_options[i])
-                selected_survey = surveys[selected_idx]
+                if not surveys:
+                    st.info("No surveys available for report generation.")
+                else:
+                    survey_options = {
+                        s["_id"]: f"Survey {idx + 1} - {str(s['timestamp'] or 'N/A')[:10]} ({s['user_role'] or 'User'})"
+                        for idx, s in enumerate(surveys)
+                    }
+                    selected_id = st.selectbox("Select Survey", list(survey_options), format_func=survey_options.get,
+                                               key="report_survey_id")
+                    # Served from the shared document cache (already warmed by the page's prefetch)
+                    documents = get_document_cache(cfg)
+                    selected_survey = documents.get(selected_id)
+                    if selected_survey is None:
+                        snapshot.remove(selected_id)
+                        raise LookupError("the selected survey was deleted; refresh to update the list")
                 
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    if st.button("📄 Generate Full Report", use_container_width=True):
-                        try:
-                            with st.spinner("Generating comprehensive report..."):
-                                from report_generator import generate_full_report, format_report_as_markdown
-                                report_sections = generate_full_report(selected_survey)
-                                markdown_report = format_report_as_markdown(report_sections, selected_survey)
-                                st.session_state["generated_report"] = markdown_report
-                                st.session_state["report_doc_id"] = str(selected_survey["_id"])
-                                st.success("✅ Report generated!")
-                                st.rerun()
-                        except Exception as e:
-                            st.error(f"Error: {str(e)}")
+                    col1, col2, col3 = st.columns(3)
+                    with col1:
+                        if st.button("📄 Generate Full Report", use_container_width=True):
+                            try:
+                                # Queue mode hands the report to a worker; the page only polls its status
+                                if queue_report(cfg, selected_survey):
+                                    st.rerun()
+                                with st.spinner("Generating comprehensive report..."):
+                                    from report_generator import regenerate_report, format_report_as_markdown
+                                    # Sections whose inputs haven't changed since the stored report are reused
+                                    report_sections, report_record = regenerate_report(selected_survey)
+                                    collection.update_one({"_id": selected_survey["_id"]},
+                                                          {"$set": {"report": report_record, "updated_at": datetime.utcnow()}})
+                                    documents.invalidate(selected_survey["_id"])
+                                    markdown_report = format_report_as_markdown(report_sections, selected_survey)
+                                    report_cache.put(str(selected_survey["_id"]), markdown_report)
+                                    st.session_state["report_doc_id"] = str(selected_survey["_id"])
+                                    reused = sum(1 for action in report_record["actions"].values() if action == "reuse")
+                                    st.success(f"✅ Report generated! ({reused} of 4 sections reused)")
+                                    st.rerun()
+                            except Exception as e:
+                                st.error(f"Error: {str(e)}")
                 
-                with col2:
-                    if st.button("👁️ Preview Data", use_container_width=True):
-                        st.session_state["show_preview"] = not st.session_state.get("show_preview", False)
-                        st.rerun()
+                    with col2:
+                        if st.button("👁️ Preview Data", use_container_width=True):
+                            st.session_state["show_preview"] = not st.session_state.get("show_preview", False)
+                            st.rerun()
                 
-                if st.session_state.get("show_preview"):
-                    st.divider()
-                    st.markdown("### Survey Data Preview")
-                    
-                    # Load questions to map IDs to text for better display
-                    all_questions = load_questions(cfg)
-                    q_text_map = {}
-                    for q in all_questions:
-                        q_text_map[q.get("id")] = q.get("text", q.get("id"))
-                    
-                    # AI/GenAI questions mapping
-                    ai_questions = [
-                        {"id": "AI_Q1", "text": "What GPU and computing infrastructure do you currently have available, and is it sufficient to support GenAI model training and inference?"},
-                        {"id": "AI_Q2", "text": "Do you have access to commercial LLMs (OpenAI, Azure OpenAI, Anthropic Claude, Google Gemini) or are you planning to use open-source models (Llama, Mistral, etc.)?"},
-                        {"id": "AI_Q3", "text": "Which cloud environments (AWS, Azure, GCP) are approved for your organization, and do you have access to AI/ML platforms like AWS SageMaker, Azure AI Foundry, or Google Vertex AI?"},
-                        {"id": "AI_Q4", "text": "What data storage infrastructure do you have (data lakes, data warehouses, databases), and can it support the data volumes required for GenAI model training and inference?"},
-                        {"id": "AI_Q5", "text": "Do you have monitoring, logging, and observability infrastructure in place to support AI/GenAI model monitoring and governance?"},
-                        {"id": "AI_Q6", "text": "Does your organization have an AI Council, AI Governance Board, or similar body that reviews and approves AI/GenAI projects before they start?"},
-                        {"id": "AI_Q7", "text": "Before starting an AI/GenAI project, do we need to get approval from the Security team, Compliance team, or other governance bodies? What's the typical lead time?"},
-                        {"id": "AI_Q8", "text": "What data privacy and regulatory compliance requirements apply to AI/GenAI projects, especially regarding data usage, model transparency, and audit trails?"},
-                        {"id": "AI_Q9", "text": "Does your organization have an AI Ethics framework or Responsible AI guidelines that AI/GenAI projects must follow?"},
-                        {"id": "AI_Q10", "text": "What change management and organizational approval processes are required before deploying AI/GenAI solutions to production?"},
-                        {"id": "AI_Q11", "text": "Is there a common framework or standard that needs to be adopted to build GenAI applications, or can we write our own framework?"},
-                        {"id": "AI_Q12", "text": "Do you have a model registry or model management system in place, and what are the requirements for model versioning, documentation, and governance?"},
-                        {"id": "AI_Q13", "text": "What testing, validation, and quality assurance standards apply to AI/GenAI models before they're deployed to production?"},
-                        {"id": "AI_Q14", "text": "What documentation and audit trail requirements apply to AI/GenAI projects, especially for regulatory compliance and internal governance?"},
-                        {"id": "AI_Q15", "text": "How should AI/GenAI projects integrate with your existing development, testing, and deployment processes (CI/CD, DevOps)?"}
-                    ]
-                    ai_q_map = {q.get("id"): q.get("text") for q in ai_questions}
-                    q_text_map.update(ai_q_map)
-                    
-                    # Display Step 1 Answers
-                    if selected_survey.get("step1_answers"):
-                        st.markdown("#### Step 1: Baseline Assessment")
-                        for idx, qa in enumerate(selected_survey["step1_answers"], 1):
-                            if isinstance(qa, dict):
-                                # Try to get actual question text
-                                q_id = qa.get('question_id', '')
-                                q_text = qa.get('question_text', '')
-                                if not q_text or q_text == q_id:
-                                    # Try to map from our loaded questions
-                                    q_text = q_text_map.get(q_id, q_id)
-                                a_text = qa.get('answer', 'N/A')
-                            else:
-                                q_id = f'Q{idx}'
-                                q_text = f'Question {idx}'
-                                a_text = str(qa)
-                            
-                            display_text = str(q_text)[:60] if q_text else f'Question {idx}'
-                            with st.expander(f"Q{idx}: {display_text}..."):
-                                st.write(f"**Question ID:** {q_id if isinstance(qa, dict) else 'N/A'}")
-                                st.write(f"**Question:** {q_text if q_text else 'N/A'}")
-                                st.write(f"**Answer:** {a_text}")
+                    if st.session_state.get("show_preview"):
+                        st.divider()
+                        st.markdown("### Survey Data Preview")
                     
-                    # Display Step 2 Answers
-                    if selected_survey.get("step2_answers"):
-                        st.markdown("#### Step 2: Deep Dive (Dynamic Questions)")
-                        for idx, qa in enumerate(selected_survey["step2_answers"], 1):
-                            if isinstance(qa, dict):
-                                q_text = qa.get('question_text', qa.get('question', f'Question {idx}'))
-                                a_text = qa.get('answer', 'N/A')
-                            else:
-                                q_text = f'Question {idx}'
-                                a_text = str(qa)
-                            
-                            display_text = str(q_text)[:60] if q_text else f'Question {idx}'
-                            with st.expander(f"Q{idx}: {display_text}..."):
-                                st.write(f"**Question:** {q_text}")
-                                st.write(f"**Answer:** {a_text}")
-                    
-                    # Display Step 3 Answers
-                    if selected_survey.get("step3_answers"):
-                        st.markdown("#### Step 3: AI/GenAI Discovery")
-                        for idx, qa in enumerate(selected_survey["step3_answers"], 1):
-                            if isinstance(qa, dict):
-                                q_id = qa.get('question_id', '')
-                                q_text = qa.get('question_text', '')
-                                if not q_text or q_text == q_id:
-                                    # Try to map from AI questions
-                                    q_text = ai_q_map.get(q_id, q_id)
-                                a_text = qa.get('answer', 'N/A')
-                            else:
-                                q_id = f'AI_Q{idx}'
-                                q_text = ai_q_map.get(q_id, f'Question {idx}')
-                                a_text = str(qa)
-                            
-                            display_text = str(q_text)[:60] if q_text else f'Question {idx}'
-                            with st.expander(f"Q{idx}: {display_text}..."):
-                                st.write(f"**Question ID:** {q_id if isinstance(qa, dict) else 'N/A'}")
-                                st.write(f"**Question:** {q_text if q_text else 'N/A'}")
-                                st.write(f"**Answer:** {a_text}")
-                    else:
-                        st.info("No Step 3 answers found in this survey.")
+                        # Compact and legacy documents decode to the same (key, question, answer) rows
+                        decoded = decode_answers(selected_survey)
+                        step_titles = {
+                            "step1": "Step 1: Baseline Assessment",
+                            "step2": "Step 2: Deep Dive (Dynamic Questions)",
+                            "step3": "Step 3: AI/GenAI Discovery",
+                        }
+                        for step, title in step_titles.items():
+                            if not decoded[step]:
+                                if step == "step3":
+                                    st.info("No Step 3 answers found in this survey.")
+                                continue
+                            st.markdown(f"#### {title}")
+                            for idx, (key, q_text, a_text) in enumerate(decoded[step], 1):
+                                display_text = str(q_text)[:60] if q_text else f'Question {idx}'
+                                with st.expander(f"Q{idx}: {display_text}..."):
+                                    if step != "step2":
+                                        st.write(f"**Question ID:** {key if isinstance(key, str) else 'N/A'}")
+                                    st.write(f"**Question:** {q_text if q_text else 'N/A'}")
+                                    st.write(f"**Answer:** {a_text}")
                 
-                with col3:
-                    if st.button("🗑️ Delete Survey", use_container_width=True):
-                        if st.confirm("Are you sure?"):
-                            collection.delete_one({"_id": selected_survey["_id"]})
-                            st.success("Survey deleted.")
-                            st.rerun()
+                    with col3:
+                        if st.button("🗑️ Delete Survey", use_container_width=True):
+                            if st.confirm("Are you sure?"):
+                                collection.delete_one({"_id": selected_survey["_id"]})
+                                snapshot.remove(selected_survey["_id"])
+                                documents.invalidate(selected_survey["_id"])
+                                report_cache.pop(str(selected_survey["_id"]))
+                                st.success("Survey deleted.")
+                                st.rerun()
                 
-                if st.session_state.get("generated_report") and st.session_state.get("report_doc_id") == str(selected_survey["_id"]):
-                    st.divider()
-                    st.markdown(st.session_state["generated_report"])
+                    job = page.get("latest_job", FETCH_JOB) if selected_id == prefetched_id else FETCH_JOB
+                    render_report_job_status(cfg, collection, selected_survey,
+                                             FETCH_JOB if isinstance(job, Exception) else job)
+                    generated_report = report_cache.get(str(selected_survey["_id"]))
+                    if generated_report and st.session_state.get("report_doc_id") == str(selected_survey["_id"]):
+                        st.divider()
+                        st.markdown(generated_report)
                     
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.download_button(
-                            label="📥 Download as Markdown",
-                            data=st.session_state["generated_report"],
-                            file_name=f"report_{str(selected_survey['_id'])[:8]}.md",
-                            mime="text/markdown"
-                        )
-                    with col2:
-                        st.download_button(
-                            label="📥 Download as Text",
-                            data=st.session_state["generated_report"],
-                            file_name=f"report_{str(selected_survey['_id'])[:8]}.txt",
-                            mime="text/plain"
-                        )
-            
-            client.close()
-        except Exception as e:
-            st.error(f"Report generation not available: {str(e)}")
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            st.download_button(
+                                label="📥 Download as Markdown",
+                                data=generated_report,
+                                file_name=f"report_{str(selected_survey['_id'])[:8]}.md",
+                                mime="text/markdown"
+                            )
+                        with col2:
+                            st.download_button(
+                                label="📥 Download as Text",
+                                data=generated_report,
+                                file_name=f"report_{str(selected_survey['_id'])[:8]}.txt",
+                                mime="text/plain"
+                            )
+            except Exception as e:
+                st.error(f"Report generation not available: {str(e)}")
     
     # ===== TAB 4: SETTINGS =====
     with tabs[3]:
-        st.markdown("### Admin Settings")
+        with profile_block("admin:settings"):
+            st.markdown("### Admin Settings")
         
-        col1, col2 = st.columns(2)
-        with col1:
-            st.markdown("#### Configuration")
-            if st.checkbox("Enable Email Notifications"):
-                st.text_input("Email Address")
-                st.success("✅ Email notifications enabled")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown("#### Configuration")
+                if st.checkbox("Enable Email Notifications"):
+                    st.text_input("Email Address")
+                    st.success("✅ Email notifications enabled")
             
-            if st.checkbox("Enable Report Auto-Save"):
-                st.selectbox("Auto-save interval (minutes)", [5, 15, 30, 60])
-                st.success("✅ Auto-save enabled")
+                if st.checkbox("Enable Report Auto-Save"):
+                    st.selectbox("Auto-save interval (minutes)", [5, 15, 30, 60])
+                    st.success("✅ Auto-save enabled")
         
-        with col2:
-            st.markdown("#### System Info")
-            import sys
-            st.info(f"Python Version: {sys.version.split()[0]}")
-            st.info(f"Streamlit Version: {st.__version__}")
+            with col2:
+                st.markdown("#### System Info")
+                import sys
+                st.info(f"Python Version: {sys.version.split()[0]}")
+                st.info(f"Streamlit Version: {st.__version__}")
+                try:
+                    import pymongo
+                    st.success(f"MongoDB Driver: {pymongo.__version__}")
+                except:
+                    st.warning("MongoDB Driver: Not installed")
+
+                # Per-session memory accounting (respondent sessions in this process)
+                budget_mb = cfg.app.session_memory_budget_mb
+                memory = get_memory_report(budget_mb)
+                if memory["sessions_sampled"]:
+                    st.info(
+                        f"Session state: avg {memory['avg_bytes'] / 1024:.1f} KB, "
+                        f"max {memory['max_bytes'] / 1024:.1f} KB over {memory['sessions_sampled']} respondent sessions"
+                    )
+                    st.info(f"Estimated capacity: ~{memory['capacity']} concurrent respondents per {budget_mb:.0f} MB")
+                else:
+                    st.info("Session state: no respondent sessions sampled yet")
+
+                try:
+                    dashboard_stats = get_result(page, "snapshot").stats()
+                    st.info(
+                        f"Dashboard cache: {dashboard_stats['surveys']} surveys via {dashboard_stats['mode']}, "
+                        f"{dashboard_stats['full_syncs']} full syncs, {dashboard_stats['delta_queries']} delta queries "
+                        f"({dashboard_stats['delta_documents']} documents); page queries via "
+                        f"{get_async_data_layer(cfg).mode}"
+                    )
+                    doc_stats = get_document_cache(cfg).stats()
+                    st.info(
+                        f"Document cache: {doc_stats['documents']} surveys, {doc_stats['hits']} hits, "
+                        f"{doc_stats['misses']} misses"
+                    )
+                except Exception:
+                    pass
+
+            st.divider()
+            st.markdown("#### LLM Traffic")
             try:
-                import pymongo
-                st.success(f"MongoDB Driver: {pymongo.__version__}")
-            except:
-                st.warning("MongoDB Driver: Not installed")
+                from llm_resilience import get_resilience_snapshot
+                from llm_rate_limiter import get_rate_limiter
+
+                call_sites = get_resilience_snapshot()
+                if call_sites:
+                    st.dataframe(
+                        pd.DataFrame([{"Call Site": site, **stats} for site, stats in call_sites.items()]),
+                        use_container_width=True
+                    )
+                limiter = get_rate_limiter()
+                if limiter is not None:
+                    st.markdown("**Rate limiter queue waits by priority class**")
+                    st.dataframe(
+                        pd.DataFrame([{"Class": name, **stats} for name, stats in limiter.snapshot().items()]),
+                        use_container_width=True
+                    )
+                elif not call_sites:
+                    st.info("No LLM calls recorded in this process yet.")
+
+                from model_router import get_routing_snapshot
+                routes = get_routing_snapshot()
+                if routes:
+                    st.markdown("**Model routing**")
+                    st.dataframe(
+                        pd.DataFrame([{"Call Site": site, **route} for site, route in routes.items()]),
+                        use_container_width=True
+                    )
+
+                from semantic_cache import get_semantic_cache
+                cache = get_semantic_cache()
+                if cache is not None:
+                    cache_stats = cache.stats()
+                    st.markdown("**Step 2 semantic cache**")
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}",
+                                help=f"{cache_stats['hits']} of {cache_stats['lookups']} lookups")
+                    col2.metric("LLM Time Saved", f"{cache_stats['saved_seconds']:.0f}s")
+                    col3.metric("Entries", cache_stats["entries"],
+                                help=f"{cache_stats['evictions']} evicted, {cache_stats['avg_lookup_ms']} ms per lookup")
+            except Exception as e:
+                st.warning(f"LLM traffic stats unavailable: {str(e)}")
+
+            if cfg.report_queue.mode == "queue":
+                st.markdown("**Report queue**")
+                try:
+                    queue_stats = queue_stats_from_rows(get_result(page, "queue_stats"))
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("Queued", queue_stats.get("queued", 0))
+                    col2.metric("Running", queue_stats.get("running", 0))
+                    col3.metric("Done", queue_stats.get("done", 0))
+                    col4.metric("Failed", queue_stats.get("failed", 0))
+                except Exception as e:
+                    st.warning(f"Report queue unavailable: {str(e)}")
         
-        st.divider()
-        st.markdown("#### Database Management")
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.button("🔄 Backup Database"):
-                st.info("Database backup would be created here.")
-                st.success("✅ Backup completed")
-        with col2:
-            if st.button("🧹 Clear Old Records (>6 months)"):
-                st.warning("This will delete surveys older than 6 months.")
-                if st.confirm("Proceed?"):
-                    st.success("✅ Old records cleared")
+            st.divider()
+            st.markdown("#### Database Management")
+            col1, col2 = st.columns(2)
+            with col1:
+                full_backup = st.checkbox("Full backup", help="Copy everything instead of only what changed since the last backup")
+                if st.button("🔄 Backup Database"):
+                    try:
+                        from backup import run_backup
+                        status = st.empty()
+                        manifest = run_backup(
+                            full=full_backup,
+                            progress=lambda name, documents: status.info(f"Backing up {name}: {documents} documents"),
+                        )
+                        status.empty()
+                        st.success(
+                            f"✅ Backed up {manifest['documents']} documents "
+                            f"({manifest['bytes'] / 1024 / 1024:.1f} MB, {manifest['mb_per_second']} MB/s) "
+                            f"to `{manifest['path']}`"
+                        )
+                    except Exception as e:
+                        st.error(f"Backup failed: {str(e)}")
+            with col2:
+                retention_days = st.number_input(
+                    "Retention period (days)", min_value=1, value=int(cfg.retention.retention_days),
+                    key="retention_days"
+                )
+                if st.button(f"🧹 Clear Old Records (>{retention_days} days)"):
+                    st.session_state["retention_preview"] = True
+                if st.session_state.get("retention_preview"):
+                    try:
+                        from retention import count_expired, run_retention
+                        # Prefetched with the page unless the preview was opened on this run
+                        expired = (get_result(page, "expired") if "expired" in page
+                                   else count_expired(retention_days, get_collection(cfg)))
+                        if not expired:
+                            st.info(f"No surveys older than {retention_days} days.")
+                            st.session_state["retention_preview"] = False
+                        else:
+                            st.warning(
+                                f"{expired} surveys are older than {retention_days} days. They will be archived "
+                                f"to `{cfg.retention.archive_dir}/` (gzip JSONL) and then deleted."
+                            )
+                            if st.button("Archive and delete", type="primary"):
+                                progress = st.progress(0.0, text="Archiving...")
+                                manifest = run_retention(
+                                    retention_days, collection=get_collection(cfg),
+                                    progress=lambda done, total: progress.progress(
+                                        done / total, text=f"{done} of {total} archived"
+                                    ),
+                                )
+                                st.session_state["retention_preview"] = False
+                                st.success(
+                                    f"✅ Archived {manifest['archived']} and deleted {manifest['deleted']} surveys "
+                                    f"into `{manifest.get('archive_dir', cfg.retention.archive_dir)}`"
+                                )
+                    except Exception as e:
+                        st.error(f"Retention run failed: {str(e)}")
 
 # Main application
 def main():
@@ -932,10 +1007,16 @@ def main():
     
     # Check if user is authenticated
     if not st.session_state["authenticated"]:
+        set_page("login")
         render_login_page()
         return
     
+    # A survey started on another replica (or before a restart) resumes from the session store
+    restore_session()
     cfg = load_config()
+    state = get_survey_state()
+    # Resumes jobs a restarted process left queued; a no-op once the workers run
+    start_embedded_workers()
     
     # Sidebar
     with st.sidebar:
@@ -950,19 +1031,20 @@ def main():
         # Show survey options only for regular users
         if st.session_state["user_type"] == "user":
             # Role selection - only show User option
-            if not st.session_state["survey_started"]:
+            if not state.survey_started:
                 # Only show User option for regular users
-                st.session_state["user_role"] = "User"
+                state.user_role = "User"
                 st.markdown("**📋 Role:** User")
                 
                 if st.button("Start Survey", type="primary", use_container_width=True):
-                    st.session_state["survey_started"] = True
+                    state.survey_started = True
                     st.rerun()
             else:
-                st.write(f"**Role:** {st.session_state['user_role']}")
-                st.write(f"**Step:** {st.session_state['current_step'] + 1}")
+                st.write(f"**Role:** {state.user_role}")
+                st.write(f"**Step:** {state.current_step + 1}")
                 
                 if st.button("Reset Survey", use_container_width=True):
+                    clear_session()
                     for key in list(st.session_state.keys()):
                         del st.session_state[key]
                     st.rerun()
@@ -974,6 +1056,7 @@ def main():
         
         # Logout button
         if st.button("🚪 Logout", use_container_width=True):
+            clear_session()
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
@@ -983,13 +1066,15 @@ def main():
         st.markdown("**Author:** Optimum AI Lab")
     
     # Main content
-    if not st.session_state["survey_started"]:
+    if not state.survey_started:
         # Show different content based on user type
         if st.session_state["user_type"] == "admin":
+            set_page("admin")
             st.title("🏦 Admin Dashboard")
             st.markdown("Welcome Admin! Select an option from the sidebar.")
             render_admin_dashboard(cfg)
         else:
+            set_page("welcome")
             st.title("🏦 UOB Risk & Regulatory IT Survey")
             st.markdown("""
 ## Welcome to the UOB Risk & Regulatory IT Survey
@@ -1044,6 +1129,7 @@ Click **"Start Survey"** in the sidebar to launch your assessment.
     else:
         # Admin dashboard - only show if user is admin
         if st.session_state["user_type"] == "admin":
+            set_page("admin")
             render_admin_dashboard(cfg)
         else:
             # User survey - only show if user is regular user
@@ -1051,7 +1137,7 @@ Click **"Start Survey"** in the sidebar to launch your assessment.
             
             # Progress indicator
             progress_steps = ["Step 1: Baseline", "Step 2: Deep Dive", "Step 3: AI/GenAI", "Step 4: Submit"]
-            current_progress = min(st.session_state["current_step"], len(progress_steps) - 1)
+            current_progress = min(state.current_step, len(progress_steps) - 1)
             
             st.progress((current_progress + 1) / len(progress_steps), text=progress_steps[current_progress])
             
@@ -1061,17 +1147,30 @@ Click **"Start Survey"** in the sidebar to launch your assessment.
             questions = load_questions(cfg)
             
             # Render appropriate step
-            if st.session_state["current_step"] == 0:
-                render_step1(questions)
-            elif st.session_state["current_step"] == 1:
+            set_page(f"step{state.current_step + 1}")
+
+            # Count reruns per step so input modes can be compared per completed survey
+            rerun_key = str(state.current_step + 1)
+            state.survey_reruns[rerun_key] = state.survey_reruns.get(rerun_key, 0) + 1
+            track_session_memory()
+
+            if state.current_step == 0:
+                render_step1(questions, get_input_mode(cfg))
+            elif state.current_step == 1:
                 render_step2(cfg)
-            elif st.session_state["current_step"] == 2:
+            elif state.current_step == 2:
                 render_step3_ai_genai(cfg)
-            elif st.session_state["current_step"] == 3:
+            elif state.current_step == 3:
                 render_step4(cfg)
-            elif st.session_state.get("survey_complete"):
+            elif state.survey_complete:
                 st.success("✅ Survey Complete!")
-                st.markdown(f"**Survey ID:** {st.session_state.get('survey_id', 'N/A')}")
+                st.markdown(f"**Survey ID:** {state.survey_id or 'N/A'}")
 
 if __name__ == "__main__":
-    main()
+    try:
+        with profile_rerun():
+            main()
+    finally:
+        # Also runs when st.rerun() ends the script early
+        persist_session()
+    render_profiler_panel()
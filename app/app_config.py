@@ -0,0 +1,303 @@
+"""
+App Config Module
+Typed, process-wide configuration parsed once and hot-reloaded on change
+Author: Optimum AI Lab
+
+get_config() returns the same AppConfig to every rerun and module. The file's
+mtime is checked at most every CONFIG_RELOAD_SECONDS (default 2); when it
+changes, a new AppConfig is parsed and swapped in, so prompt templates, routes
+and limits change without a restart. AppConfig is still a ConfigParser, so
+per-call-site lookups keep working, while fixed settings are exposed as typed
+attributes (cfg.app, cfg.mongo, cfg.followups, cfg.report, cfg.report_queue,
+cfg.report_batch, cfg.rate_limit, cfg.semantic_cache, cfg.session_store,
+cfg.dashboard, cfg.retention, cfg.backup).
+
+Environment overrides are applied after the file is read:
+    SURVEY__<SECTION>__<KEY>=value   e.g. SURVEY__OPENAI__MODEL=gpt-4o
+    MONGODB_URI / MONGODB_DATABASE / MONGODB_COLLECTION   ([MONGO] uri / db_name / collection_name)
+    REDIS_URL   ([SESSION_STORE] redis_url)
+"""
+
+import os
+import time
+import threading
+import configparser
+from typing import Optional
+
+# Same lookup order as the app always used, plus the copy next to this module
+CONFIG_PATHS = [
+    "config.ini",
+    "./config.ini",
+    "../config.ini",
+    "config/config.ini",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.ini"),
+]
+
+ENV_PREFIX = "SURVEY__"
+
+# Established environment variables and the settings they override
+ENV_ALIASES = {
+    "MONGODB_URI": ("MONGO", "uri"),
+    "MONGODB_DATABASE": ("MONGO", "db_name"),
+    "MONGODB_COLLECTION": ("MONGO", "collection_name"),
+    "REDIS_URL": ("SESSION_STORE", "redis_url"),
+}
+
+
+class AppSettings:
+    """[APP]"""
+
+    __slots__ = ("app_name", "app_version", "input_mode", "num_followups_per_open", "session_memory_budget_mb")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        self.app_name = cfg.get("APP", "app_name", fallback="UOB Risk & Regulatory IT Survey")
+        self.app_version = cfg.get("APP", "app_version", fallback="")
+        mode = cfg.get("APP", "input_mode", fallback="single").strip().lower()
+        self.input_mode = mode if mode in ("single", "paged") else "single"
+        self.num_followups_per_open = cfg.getint("APP", "num_followups_per_open", fallback=10)
+        self.session_memory_budget_mb = cfg.getfloat("APP", "session_memory_budget_mb", fallback=512.0)
+
+
+class MongoSettings:
+    """[MONGO] (the legacy [MONGODB] uri/database/collection keys are still honoured)"""
+
+    __slots__ = ("uri", "database", "collection")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        uri = cfg.get("MONGO", "uri", fallback=None) or cfg.get("MONGODB", "uri", fallback=None)
+        if not uri:
+            host = cfg.get("MONGO", "host", fallback="").strip()
+            user = cfg.get("MONGO", "username", fallback="").strip()
+            password = cfg.get("MONGO", "password", fallback="").strip()
+            auth = f"{user}:{password}@" if user else ""
+            if host.endswith(".mongodb.net"):
+                uri = f"mongodb+srv://{auth}{host}/?retryWrites=true&w=majority"
+            elif host:
+                uri = f"mongodb://{auth}{host}:{cfg.get('MONGO', 'port', fallback='27017')}/"
+            else:
+                uri = "mongodb://localhost:27017"
+        self.uri = uri
+        self.database = (cfg.get("MONGO", "db_name", fallback=None)
+                         or cfg.get("MONGODB", "database", fallback="uob_survey"))
+        self.collection = (cfg.get("MONGO", "collection_name", fallback=None)
+                           or cfg.get("MONGODB", "collection", fallback="responses"))
+
+
+class FollowupSettings:
+    """[DYNAMIC_FOLLOWUPS]"""
+
+    __slots__ = ("mode", "divergence_threshold", "divergence_min_terms", "max_replans", "system_prompt",
+                 "user_template")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        mode = cfg.get("DYNAMIC_FOLLOWUPS", "mode", fallback="per_answer").strip().lower()
+        self.mode = mode if mode in ("per_answer", "batched") else "per_answer"
+        self.divergence_threshold = cfg.getfloat("DYNAMIC_FOLLOWUPS", "divergence_threshold", fallback=0.9)
+        self.divergence_min_terms = cfg.getint("DYNAMIC_FOLLOWUPS", "divergence_min_terms", fallback=8)
+        self.max_replans = cfg.getint("DYNAMIC_FOLLOWUPS", "max_replans", fallback=2)
+        self.system_prompt = cfg.get("DYNAMIC_FOLLOWUPS", "followup_system_prompt", fallback="")
+        self.user_template = cfg.get("DYNAMIC_FOLLOWUPS", "followup_user_template", fallback="")
+
+
+class ReportSettings:
+    """[REPORT_GENERATION]"""
+
+    __slots__ = ("mode", "amend_max_changed_answers", "max_prompt_tokens", "chunk_tokens", "max_chunks")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        mode = cfg.get("REPORT_GENERATION", "mode", fallback="multi_call").strip().lower()
+        self.mode = mode if mode in ("multi_call", "structured") else "multi_call"
+        self.amend_max_changed_answers = cfg.getint("REPORT_GENERATION", "amend_max_changed_answers", fallback=5)
+        self.max_prompt_tokens = cfg.getint("REPORT_GENERATION", "max_prompt_tokens", fallback=12000)
+        self.chunk_tokens = cfg.getint("REPORT_GENERATION", "chunk_tokens", fallback=4000)
+        self.max_chunks = cfg.getint("REPORT_GENERATION", "max_chunks", fallback=12)
+
+
+class ReportQueueSettings:
+    """[REPORT_QUEUE]"""
+
+    __slots__ = ("mode", "embedded_workers", "lease_seconds", "poll_seconds", "max_attempts", "collection")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        mode = cfg.get("REPORT_QUEUE", "mode", fallback="queue").strip().lower()
+        self.mode = mode if mode in ("queue", "inline") else "queue"
+        self.embedded_workers = cfg.getint("REPORT_QUEUE", "embedded_workers", fallback=1)
+        self.lease_seconds = cfg.getfloat("REPORT_QUEUE", "lease_seconds", fallback=60.0)
+        self.poll_seconds = cfg.getfloat("REPORT_QUEUE", "poll_seconds", fallback=2.0)
+        self.max_attempts = cfg.getint("REPORT_QUEUE", "max_attempts", fallback=3)
+        self.collection = cfg.get("REPORT_QUEUE", "collection", fallback="report_jobs")
+
+
+class ReportBatchSettings:
+    """[REPORT_BATCH]"""
+
+    __slots__ = ("backend", "batch_dir", "max_surveys", "completion_window", "poll_seconds")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        backend = cfg.get("REPORT_BATCH", "backend", fallback="openai").strip().lower()
+        self.backend = backend if backend in ("openai", "local") else "openai"
+        self.batch_dir = cfg.get("REPORT_BATCH", "batch_dir", fallback="batches")
+        self.max_surveys = cfg.getint("REPORT_BATCH", "max_surveys", fallback=500)
+        self.completion_window = cfg.get("REPORT_BATCH", "completion_window", fallback="24h")
+        self.poll_seconds = cfg.getfloat("REPORT_BATCH", "poll_seconds", fallback=60.0)
+
+
+class RateLimitSettings:
+    """[LLM_RATE_LIMIT]"""
+
+    __slots__ = ("enabled", "requests_per_minute", "tokens_per_minute", "backend", "batch_share")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        self.enabled = cfg.getboolean("LLM_RATE_LIMIT", "enabled", fallback=False)
+        self.requests_per_minute = cfg.getint("LLM_RATE_LIMIT", "requests_per_minute", fallback=500)
+        self.tokens_per_minute = cfg.getint("LLM_RATE_LIMIT", "tokens_per_minute", fallback=200000)
+        self.backend = cfg.get("LLM_RATE_LIMIT", "backend", fallback="local").strip().lower()
+        self.batch_share = cfg.getfloat("LLM_RATE_LIMIT", "batch_share", fallback=0.8)
+
+
+class SemanticCacheSettings:
+    """[SEMANTIC_CACHE]"""
+
+    __slots__ = ("enabled", "similarity_threshold", "context_turns", "max_entries")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        self.enabled = cfg.getboolean("SEMANTIC_CACHE", "enabled", fallback=False)
+        self.similarity_threshold = cfg.getfloat("SEMANTIC_CACHE", "similarity_threshold", fallback=0.92)
+        self.context_turns = cfg.getint("SEMANTIC_CACHE", "context_turns", fallback=2)
+        self.max_entries = cfg.getint("SEMANTIC_CACHE", "max_entries", fallback=2000)
+
+
+class SessionStoreSettings:
+    """[SESSION_STORE]"""
+
+    __slots__ = ("backend", "ttl_hours", "sqlite_path", "redis_url", "collection")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        backend = cfg.get("SESSION_STORE", "backend", fallback="memory").strip().lower()
+        self.backend = backend if backend in ("memory", "sqlite", "redis", "mongo") else "memory"
+        self.ttl_hours = cfg.getfloat("SESSION_STORE", "ttl_hours", fallback=24.0)
+        self.sqlite_path = cfg.get("SESSION_STORE", "sqlite_path", fallback="survey_sessions.db")
+        self.redis_url = cfg.get("SESSION_STORE", "redis_url", fallback="redis://localhost:6379/0")
+        self.collection = cfg.get("SESSION_STORE", "collection", fallback="survey_sessions")
+
+
+class DashboardSettings:
+    """[ADMIN_DASHBOARD]"""
+
+    __slots__ = ("change_streams", "resync_seconds", "auto_refresh_seconds", "doc_cache_entries",
+                 "doc_cache_ttl_seconds", "query_workers", "query_timeout_seconds")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        self.change_streams = cfg.getboolean("ADMIN_DASHBOARD", "change_streams", fallback=True)
+        self.resync_seconds = cfg.getfloat("ADMIN_DASHBOARD", "resync_seconds", fallback=300.0)
+        self.auto_refresh_seconds = cfg.getfloat("ADMIN_DASHBOARD", "auto_refresh_seconds", fallback=15.0)
+        self.doc_cache_entries = cfg.getint("ADMIN_DASHBOARD", "doc_cache_entries", fallback=256)
+        self.doc_cache_ttl_seconds = cfg.getfloat("ADMIN_DASHBOARD", "doc_cache_ttl_seconds", fallback=120.0)
+        self.query_workers = cfg.getint("ADMIN_DASHBOARD", "query_workers", fallback=8)
+        self.query_timeout_seconds = cfg.getfloat("ADMIN_DASHBOARD", "query_timeout_seconds", fallback=10.0)
+
+
+class RetentionSettings:
+    """[RETENTION]"""
+
+    __slots__ = ("retention_days", "archive_dir", "batch_size", "pause_seconds")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        self.retention_days = cfg.getfloat("RETENTION", "retention_days", fallback=180.0)
+        self.archive_dir = cfg.get("RETENTION", "archive_dir", fallback="archives")
+        self.batch_size = cfg.getint("RETENTION", "batch_size", fallback=500)
+        self.pause_seconds = cfg.getfloat("RETENTION", "pause_seconds", fallback=0.5)
+
+
+class BackupSettings:
+    """[BACKUP]"""
+
+    __slots__ = ("backup_dir", "chunk_mb", "batch_size", "collections", "incremental_collections")
+
+    def __init__(self, cfg: configparser.ConfigParser):
+        self.backup_dir = cfg.get("BACKUP", "backup_dir", fallback="backups")
+        self.chunk_mb = cfg.getfloat("BACKUP", "chunk_mb", fallback=64.0)
+        self.batch_size = cfg.getint("BACKUP", "batch_size", fallback=1000)
+        self.collections = cfg.get("BACKUP", "collections", fallback="")
+        self.incremental_collections = cfg.get("BACKUP", "incremental_collections", fallback="")
+
+
+class AppConfig(configparser.ConfigParser):
+    """Parsed config.ini plus environment overrides, with typed views of the fixed sections"""
+
+    def __init__(self, path: Optional[str] = None, mtime: Optional[float] = None, version: int = 0):
+        # No interpolation: values carry literal % (URL-encoded passwords, logging formats)
+        super().__init__(interpolation=None)
+        self.path = path
+        self.mtime = mtime
+        self.version = version
+        if path:
+            self.read(path)
+        self._apply_env_overrides()
+
+        self.app = AppSettings(self)
+        self.mongo = MongoSettings(self)
+        self.followups = FollowupSettings(self)
+        self.report = ReportSettings(self)
+        self.report_queue = ReportQueueSettings(self)
+        self.report_batch = ReportBatchSettings(self)
+        self.rate_limit = RateLimitSettings(self)
+        self.semantic_cache = SemanticCacheSettings(self)
+        self.session_store = SessionStoreSettings(self)
+        self.dashboard = DashboardSettings(self)
+        self.retention = RetentionSettings(self)
+        self.backup = BackupSettings(self)
+
+    def _apply_env_overrides(self):
+        overrides = [(section, key, os.environ[name]) for name, (section, key) in ENV_ALIASES.items()
+                     if os.environ.get(name)]
+        for name, value in os.environ.items():
+            if name.startswith(ENV_PREFIX) and name.count("__") >= 2:
+                section, key = name[len(ENV_PREFIX):].split("__", 1)
+                overrides.append((section.upper(), key.lower(), value))
+        for section, key, value in overrides:
+            if not self.has_section(section):
+                self.add_section(section)
+            self.set(section, key, value)
+
+
+_config: Optional[AppConfig] = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def find_config_path() -> Optional[str]:
+    """First existing config.ini on the lookup path"""
+    for path in CONFIG_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def get_config() -> AppConfig:
+    """Process-wide config, re-parsed only when the file's mtime changes"""
+    global _config, _checked_at
+    interval = float(os.getenv("CONFIG_RELOAD_SECONDS", "2") or 0)
+    config = _config
+    if config is not None and time.monotonic() - _checked_at < interval:
+        return config
+
+    with _lock:
+        _checked_at = time.monotonic()
+        path = find_config_path()
+        try:
+            mtime = os.path.getmtime(path) if path else None
+        except OSError:
+            mtime = None
+        if _config is None or (path, mtime) != (_config.path, _config.mtime):
+            version = _config.version + 1 if _config is not None else 1
+            try:
+                _config = AppConfig(path, mtime, version)
+                if version > 1:
+                    print(f"Configuration reloaded from {path} (version {version})")
+            except (configparser.Error, ValueError) as e:
+                # A half-saved or invalid edit keeps the last good config
+                if _config is None:
+                    raise
+                print(f"Configuration reload failed, keeping version {_config.version}: {e}")
+        return _config
@@ -0,0 +1,164 @@
+"""
+Async DB Module
+Concurrent MongoDB reads on Motor for the admin pages, behind a synchronous facade
+Author: Optimum AI Lab
+
+An admin page needs several independent reads (counts, breakdowns, recent
+lists, the selected document) and used to issue them one after another.
+gather() fires them all at once and returns when the slowest finishes:
+    Query       a read run natively on Motor (find, find_one, count, aggregate)
+    callable    existing synchronous code (e.g. a snapshot refresh), run on the
+                layer's thread pool alongside the Motor queries
+Motor runs on one event loop in a background thread that lives as long as the
+process, so Streamlit's synchronous script can call gather() on every rerun.
+Without Motor, or with MONGO_BACKEND=mongomock, every entry runs on the thread
+pool with PyMongo instead; the results are the same.
+
+Callables run outside the Streamlit script thread and must not call st.*.
+"""
+
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from app_config import get_config
+
+
+class Query:
+    """One read against a collection of the survey database, runnable on Motor or PyMongo"""
+
+    __slots__ = ("collection", "op", "args", "kwargs")
+
+    def __init__(self, collection: str, op: str, *args, **kwargs):
+        self.collection = collection
+        self.op = op
+        self.args = args
+        self.kwargs = kwargs
+
+    @classmethod
+    def find(cls, collection: str, filter: Optional[Dict] = None, projection: Optional[Dict] = None,
+             sort: Optional[List] = None, limit: int = 0) -> "Query":
+        return cls(collection, "find", filter or {}, projection, sort=sort, limit=limit)
+
+    @classmethod
+    def find_one(cls, collection: str, filter: Dict, projection: Optional[Dict] = None,
+                 sort: Optional[List] = None) -> "Query":
+        return cls(collection, "find_one", filter, projection, sort=sort)
+
+    @classmethod
+    def count(cls, collection: str, filter: Dict) -> "Query":
+        return cls(collection, "count_documents", filter)
+
+    @classmethod
+    def aggregate(cls, collection: str, pipeline: List[Dict]) -> "Query":
+        return cls(collection, "aggregate", pipeline)
+
+    async def run_async(self, db) -> Any:
+        result = getattr(db[self.collection], self.op)(*self.args, **self.kwargs)
+        if self.op in ("find", "aggregate"):
+            return await result.to_list(length=None)
+        return await result
+
+    def run_sync(self, db) -> Any:
+        result = getattr(db[self.collection], self.op)(*self.args, **self.kwargs)
+        return list(result) if self.op in ("find", "aggregate") else result
+
+
+Work = Union[Query, Callable[[], Any]]
+
+
+def get_result(results: Dict[str, Any], key: str) -> Any:
+    """One entry of gather()'s results, re-raising the error if that read failed"""
+    value = results.get(key)
+    if isinstance(value, Exception):
+        raise value
+    return value
+
+
+class AsyncDataLayer:
+    """Runs groups of independent reads concurrently; latency is that of the slowest"""
+
+    def __init__(self, cfg):
+        from db_client import get_db
+
+        settings = cfg.dashboard
+        self.timeout = settings.query_timeout_seconds
+        self.sync_db = get_db(cfg)
+        self.executor = ThreadPoolExecutor(max_workers=settings.query_workers, thread_name_prefix="async-db")
+        self.mode = "threads"
+        self.loop = None
+        self.db = None
+
+        if os.getenv("MONGO_BACKEND", "pymongo").strip().lower() == "mongomock":
+            return
+        try:
+            import motor.motor_asyncio  # noqa: F401
+        except ImportError:
+            print("Async data layer: motor not installed, using a PyMongo thread pool")
+            return
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True, name="async-db-loop").start()
+        # Motor binds to the loop it is created on
+        self.db = asyncio.run_coroutine_threadsafe(self._connect(cfg.mongo.uri, cfg.mongo.database), self.loop).result()
+        self.mode = "motor"
+
+    @staticmethod
+    async def _connect(uri: str, database: str):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        return AsyncIOMotorClient(uri, serverSelectionTimeoutMS=5000)[database]
+
+    def _run_sync(self, work: Work) -> Any:
+        return work.run_sync(self.sync_db) if isinstance(work, Query) else work()
+
+    async def _gather(self, queries: Dict[str, Work], timeout: float) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        tasks = [
+            asyncio.wait_for(
+                work.run_async(self.db) if isinstance(work, Query)
+                else loop.run_in_executor(self.executor, contextvars.copy_context().run, work),
+                timeout,
+            )
+            for work in queries.values()
+        ]
+        # A slow or failing read only affects its own entry
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return dict(zip(queries, results))
+
+    def gather(self, queries: Dict[str, Work], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run every entry concurrently; each result is the value or the exception it raised"""
+        if not queries:
+            return {}
+        timeout = timeout or self.timeout
+        if self.mode == "motor":
+            return asyncio.run_coroutine_threadsafe(self._gather(queries, timeout), self.loop).result()
+
+        deadline = time.monotonic() + timeout
+        futures = {key: self.executor.submit(contextvars.copy_context().run, self._run_sync, work)
+                   for key, work in queries.items()}
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result(max(0.0, deadline - time.monotonic()))
+            except Exception as e:
+                results[key] = e
+        return results
+
+
+_layers: Dict[tuple, AsyncDataLayer] = {}
+_layers_lock = threading.Lock()
+
+
+def get_async_data_layer(cfg=None) -> AsyncDataLayer:
+    """Process-wide data layer for the configured database"""
+    cfg = cfg if cfg is not None else get_config()
+    key = (os.getenv("MONGO_BACKEND", "pymongo"), cfg.mongo.uri, cfg.mongo.database)
+    with _layers_lock:
+        layer = _layers.get(key)
+        if layer is None:
+            layer = AsyncDataLayer(cfg)
+            _layers[key] = layer
+        return layer
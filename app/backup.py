@@ -0,0 +1,315 @@
+"""
+Backup Module
+Streaming, incremental backup and restore of the app's MongoDB collections
+Author: Optimum AI Lab
+
+Each collection is read in _id order as raw BSON (documents are never decoded
+into Python objects) and written to gzip chunks of about chunk_mb, hashed with
+SHA-256 as they are written; memory use stays constant however large the
+collection is. Chunks are concatenated BSON, the same layout as mongodump, so
+`mongorestore` can read them too.
+
+Surveys and report jobs are updated in place (reports, metrics, migrations,
+job status), so their incrementals are keyed on the `updated_at` every app
+writer stamps, not on _id: a run records its start time (less a margin for
+clock skew between app hosts) and the next run copies every document whose
+updated_at is at or after it. Other collections (question catalogs,
+sessions) are copied in full every time. Deletions are not tracked; the next
+full backup drops them.
+
+Restore verifies checksums, replays the most recent full copy of each
+collection with batched insert_many, then applies the incrementals after it
+as batched upserts, so a changed document replaces its older copy.
+
+Usage (from the repository root):
+    python app/backup.py
+    python app/backup.py --full
+    python app/backup.py --restore --target-db uob_survey_restore
+"""
+
+import os
+import sys
+import gzip
+import time
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+
+MANIFEST = "manifest.json"
+UPDATED_FIELD = "updated_at"
+# Writes stamped just before a run started may land after the scan passed them
+WATERMARK_MARGIN = timedelta(minutes=5)
+
+ProgressCallback = Callable[[str, int], None]
+
+
+class HashingWriter:
+    """File wrapper that hashes and counts the bytes written through it"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.raw.write(data)
+
+    def flush(self):
+        self.raw.flush()
+
+
+def _names(value: str) -> List[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def backup_collections(cfg) -> List[str]:
+    """[BACKUP] collections, or the survey, catalog, report job and session collections"""
+    return _names(cfg.backup.collections) or [
+        cfg.mongo.collection, "question_catalogs", cfg.report_queue.collection, cfg.session_store.collection,
+    ]
+
+
+def incremental_collections(cfg) -> List[str]:
+    """[BACKUP] incremental_collections, or the survey and report job collections (both stamp updated_at)"""
+    return _names(cfg.backup.incremental_collections) or [cfg.mongo.collection, cfg.report_queue.collection]
+
+
+def list_backups(backup_dir: str) -> List[str]:
+    """Backup run directories with a manifest, oldest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted(
+        os.path.join(backup_dir, name) for name in os.listdir(backup_dir)
+        if os.path.exists(os.path.join(backup_dir, name, MANIFEST))
+    )
+
+
+def _load_manifest(run_dir: str) -> Dict:
+    from bson import json_util
+    with open(os.path.join(run_dir, MANIFEST), "r") as f:
+        return json_util.loads(f.read())
+
+
+def _raw_view(collection):
+    """The collection returning undecoded RawBSONDocuments, or None where unsupported (mongomock)"""
+    from bson.codec_options import CodecOptions
+    from bson.raw_bson import RawBSONDocument
+    try:
+        return collection.with_options(codec_options=CodecOptions(document_class=RawBSONDocument))
+    except NotImplementedError:
+        return None
+
+
+def _backup_collection(collection, run_dir: str, since, chunk_bytes: int, batch_size: int,
+                       progress: Optional[ProgressCallback]) -> Dict:
+    import bson
+
+    raw_collection = _raw_view(collection)
+    encode = (lambda doc: doc.raw) if raw_collection is not None else bson.encode
+    query = {UPDATED_FIELD: {"$gte": since}} if since is not None else {}
+    cursor = (raw_collection or collection).find(query, sort=[("_id", 1)], batch_size=batch_size)
+
+    entry = {"mode": "incremental" if since is not None else "full", "since": since,
+             "documents": 0, "bytes": 0, "chunks": []}
+    chunk = writer = gz = None
+
+    def close_chunk():
+        gz.close()
+        writer.flush()
+        os.fsync(writer.raw.fileno())
+        writer.raw.close()
+        chunk["sha256"] = writer.sha256.hexdigest()
+        chunk["compressed_bytes"] = writer.size
+
+    for doc in cursor:
+        if gz is None:
+            name = f"{collection.name}.{len(entry['chunks']) + 1:05d}.bson.gz"
+            writer = HashingWriter(open(os.path.join(run_dir, name), "wb"))
+            gz = gzip.GzipFile(fileobj=writer, mode="wb", compresslevel=6)
+            chunk = {"file": name, "documents": 0, "bytes": 0}
+            entry["chunks"].append(chunk)
+        data = encode(doc)
+        gz.write(data)
+        chunk["documents"] += 1
+        chunk["bytes"] += len(data)
+        entry["documents"] += 1
+        entry["bytes"] += len(data)
+        if chunk["bytes"] >= chunk_bytes:
+            close_chunk()
+            gz = None
+            if progress:
+                progress(collection.name, entry["documents"])
+    if gz is not None:
+        close_chunk()
+    if progress:
+        progress(collection.name, entry["documents"])
+    return entry
+
+
+def run_backup(backup_dir: Optional[str] = None, full: bool = False,
+               progress: Optional[ProgressCallback] = None) -> Dict:
+    """Back up every configured collection; incremental against the latest backup unless full"""
+    from bson import json_util
+    from app_config import get_config
+    from db_client import get_db
+
+    cfg = get_config()
+    backup_dir = backup_dir or cfg.backup.backup_dir
+    db = get_db(cfg)
+    if db is None:
+        raise ConnectionError("MongoDB not available")
+
+    incremental = incremental_collections(cfg)
+    previous = {}
+    if not full:
+        for run_dir in list_backups(backup_dir):
+            for name, entry in _load_manifest(run_dir)["collections"].items():
+                # Manifests from before updated_at tracking hold an _id watermark: copy in full
+                previous[name] = entry.get("watermark") if entry.get("watermark_field") == UPDATED_FIELD else None
+
+    started = time.perf_counter()
+    created_at = datetime.utcnow()
+    run_dir = os.path.join(backup_dir, created_at.strftime("%Y%m%dT%H%M%S%fZ"))
+    os.makedirs(run_dir, exist_ok=True)
+    manifest = {"created_at": created_at, "database": db.name, "collections": {}}
+    for name in backup_collections(cfg):
+        tracked = name in incremental
+        if tracked:
+            db[name].create_index(UPDATED_FIELD)
+        entry = _backup_collection(
+            db[name], run_dir, previous.get(name) if tracked else None,
+            int(cfg.backup.chunk_mb * 1024 * 1024), cfg.backup.batch_size, progress,
+        )
+        if tracked:
+            entry["watermark_field"] = UPDATED_FIELD
+            entry["watermark"] = created_at - WATERMARK_MARGIN
+        manifest["collections"][name] = entry
+
+    elapsed = time.perf_counter() - started
+    total_bytes = sum(entry["bytes"] for entry in manifest["collections"].values())
+    manifest["seconds"] = round(elapsed, 2)
+    manifest["documents"] = sum(entry["documents"] for entry in manifest["collections"].values())
+    manifest["bytes"] = total_bytes
+    manifest["mb_per_second"] = round(total_bytes / 1024 / 1024 / elapsed, 2) if elapsed else None
+    # Written last: a run without a manifest is incomplete and ignored
+    with open(os.path.join(run_dir, MANIFEST), "w") as f:
+        f.write(json_util.dumps(manifest, indent=2, json_options=json_util.CANONICAL_JSON_OPTIONS))
+    manifest["path"] = run_dir
+    return manifest
+
+
+def _verify_chunk(path: str, expected: str):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    if digest.hexdigest() != expected:
+        raise IOError(f"Checksum mismatch for {path}")
+
+
+def _insert_batch(collection, batch: List) -> int:
+    """insert_many for a full copy, treating documents that already exist as restored"""
+    from pymongo.errors import BulkWriteError
+    try:
+        return len(collection.insert_many(batch, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(error.get("code") != 11000 for error in errors):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+def _upsert_batch(collection, batch: List) -> int:
+    """Replace each document of an incremental with its newer copy (or insert it)"""
+    from pymongo import ReplaceOne
+    collection.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in batch], ordered=False)
+    return len(batch)
+
+
+def run_restore(backup_dir: Optional[str] = None, until: Optional[str] = None,
+                target_db: Optional[str] = None, batch_size: Optional[int] = None,
+                progress: Optional[ProgressCallback] = None) -> Dict[str, int]:
+    """Restore each collection from its latest full copy plus later incrementals (up to `until`)"""
+    from bson import decode_file_iter
+    from app_config import get_config
+    from db_client import get_client
+
+    cfg = get_config()
+    backup_dir = backup_dir or cfg.backup.backup_dir
+    batch_size = batch_size or cfg.backup.batch_size
+    runs = [run for run in list_backups(backup_dir) if until is None or os.path.basename(run) <= until]
+    if not runs:
+        raise FileNotFoundError(f"No backups in {backup_dir}")
+    db = get_client(cfg)[target_db or cfg.mongo.database]
+
+    # Per collection: the last full copy, then every incremental after it
+    plan: Dict[str, List] = {}
+    for run_dir in runs:
+        for name, entry in _load_manifest(run_dir)["collections"].items():
+            if entry["mode"] == "full":
+                plan[name] = []
+            plan.setdefault(name, []).append((run_dir, entry))
+
+    restored = {}
+    for name, steps in plan.items():
+        collection = _raw_view(db[name]) or db[name]
+        count = 0
+        for run_dir, entry in steps:
+            write = _insert_batch if entry["mode"] == "full" else _upsert_batch
+            for chunk in entry["chunks"]:
+                path = os.path.join(run_dir, chunk["file"])
+                _verify_chunk(path, chunk["sha256"])
+                batch = []
+                with gzip.open(path, "rb") as f:
+                    for doc in decode_file_iter(f, codec_options=collection.codec_options):
+                        batch.append(doc)
+                        if len(batch) >= batch_size:
+                            count += write(collection, batch)
+                            batch = []
+                if batch:
+                    count += write(collection, batch)
+                if progress:
+                    progress(name, count)
+        restored[name] = count
+    return restored
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Back up or restore the survey database")
+    parser.add_argument("--backup-dir", default=None, help="Backup root (default [BACKUP] backup_dir)")
+    parser.add_argument("--full", action="store_true", help="Copy everything instead of only changed documents")
+    parser.add_argument("--restore", action="store_true", help="Restore from the backups instead")
+    parser.add_argument("--until", default=None, help="Restore up to this backup run (directory name)")
+    parser.add_argument("--target-db", default=None, help="Database to restore into (default [MONGO] db_name)")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    from db_client import close_clients
+
+    started = time.perf_counter()
+
+    def report(name: str, documents: int):
+        print(f"{name}: {documents} documents ({time.perf_counter() - started:.1f}s)")
+
+    if args.restore:
+        restored = run_restore(args.backup_dir, args.until, args.target_db, progress=report)
+        elapsed = time.perf_counter() - started
+        total = sum(restored.values())
+        print(f"Restored {total} documents in {elapsed:.1f}s ({total / elapsed:.0f} docs/s)" if elapsed else "")
+    else:
+        manifest = run_backup(args.backup_dir, full=args.full, progress=report)
+        print(f"Backed up {manifest['documents']} documents ({manifest['bytes'] / 1024 / 1024:.1f} MB) "
+              f"in {manifest['seconds']}s ({manifest['mb_per_second']} MB/s) to {manifest['path']}")
+    close_clients()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, APP_DIR)
+    sys.exit(main())
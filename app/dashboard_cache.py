@@ -0,0 +1,258 @@
+"""
+Dashboard Cache Module
+Per-process snapshot of survey summaries for the admin dashboard, refreshed incrementally
+Author: Optimum AI Lab
+
+The Surveys, Analytics and Generate Report tabs only need a few summary fields
+per survey. They are loaded once per process into a snapshot; afterwards each
+refresh merges only the changes since the last one:
+    change streams   a watcher thread applies inserts/updates/deletes as they
+                     happen (replica sets and Atlas)
+    polling          one indexed query for documents with _id above the
+                     watermark, plus an O(1) estimated count to detect deletes
+When polling, a full resync still runs every resync_seconds to pick up edits
+made elsewhere. Refresh cost therefore follows new submissions, not collection size.
+
+Database reads never run under the snapshot's lock: views keep serving the
+current rows while one session refreshes, and sessions that arrive meanwhile
+skip their refresh instead of queueing behind it.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app_config import get_config
+
+SUMMARY_PROJECTION = {
+    "org.name": 1,
+    "submitted_by": 1,
+    "status": 1,
+    "created_at": 1,
+    "timestamp": 1,
+    "user_role": 1,
+    "client_metrics.input_mode": 1,
+    "client_metrics.total_reruns": 1,
+}
+
+
+def summarize(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The dashboard's view of one survey document"""
+    metrics = doc.get("client_metrics") or {}
+    return {
+        "_id": doc["_id"],
+        "org": (doc.get("org") or {}).get("name"),
+        "submitted_by": doc.get("submitted_by"),
+        "status": doc.get("status"),
+        "created_at": doc.get("created_at"),
+        "timestamp": doc.get("timestamp"),
+        "user_role": doc.get("user_role"),
+        "input_mode": metrics.get("input_mode"),
+        "total_reruns": metrics.get("total_reruns"),
+    }
+
+
+def submitted_at(row: Dict[str, Any]) -> datetime:
+    """Submission time: created_at, else timestamp, else the ObjectId's creation time"""
+    for field in ("created_at", "timestamp"):
+        if isinstance(row.get(field), datetime):
+            return row[field].replace(tzinfo=None)
+    generation_time = getattr(row["_id"], "generation_time", None)
+    return generation_time.replace(tzinfo=None) if generation_time else datetime.min
+
+
+class DashboardSnapshot:
+    """Survey summaries for one collection, kept current by change stream or _id watermark"""
+
+    def __init__(self, collection, use_change_streams: bool = True, resync_seconds: float = 300.0):
+        self.collection = collection
+        self.use_change_streams = use_change_streams
+        self.resync_seconds = resync_seconds
+        self.mode = "poll"
+        self.watermark = None
+        self.full_syncs = 0
+        self.delta_queries = 0
+        self.delta_documents = 0
+        self._rows: Dict[Any, Dict[str, Any]] = {}
+        self._synced_at: Optional[float] = None
+        self._stream_tried = False
+        self._touched: Optional[set] = None  # ids the change stream wrote during a full sync
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+    # ----- loading -----
+
+    def _full_sync(self):
+        with self._lock:
+            self._touched = set()
+        rows = {doc["_id"]: summarize(doc) for doc in self.collection.find({}, SUMMARY_PROJECTION)}
+        with self._lock:
+            # Changes streamed in while the scan ran are newer than what it read
+            for doc_id in self._touched:
+                if doc_id in self._rows:
+                    rows[doc_id] = self._rows[doc_id]
+                else:
+                    rows.pop(doc_id, None)
+            self._touched = None
+            self._rows = rows
+            self.watermark = max(rows) if rows else None
+            self._synced_at = time.monotonic()
+            self.full_syncs += 1
+
+    def _poll_delta(self):
+        query = {"_id": {"$gt": self.watermark}} if self.watermark is not None else {}
+        docs = list(self.collection.find(query, SUMMARY_PROJECTION).sort("_id", 1))
+        total = self.collection.estimated_document_count()
+        with self._lock:
+            for doc in docs:
+                self._apply(doc)
+            self.delta_queries += 1
+            self.delta_documents += len(docs)
+            in_sync = total == len(self._rows)
+        if not in_sync:
+            # Something was deleted (or inserted out of _id order) elsewhere
+            self._full_sync()
+
+    def _apply(self, doc: Dict[str, Any]):
+        if self._touched is not None:
+            self._touched.add(doc["_id"])
+        self._rows[doc["_id"]] = summarize(doc)
+        if self.watermark is None or doc["_id"] > self.watermark:
+            self.watermark = doc["_id"]
+
+    def _start_change_stream(self):
+        """Open the stream before the full sync so no change falls between the two"""
+        self._stream_tried = True
+        try:
+            # Only the summary fields travel over the stream; MongoDB keeps _id only at the
+            # event's top level, so fullDocument._id is projected explicitly
+            project = {"operationType": 1, "documentKey": 1, "fullDocument._id": 1,
+                       **{f"fullDocument.{field}": 1 for field in SUMMARY_PROJECTION}}
+            stream = self.collection.watch([{"$project": project}], full_document="updateLookup")
+        except Exception as e:
+            print(f"Dashboard cache: change streams unavailable, polling instead ({e})")
+            return
+        self.mode = "change_stream"
+        threading.Thread(target=self._consume, args=(stream,), daemon=True, name="dashboard-watch").start()
+
+    def _consume(self, stream):
+        try:
+            with stream:
+                for change in stream:
+                    operation = change.get("operationType")
+                    with self._lock:
+                        if operation in ("insert", "update", "replace") and change.get("fullDocument"):
+                            self._apply({**change["fullDocument"], "_id": change["documentKey"]["_id"]})
+                        elif operation == "delete":
+                            if self._touched is not None:
+                                self._touched.add(change["documentKey"]["_id"])
+                            self._rows.pop(change["documentKey"]["_id"], None)
+                        elif operation in ("drop", "invalidate"):
+                            self._rows = {}
+                            self.watermark = None
+        except Exception as e:
+            print(f"Dashboard cache: change stream closed, polling instead ({e})")
+        with self._lock:
+            self.mode = "poll"
+            self._synced_at = None
+
+    def refresh(self) -> "DashboardSnapshot":
+        """Bring the snapshot up to date (cheap when nothing changed).
+
+        Only one session refreshes at a time; the others use the rows as they
+        are, unless nothing has been loaded yet.
+        """
+        if not self._refresh_lock.acquire(blocking=self.full_syncs == 0):
+            return self
+        try:
+            if self.use_change_streams and not self._stream_tried:
+                self._start_change_stream()
+            with self._lock:
+                synced_at, mode = self._synced_at, self.mode
+            if synced_at is None:
+                # First load, or the change stream dropped
+                self._full_sync()
+            elif mode == "change_stream":
+                pass
+            elif time.monotonic() - synced_at > self.resync_seconds:
+                self._full_sync()
+            else:
+                self._poll_delta()
+        finally:
+            self._refresh_lock.release()
+        return self
+
+    def remove(self, doc_id):
+        """Drop a survey deleted from this process"""
+        with self._lock:
+            self._rows.pop(doc_id, None)
+
+    # ----- views -----
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def rows(self, limit: Optional[int] = None, newest_first: bool = True) -> List[Dict[str, Any]]:
+        """Summaries ordered by submission time"""
+        with self._lock:
+            rows = list(self._rows.values())
+        rows.sort(key=submitted_at, reverse=newest_first)
+        return rows[:limit] if limit else rows
+
+    def count_newer_than(self, doc_id) -> int:
+        """Surveys submitted after the given _id (new since an admin's last view)"""
+        if doc_id is None:
+            return 0
+        with self._lock:
+            return sum(1 for key in self._rows if key > doc_id)
+
+    def status_counts(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for row in self._rows.values():
+                if row["status"] is not None:
+                    counts[row["status"]] = counts.get(row["status"], 0) + 1
+        return counts
+
+    def rerun_stats(self) -> List[Dict[str, Any]]:
+        """Surveys and mean reruns per input mode, for surveys that recorded reruns"""
+        totals: Dict[Any, List[float]] = {}
+        with self._lock:
+            for row in self._rows.values():
+                if row["total_reruns"] is not None:
+                    entry = totals.setdefault(row["input_mode"], [0, 0])
+                    entry[0] += 1
+                    entry[1] += row["total_reruns"]
+        return [{"input_mode": mode, "surveys": n, "avg_reruns": total / n} for mode, (n, total) in totals.items()]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "surveys": len(self._rows),
+                "full_syncs": self.full_syncs,
+                "delta_queries": self.delta_queries,
+                "delta_documents": self.delta_documents,
+            }
+
+
+_snapshots: Dict[tuple, DashboardSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_dashboard_snapshot(cfg=None) -> DashboardSnapshot:
+    """Process-wide, refreshed snapshot of the survey collection"""
+    from db_client import get_collection
+
+    cfg = cfg if cfg is not None else get_config()
+    settings = cfg.dashboard
+    key = (cfg.mongo.uri, cfg.mongo.database, cfg.mongo.collection)
+    with _snapshots_lock:
+        snapshot = _snapshots.get(key)
+        if snapshot is None:
+            snapshot = DashboardSnapshot(get_collection(cfg), settings.change_streams, settings.resync_seconds)
+            _snapshots[key] = snapshot
+    snapshot.resync_seconds = settings.resync_seconds
+    return snapshot.refresh()
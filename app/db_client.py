@@ -0,0 +1,73 @@
+"""
+Database Client Module
+Shared MongoDB connection for the survey app
+Author: Optimum AI Lab
+
+Set MONGO_BACKEND=mongomock to run against an in-process stand-in
+(requires the optional `mongomock` package), e.g. for load tests.
+"""
+
+import os
+import threading
+from typing import Optional, Tuple
+
+from app_config import get_config
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_mongo_settings(cfg=None) -> Tuple[str, str, str]:
+    """Resolve (uri, database, collection) from [MONGO] (MONGODB_* env vars override)"""
+    mongo = (cfg if cfg is not None else get_config()).mongo
+    return mongo.uri, mongo.database, mongo.collection
+
+
+def get_client(cfg=None):
+    """Get the process-wide MongoClient for the configured URI.
+
+    MongoClient keeps its own connection pool and is thread-safe, so one
+    instance is shared by every session instead of connecting per rerun.
+    """
+    uri, _, _ = get_mongo_settings(cfg)
+    backend = os.getenv("MONGO_BACKEND", "pymongo").strip().lower()
+    key = (backend, uri)
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            if backend == "mongomock":
+                import mongomock
+                client = mongomock.MongoClient()
+            else:
+                from pymongo import MongoClient
+                client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+            _clients[key] = client
+        return client
+
+
+def get_db(cfg=None):
+    """Get the survey database, or None if MongoDB is unavailable"""
+    try:
+        _, db_name, _ = get_mongo_settings(cfg)
+        return get_client(cfg)[db_name]
+    except Exception as e:
+        print(f"MongoDB not available: {e}")
+        return None
+
+
+def get_collection(cfg=None, name: Optional[str] = None):
+    """Get a collection (the survey responses collection by default)"""
+    _, db_name, collection_name = get_mongo_settings(cfg)
+    return get_client(cfg)[db_name][name or collection_name]
+
+
+def close_clients():
+    """Close all cached clients (used by CLI tools on exit)"""
+    with _clients_lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
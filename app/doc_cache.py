@@ -0,0 +1,93 @@
+"""
+Document Cache Module
+Process-wide LRU of full survey documents with a TTL, shared by the admin report views
+Author: Optimum AI Lab
+
+The report views need the whole document of the one survey an admin has
+selected, and Streamlit re-runs them on every click. Documents are cached by
+_id for ttl_seconds, so repeated reruns (and other admins looking at the same
+survey) are served without a database round-trip. Writes made from this
+process invalidate the entry; the TTL bounds staleness for writes made
+elsewhere (report workers, other app instances).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app_config import get_config
+
+
+class DocumentCache:
+    """LRU of documents keyed by _id, each entry expiring after ttl_seconds"""
+
+    def __init__(self, collection, max_entries: int = 256, ttl_seconds: float = 120.0):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[Any, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, doc_id) -> Optional[Dict[str, Any]]:
+        """The cached document, loading it with find_one when missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(doc_id)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._items.move_to_end(doc_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        doc = self.collection.find_one({"_id": doc_id})
+        if doc is not None:
+            self.put(doc)
+        else:
+            self.invalidate(doc_id)
+        return doc
+
+    def put(self, doc: Dict[str, Any]):
+        """Cache a document, evicting the least recently used beyond capacity"""
+        with self._lock:
+            self._items[doc["_id"]] = (time.monotonic(), doc)
+            self._items.move_to_end(doc["_id"])
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def invalidate(self, doc_id):
+        """Drop a document after it was updated or deleted"""
+        with self._lock:
+            self._items.pop(doc_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "documents": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+_caches: Dict[tuple, DocumentCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_document_cache(cfg=None) -> DocumentCache:
+    """Process-wide document cache for the survey collection"""
+    from db_client import get_collection
+
+    cfg = cfg if cfg is not None else get_config()
+    settings = cfg.dashboard
+    key = (cfg.mongo.uri, cfg.mongo.database, cfg.mongo.collection)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = DocumentCache(get_collection(cfg), settings.doc_cache_entries, settings.doc_cache_ttl_seconds)
+            _caches[key] = cache
+    cache.max_entries = settings.doc_cache_entries
+    cache.ttl_seconds = settings.doc_cache_ttl_seconds
+    return cache
@@ -5,11 +5,14 @@ Author: Optimum AI Lab
 Version: 2.2 (Fixed)
 """
 
-import os
+import re
 import json
+import time
 import streamlit as st
 from typing import Dict, List, Tuple
-from openai import OpenAI
+from llm_client import get_api_key, get_openai_client
+from llm_resilience import chat_completion, is_circuit_open, CircuitOpenError
+from semantic_cache import get_semantic_cache
 
 # Load environment variables from .env file - handle gracefully if dotenv not available
 try:
@@ -34,31 +37,49 @@ class DynamicQuestionManagerEnhanced:
     
     def __init__(self):
         """Initialize the question manager"""
-        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.api_key = get_api_key()
         self.client = None
         self.tooltip_cache = {}
         self.initialize_client()
     
     def initialize_client(self):
         """Initialize OpenAI client"""
+        self.api_key = get_api_key()
         if not self.api_key:
             st.warning("⚠️ OPENAI_API_KEY not found in environment variables")
             return False
         
         try:
-            # Initialize OpenAI client with default HTTP client (requests-based)
-            self.client = OpenAI(api_key=self.api_key)
+            # Shared client factory applies the configured record/replay transport
+            self.client = get_openai_client(timeout=60.0)
             return True
         except Exception as e:
             st.error(f"Error initializing OpenAI client: {str(e)}")
             return False
     
+    def ensure_client(self) -> bool:
+        """Retry client setup if it failed earlier, e.g. the key was set after startup"""
+        if self.client is None:
+            self.initialize_client()
+        return self.client is not None
+    
     def generate_next_question(self, conversation_history: List[Dict]) -> str:
         """Generate next question based on conversation history"""
-        if not self.client:
+        if not self.ensure_client():
             st.warning("⚠️ OpenAI client not initialized - using fallback questions")
             return self._get_fallback_question(len(conversation_history))
         
+        # Upstream unhealthy: answer instantly instead of waiting on a spinner
+        if is_circuit_open("step2_question"):
+            return self._get_fallback_question(len(conversation_history))
+        
+        # Near-identical recent answers reuse an earlier generated follow-up
+        cache = get_semantic_cache()
+        if cache is not None:
+            cached = cache.lookup(conversation_history)
+            if cached is not None:
+                return cached[0]
+        
         try:
             # Build conversation context
             context = self._build_context(conversation_history)
@@ -82,27 +103,58 @@ Conversation so far:
 
 Generate ONLY the next question (no numbering, no preamble). Make it specific and directly related to their answers."""
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            started = time.perf_counter()
+            response = chat_completion(self.client, "step2_question",
                 messages=[
                     {"role": "system", "content": "You are an expert IT infrastructure consultant. Generate diverse, insightful follow-up questions that explore different aspects each time."},
                     {"role": "user", "content": prompt}
-                ],
-                temperature=0.8,  # Increased for more variety
-                max_tokens=200
+                ]
             )
             
             question = response.choices[0].message.content.strip()
+            if cache is not None:
+                cache.store(conversation_history, question, time.perf_counter() - started)
             st.success(f"✅ Generated dynamic question using AI")
             return question
         
+        except CircuitOpenError:
+            return self._get_fallback_question(len(conversation_history))
         except Exception as e:
             st.error(f"❌ Error generating question: {str(e)}")
             return self._get_fallback_question(len(conversation_history))
     
+    def generate_followup_batch(self, answer: str, k: int, asked: List[str],
+                                system_prompt: str, user_template: str) -> List[str]:
+        """Generate a ranked batch of k follow-up questions for an answer in one call"""
+        if not self.ensure_client() or is_circuit_open("step2_followups"):
+            return []
+        
+        try:
+            user_prompt = user_template.replace("\\n", "\n").format(answer=answer)
+            user_prompt += "\nOrder the questions from most to least important."
+            if asked:
+                user_prompt += "\nDo not repeat any of these questions already asked:\n" + "\n".join(f"- {q}" for q in asked)
+            
+            response = chat_completion(self.client, "step2_followups",
+                messages=[
+                    {"role": "system", "content": system_prompt.format(k=k)},
+                    {"role": "user", "content": user_prompt}
+                ]
+            )
+            
+            questions = _parse_question_list(response.choices[0].message.content)
+            asked_set = set(asked)
+            return [q for q in questions if q not in asked_set][:k]
+        
+        except CircuitOpenError:
+            return []
+        except Exception as e:
+            st.warning(f"Error generating follow-up questions: {str(e)}")
+            return []
+    
     def generate_tooltip(self, question: str, question_number: int) -> str:
         """Generate tooltip for a specific question"""
-        if not self.client:
+        if not self.ensure_client():
             return self._get_fallback_tooltip(question)
         
         # Check cache first
@@ -121,27 +173,26 @@ Question: {question}
 
 Generate ONLY the tooltip text (no labels, no numbering)."""
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = chat_completion(self.client, "tooltip",
                 messages=[
                     {"role": "system", "content": "You are a helpful survey guide. Generate concise, practical tooltips."},
                     {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=150
+                ]
             )
             
             tooltip = response.choices[0].message.content.strip()
             self.tooltip_cache[cache_key] = tooltip
             return tooltip
         
+        except CircuitOpenError:
+            return self._get_fallback_tooltip(question)
         except Exception as e:
             st.warning(f"Error generating tooltip: {str(e)}")
             return self._get_fallback_tooltip(question)
     
     def generate_insights_summary(self, questions: List[str], answers: List[str]) -> str:
         """Generate insights summary from all Q&A pairs"""
-        if not self.client:
+        if not self.ensure_client():
             return self._get_fallback_summary()
         
         try:
@@ -163,14 +214,11 @@ Survey Responses:
 
 Generate a professional, actionable summary (200-300 words)."""
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = chat_completion(self.client, "insights_summary",
                 messages=[
                     {"role": "system", "content": "You are an expert IT consultant. Generate insightful summaries."},
                     {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=400
+                ]
             )
             
             return response.choices[0].message.content.strip()
@@ -235,11 +283,64 @@ Thank you for completing this survey. Your responses have been recorded and will
 Please note that a detailed analysis requires manual review of your responses."""
 
 
+def _parse_question_list(content: str) -> List[str]:
+    """Questions from a JSON list response, falling back to one question per line"""
+    text = (content or "").strip()
+    start, end = text.find("["), text.rfind("]")
+    if start != -1 and end > start:
+        try:
+            items = json.loads(text[start:end + 1])
+            return [str(item).strip() for item in items if str(item).strip()]
+        except json.JSONDecodeError:
+            pass
+    lines = [re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip().strip('"') for line in text.splitlines()]
+    return [line for line in lines if line.endswith("?")]
+
+
+# Words that carry no topic, left out when comparing an answer with the plan
+STOPWORDS = frozenset("""
+about above after again also although among and any are around because been before being below
+between both but can could current currently did does doing done down during each either else
+etc even ever every few for from further get gets getting had has have having here how however
+into its just keep kept know known less like likely made main make makes many may more most much
+must need needs not now off once one only other our ours out over own per quite rather really
+same see seen several shall should since some still such than that the their them then there
+these they thing things this those though through thus today too under until upon use used uses
+using very via want was way ways well were what when where whether which while who whom whose
+why will with within without would yes you your yours
+""".split())
+
+
+def content_terms(text: str) -> set:
+    """Topic-bearing words of a text, cut to a 6-letter stem so inflections match"""
+    return {word[:6] for word in re.findall(r"[a-z][a-z0-9+#/-]{2,}", text.lower()) if word not in STOPWORDS}
+
+
+def answer_diverges(answer: str, plan_context: List[str], threshold: float, min_terms: int) -> bool:
+    """Whether an answer has moved to topics the current follow-up plan does not cover.
+
+    Measured as the share of the answer's content terms found nowhere in the
+    plan's context (the answer it was built on, the question just answered and
+    the planned questions). Answers with fewer than min_terms content terms
+    never count: a short reply rarely redirects the interview, and a few words
+    say little about its topic.
+    """
+    terms = content_terms(answer)
+    if len(terms) < min_terms:
+        return False
+    novel = terms - content_terms("\n".join(plan_context))
+    return len(novel) / len(terms) >= threshold
+
+
+@st.cache_resource(show_spinner=False)
 def get_dynamic_question_manager() -> DynamicQuestionManagerEnhanced:
-    """Get or create question manager instance"""
-    if "question_manager" not in st.session_state:
-        st.session_state["question_manager"] = DynamicQuestionManagerEnhanced()
-    return st.session_state["question_manager"]
+    """Get the process-wide question manager instance.
+
+    The OpenAI client and tooltip cache are shared by all sessions rather
+    than rebuilt for every respondent. A manager whose client could not be
+    built is not stuck without one: each call retries the setup.
+    """
+    return DynamicQuestionManagerEnhanced()
 
 
 def generate_next_question(conversation_history: List[Dict]) -> str:
@@ -248,6 +349,13 @@ def generate_next_question(conversation_history: List[Dict]) -> str:
     return manager.generate_next_question(conversation_history)
 
 
+def generate_followup_batch(answer: str, k: int, asked: List[str],
+                            system_prompt: str, user_template: str) -> List[str]:
+    """Generate a ranked batch of follow-up questions"""
+    manager = get_dynamic_question_manager()
+    return manager.generate_followup_batch(answer, k, asked, system_prompt, user_template)
+
+
 def generate_tooltip(question: str, question_number: int) -> str:
     """Generate tooltip for question"""
     manager = get_dynamic_question_manager()
@@ -0,0 +1,161 @@
+"""
+Fake OpenAI Server Module
+Local OpenAI-compatible chat completions endpoint with configurable latency
+Author: Optimum AI Lab
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and any
+non-empty OPENAI_API_KEY. Run standalone:
+    python fake_openai_server.py --port 8765 --latency-ms 800 --jitter-ms 200
+"""
+
+import json
+import random
+import threading
+import time
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def synthetic_reply(messages: List[Dict]) -> str:
+    """Deterministic placeholder content shaped like what each call site expects"""
+    prompt = " ".join(str(m.get("content", "")) for m in messages)
+    lowered = prompt.lower()
+    seed = sum(ord(c) for c in prompt[-200:]) % 1000
+
+    # Report prompts quote survey text that mentions follow-ups, so check them first
+    if "json" in lowered and "executive_summary" in lowered:
+        return json.dumps({
+            "executive_summary": f"Synthetic executive summary ({seed}).",
+            "detailed_report": f"Synthetic detailed report ({seed}).",
+            "gap_analysis": f"Synthetic gap analysis ({seed}).",
+            "recommendations": f"Synthetic recommendations ({seed}).",
+        })
+    if "json" in lowered and "follow-up" in lowered:
+        return json.dumps([
+            f"Follow-up {seed}-{i}: which systems and owners are involved, and what metrics show the impact?"
+            for i in range(1, 6)
+        ])
+    if "tooltip" in lowered:
+        return f"Include systems, owners and metrics; e.g. job counts, SLAs and failure rates ({seed})."
+    if "follow-up question" in lowered or "next question" in lowered:
+        return f"Question {seed}: what are the specific systems, owners and SLAs involved in what you just described?"
+    return f"Synthetic response {seed}: key strengths, challenges and priority areas based on the survey."
+
+
+def build_completion(model: str, messages: List[Dict], content: str) -> Dict:
+    """Build a chat.completion response body"""
+    prompt_tokens = sum(estimate_tokens(str(m.get("content", ""))) for m in messages)
+    completion_tokens = estimate_tokens(content)
+    return {
+        "id": f"chatcmpl-fake-{int(time.time() * 1000)}-{random.randint(0, 9999)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server answering POST /v1/chat/completions"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 latency_ms: float = 500.0, jitter_ms: float = 0.0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "invalid JSON"}})
+                    return
+
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"unsupported path {self.path}"}})
+                    return
+
+                with server._lock:
+                    server.request_count += 1
+
+                delay = server.latency_ms + random.uniform(-server.jitter_ms, server.jitter_ms)
+                time.sleep(max(0.0, delay) / 1000.0)
+
+                if server.error_rate and random.random() < server.error_rate:
+                    self._send_json(500, {"error": {"message": "injected upstream error", "type": "server_error"}})
+                    return
+
+                messages = request.get("messages", [])
+                content = synthetic_reply(messages)
+                self._send_json(200, build_completion(request.get("model", "fake"), messages, content))
+
+        return Handler
+
+    def start(self) -> "FakeOpenAIServer":
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeOpenAIServer(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Fake OpenAI server listening on {fake.base_url}")
+    try:
+        fake._httpd.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
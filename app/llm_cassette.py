@@ -0,0 +1,139 @@
+"""
+LLM Cassette Module
+httpx transport that records, replays or synthesizes OpenAI API responses
+Author: Optimum AI Lab
+
+Imported only when LLM_TRANSPORT is not "live" (see llm_client.build_transport).
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+from typing import Dict, Optional
+
+import httpx
+
+
+def _normalize_text(value):
+    """Collapse whitespace in prompt text so cosmetic edits don't change keys"""
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip()
+    if isinstance(value, list):
+        return [_normalize_text(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize_text(v) for k, v in value.items()}
+    return value
+
+
+def request_key(path: str, body: bytes) -> str:
+    """Stable hash of a normalized API request"""
+    try:
+        payload = json.loads(body or b"{}")
+    except json.JSONDecodeError:
+        payload = {"raw": body.decode("utf-8", errors="replace")}
+
+    if isinstance(payload, dict):
+        # Fields that don't affect the completion content
+        for field in ("stream", "user", "timeout"):
+            payload.pop(field, None)
+        payload = _normalize_text(payload)
+
+    canonical = json.dumps({"path": path.rstrip("/"), "body": payload}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that records, replays or synthesizes API responses"""
+
+    def __init__(self, mode: str, cassette_dir: str, replay_latency: str = "original",
+                 synthetic_latency_ms: float = 0.0, inner: Optional[httpx.BaseTransport] = None):
+        self.mode = mode
+        self.cassette_dir = cassette_dir
+        self.replay_latency = replay_latency
+        self.synthetic_latency_ms = synthetic_latency_ms
+        self.inner = inner or httpx.HTTPTransport()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cassette_dir, key[:2], f"{key}.json")
+
+    def _load(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key), "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _save(self, key: str, cassette: Dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cassette, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def _sleep_for(self, recorded_ms: float):
+        if self.replay_latency == "original":
+            delay_ms = recorded_ms
+        else:
+            try:
+                delay_ms = float(self.replay_latency)
+            except ValueError:
+                delay_ms = 0.0
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+    @staticmethod
+    def _response(request: httpx.Request, status: int, body: str) -> httpx.Response:
+        return httpx.Response(
+            status,
+            headers={"content-type": "application/json"},
+            content=body.encode("utf-8"),
+            request=request,
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        key = request_key(request.url.path, body)
+
+        if self.mode in ("replay", "synthetic"):
+            cassette = self._load(key)
+            if cassette is not None:
+                self._sleep_for(cassette.get("latency_ms", 0.0))
+                return self._response(request, cassette["status"], cassette["body"])
+
+            if self.mode == "synthetic" and request.url.path.rstrip("/").endswith("/chat/completions"):
+                from fake_openai_server import synthetic_reply, build_completion
+                payload = json.loads(body or b"{}")
+                messages = payload.get("messages", [])
+                completion = build_completion(payload.get("model", "synthetic"), messages, synthetic_reply(messages))
+                if self.synthetic_latency_ms > 0:
+                    time.sleep(self.synthetic_latency_ms / 1000.0)
+                return self._response(request, 200, json.dumps(completion))
+
+            return self._response(request, 404, json.dumps({
+                "error": {"message": f"No cassette recorded for request {key}", "type": "cassette_miss"}
+            }))
+
+        start = time.perf_counter()
+        response = self.inner.handle_request(request)
+        response.read()
+        latency_ms = (time.perf_counter() - start) * 1000.0
+
+        # Only successful responses are worth replaying
+        if self.mode == "record" and response.status_code == 200:
+            self._save(key, {
+                "key": key,
+                "path": request.url.path,
+                "request": json.loads(body or b"{}"),
+                "status": response.status_code,
+                "body": response.text,
+                "latency_ms": round(latency_ms, 1),
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            })
+
+        return self._response(request, response.status_code, response.text)
+
+    def close(self):
+        self.inner.close()
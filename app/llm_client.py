@@ -0,0 +1,73 @@
+"""
+LLM Client Module
+Shared OpenAI client factory with a pluggable record/replay transport
+Author: Optimum AI Lab
+
+LLM_TRANSPORT selects how chat completion requests are served:
+    live       - call the API (default)
+    record     - call the API and save every response as a cassette
+    replay     - answer only from recorded cassettes (no network)
+    synthetic  - replay when recorded, otherwise synthesize a response
+
+Cassettes (llm_cassette.py) are keyed by a hash of the normalized request,
+so the same prompt replays the same answer regardless of whitespace or key
+order.
+LLM_REPLAY_LATENCY is "original" (sleep the recorded latency), a number of
+milliseconds, or "0" for no delay.
+"""
+
+import os
+from typing import Optional
+
+TRANSPORT_MODES = ("live", "record", "replay", "synthetic")
+OFFLINE_API_KEY = "sk-offline-cassette"
+
+
+def get_transport_mode() -> str:
+    """Configured LLM transport mode"""
+    mode = os.getenv("LLM_TRANSPORT", "live").strip().lower()
+    return mode if mode in TRANSPORT_MODES else "live"
+
+
+def get_api_key() -> str:
+    """API key for the current mode; offline modes don't need a real key"""
+    api_key = os.getenv("OPENAI_API_KEY", "")
+    if not api_key and get_transport_mode() in ("replay", "synthetic"):
+        return OFFLINE_API_KEY
+    return api_key
+
+
+def llm_available() -> bool:
+    """Whether LLM calls can be made (real key or offline transport)"""
+    return bool(get_api_key())
+
+
+def build_transport(mode: Optional[str] = None):
+    """Build the transport for a mode (None means httpx's default)"""
+    mode = mode or get_transport_mode()
+    if mode == "live":
+        return None
+    from llm_cassette import CassetteTransport
+    return CassetteTransport(
+        mode=mode,
+        cassette_dir=os.getenv("LLM_CASSETTE_DIR", "cassettes"),
+        replay_latency=os.getenv("LLM_REPLAY_LATENCY", "original").strip().lower(),
+        synthetic_latency_ms=float(os.getenv("LLM_SYNTHETIC_LATENCY_MS", "0") or 0),
+    )
+
+
+def get_openai_client(timeout: float = 60.0):
+    """Get an OpenAI client wired to the configured transport"""
+    # Imported here so config-only users of this module don't load the SDK
+    import httpx
+    from openai import OpenAI
+
+    api_key = get_api_key()
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY not set in environment")
+    transport = build_transport()
+    # Proxy, CA bundle and .netrc settings from the environment apply to live calls; with a
+    # cassette transport they are ignored, since env proxies would be mounted ahead of it
+    http_client = httpx.Client(timeout=timeout, trust_env=transport is None, transport=transport)
+    # Retries are handled by llm_resilience within each call site's deadline
+    return OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
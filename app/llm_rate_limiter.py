@@ -0,0 +1,278 @@
+"""
+LLM Rate Limiter Module
+Process-wide request/token buckets with priority classes for OpenAI traffic
+Author: Optimum AI Lab
+
+Interactive Step 2 questions, tooltips and report sections share one OpenAI
+quota. Callers acquire capacity before each request; waiting callers are
+served strictly by priority class (FIFO within a class), so a burst of report
+sections queues behind respondents instead of starving them. With
+backend = mongo, replicas additionally share per-minute counters in MongoDB,
+and lower-priority classes may only use `batch_share` of each window.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app_config import get_config
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_ASSIST = 1
+PRIORITY_BATCH = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_ASSIST: "assist",
+    PRIORITY_BATCH: "batch",
+}
+
+WAIT_WINDOW = 500
+
+
+class RateLimitWaitExceeded(Exception):
+    """Capacity did not free up within the caller's remaining budget"""
+
+
+def site_priority(site: str) -> int:
+    """Priority class of a call site"""
+    if site == "step2_question" or site.startswith("step2_"):
+        return PRIORITY_INTERACTIVE
+    if site in ("tooltip", "insights_summary"):
+        return PRIORITY_ASSIST
+    return PRIORITY_BATCH
+
+
+def estimate_request_tokens(messages, max_tokens: Optional[int]) -> int:
+    """Prompt tokens (~4 chars each) plus the completion allowance"""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in messages or [])
+    return prompt_chars // 4 + int(max_tokens or 256)
+
+
+class TokenBucket:
+    """Continuously refilling bucket; the level may go negative to repay under-estimates"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if available now)"""
+        self._refill()
+        # Requests larger than the bucket are allowed once it is full
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate if self.rate else float("inf")
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def drain(self):
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class MongoWindowBackend:
+    """Fixed one-minute windows shared across replicas through MongoDB counters"""
+
+    def __init__(self, rpm: int, tpm: int, batch_share: float, collection_name: str = "llm_rate_windows"):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.batch_share = batch_share
+        self.collection_name = collection_name
+        self._indexed = False
+
+    def _collection(self):
+        from db_client import get_collection
+        collection = get_collection(None, self.collection_name)
+        if not self._indexed:
+            # Old windows expire on their own
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def try_reserve(self, tokens: int, priority: int) -> float:
+        """Reserve in the current window; returns 0 on success or seconds until the next window"""
+        from pymongo import ReturnDocument
+
+        now = time.time()
+        window = int(now // 60)
+        share = 1.0 if priority == PRIORITY_INTERACTIVE else self.batch_share
+        collection = self._collection()
+        doc = collection.find_one_and_update(
+            {"_id": f"window:{window}"},
+            {"$inc": {"requests": 1, "tokens": tokens},
+             "$setOnInsert": {"expires_at": datetime.utcnow() + timedelta(minutes=5)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if doc["requests"] <= self.rpm * share and doc["tokens"] <= self.tpm * share:
+            return 0.0
+
+        # Over the shared budget: give the reservation back and wait for the next window
+        collection.update_one({"_id": f"window:{window}"}, {"$inc": {"requests": -1, "tokens": -tokens}})
+        return (window + 1) * 60 - now
+
+    def adjust(self, token_delta: int):
+        """Correct the current window once actual usage is known"""
+        if token_delta:
+            window = int(time.time() // 60)
+            self._collection().update_one({"_id": f"window:{window}"}, {"$inc": {"tokens": token_delta}})
+
+
+class RateLimiter:
+    """Priority-ordered admission against request and token buckets"""
+
+    def __init__(self, rpm: int, tpm: int, shared: Optional[MongoWindowBackend] = None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.shared = shared
+        self.config_version = 0
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._waits = {p: deque(maxlen=WAIT_WINDOW) for p in PRIORITY_NAMES}
+
+    def acquire(self, priority: int, tokens: int, timeout: float) -> float:
+        """Block until capacity is granted; returns the seconds spent waiting"""
+        start = time.monotonic()
+        deadline = start + timeout
+        ticket = (priority, next(self._seq))
+
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if self._queue[0] == ticket:
+                        wait = max(self.requests.time_until(1), self.tokens.time_until(tokens))
+                        if wait == 0.0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                    else:
+                        # Not at the head: re-check when the head moves
+                        wait = 0.25
+                    if remaining <= 0:
+                        raise RateLimitWaitExceeded(
+                            f"No LLM capacity for {PRIORITY_NAMES[priority]} traffic within {timeout:.1f}s"
+                        )
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+        # Cross-replica budget, checked after local admission
+        if self.shared is not None:
+            while True:
+                try:
+                    wait = self.shared.try_reserve(tokens, priority)
+                except Exception as e:
+                    print(f"Shared rate limit unavailable, using local limits only: {e}")
+                    break
+                if wait == 0.0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    raise RateLimitWaitExceeded("Shared LLM quota exhausted for this minute")
+                time.sleep(wait)
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._waits[priority].append(waited)
+        return waited
+
+    def configure(self, rpm: int, tpm: int, shared: Optional[MongoWindowBackend]):
+        """Apply new limits in place, keeping queued callers and current bucket levels"""
+        with self._cond:
+            for bucket, per_minute in ((self.requests, rpm), (self.tokens, tpm)):
+                bucket._refill()
+                bucket.capacity = float(per_minute)
+                bucket.rate = float(per_minute) / 60.0
+                bucket.level = min(bucket.level, bucket.capacity)
+            self.shared = shared
+            self._cond.notify_all()
+
+    def record_usage(self, estimated: int, actual: Optional[int]):
+        """Settle the token estimate against actual usage from the response"""
+        if actual is None:
+            return
+        delta = int(actual) - int(estimated)
+        with self._cond:
+            self.tokens.take(delta)
+        if self.shared is not None:
+            try:
+                self.shared.adjust(delta)
+            except Exception:
+                pass
+
+    def penalize(self):
+        """Upstream returned 429: stop admitting until the buckets refill"""
+        with self._cond:
+            self.requests.drain()
+            self.tokens.drain()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Queue depth and wait-time percentiles per priority class"""
+        with self._cond:
+            queued = [p for p, _ in self._queue]
+            waits = {p: sorted(samples) for p, samples in self._waits.items()}
+            levels = {"requests": round(self.requests.level, 1), "tokens": round(self.tokens.level)}
+
+        def pct(ordered, p):
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))] * 1000, 1)
+
+        return {
+            PRIORITY_NAMES[p]: {
+                "queued": queued.count(p),
+                "admitted": len(ordered),
+                "wait_p50_ms": pct(ordered, 50),
+                "wait_p95_ms": pct(ordered, 95),
+                "bucket_requests": levels["requests"],
+                "bucket_tokens": levels["tokens"],
+            }
+            for p, ordered in waits.items()
+        }
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """Process-wide limiter from [LLM_RATE_LIMIT], or None when disabled.
+
+    Limit changes in a reloaded config are applied to the existing limiter.
+    """
+    global _limiter
+    cfg = get_config()
+    settings = cfg.rate_limit
+    if not settings.enabled:
+        return None
+    with _limiter_lock:
+        if _limiter is None or _limiter.config_version != cfg.version:
+            rpm, tpm = settings.requests_per_minute, settings.tokens_per_minute
+            shared = None
+            if settings.backend == "mongo":
+                shared = MongoWindowBackend(rpm, tpm, settings.batch_share)
+            if _limiter is None:
+                _limiter = RateLimiter(rpm, tpm, shared)
+            else:
+                _limiter.configure(rpm, tpm, shared)
+            _limiter.config_version = cfg.version
+        return _limiter
@@ -0,0 +1,344 @@
+"""
+LLM Resilience Module
+Per-call-site deadlines, jittered retries, hedged requests and circuit breakers
+Author: Optimum AI Lab
+
+Every LLM call goes through call_with_resilience(site, fn), where fn(timeout)
+performs one request with the given per-attempt timeout in seconds. Policies
+are read from the [LLM_RESILIENCE] section of config.ini, with
+`<site>_<setting>` keys overriding `default_<setting>`.
+"""
+
+import time
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional
+
+import openai
+
+from app_config import get_config
+from llm_rate_limiter import get_rate_limiter, site_priority, estimate_request_tokens
+from model_router import resolve_request
+
+# Errors worth retrying: the upstream may answer on the next attempt
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+DEFAULT_POLICY = {
+    "deadline": 30.0,            # seconds for the whole call, retries included
+    "retries": 2,                # extra attempts after the first
+    "backoff": 0.5,              # base backoff in seconds, doubled per attempt
+    "hedge": False,              # send a second request after the p95 latency
+    "hedge_min_samples": 20,     # samples needed before p95 is trusted
+    "breaker_threshold": 5,      # consecutive failures that open the breaker
+    "breaker_reset": 30.0,       # seconds before a half-open probe is allowed
+}
+
+LATENCY_WINDOW = 200
+
+
+class DeadlineExceeded(Exception):
+    """The call site's latency budget ran out"""
+
+
+class CircuitOpenError(Exception):
+    """The call site's breaker is open; callers should fall back immediately"""
+
+
+class LatencyTracker:
+    """Recent successful-call latencies for one call site"""
+
+    def __init__(self):
+        self._samples = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class CircuitBreaker:
+    """Closed -> open after N consecutive failures -> half-open probe after a cool-down"""
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            # Half-open: let a single probe through
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Let another half-open probe through without changing breaker state"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_breaker_config_version = 0
+_registry_lock = threading.Lock()
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+_usage_collectors: ContextVar[tuple] = ContextVar("llm_usage_collectors", default=())
+_usage_lock = threading.Lock()
+
+
+def get_policy(site: str) -> Dict[str, Any]:
+    """Resolve the resilience policy for a call site from config"""
+    cfg = get_config()
+    policy = {}
+    for setting, default in DEFAULT_POLICY.items():
+        raw = cfg.get("LLM_RESILIENCE", f"{site}_{setting}",
+                      fallback=cfg.get("LLM_RESILIENCE", f"default_{setting}", fallback=None))
+        if raw is None:
+            policy[setting] = default
+        elif isinstance(default, bool):
+            policy[setting] = str(raw).strip().lower() in ("1", "true", "yes", "on")
+        else:
+            policy[setting] = type(default)(raw)
+    return policy
+
+
+def get_latency_tracker(site: str) -> LatencyTracker:
+    with _registry_lock:
+        tracker = _trackers.get(site)
+        if tracker is None:
+            tracker = _trackers[site] = LatencyTracker()
+        return tracker
+
+
+def get_breaker(site: str) -> CircuitBreaker:
+    global _breaker_config_version
+    version = get_config().version
+    with _registry_lock:
+        if version != _breaker_config_version:
+            # Reloaded config: retune existing breakers without resetting their state
+            for name, existing in _breakers.items():
+                policy = get_policy(name)
+                existing.threshold = int(policy["breaker_threshold"])
+                existing.reset_seconds = float(policy["breaker_reset"])
+            _breaker_config_version = version
+        breaker = _breakers.get(site)
+        if breaker is None:
+            policy = get_policy(site)
+            breaker = _breakers[site] = CircuitBreaker(
+                int(policy["breaker_threshold"]), float(policy["breaker_reset"])
+            )
+        return breaker
+
+
+def is_circuit_open(site: str) -> bool:
+    """True while the site's breaker rejects calls (callers can skip straight to fallbacks)"""
+    return get_breaker(site).state == "open"
+
+
+def _attempt(fn: Callable[[float], Any], timeout: float, policy: Dict, tracker: LatencyTracker):
+    """One logical attempt, optionally hedged with a second request after p95"""
+    hedge_after = None
+    if policy["hedge"] and tracker.count() >= policy["hedge_min_samples"]:
+        hedge_after = tracker.percentile(95)
+
+    if hedge_after is None or hedge_after >= timeout:
+        return fn(timeout)
+
+    started = time.monotonic()
+    # Each request runs in a copy of the caller's context so collect_usage() sees its tokens
+    primary = _hedge_pool.submit(copy_context().run, fn, timeout)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+
+    remaining = timeout - (time.monotonic() - started)
+    hedge = _hedge_pool.submit(copy_context().run, fn, max(0.1, remaining))
+    pending = {primary, hedge}
+    last_error = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, timeout - (time.monotonic() - started)),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            try:
+                # The losing request is left to finish in the background
+                return future.result()
+            except Exception as e:
+                last_error = e
+    if last_error is not None:
+        raise last_error
+    raise DeadlineExceeded("Neither the primary nor the hedged request finished in time")
+
+
+def call_with_resilience(site: str, fn: Callable[[float], Any]) -> Any:
+    """Run fn(timeout) within the site's deadline, retrying and hedging per policy.
+
+    Raises CircuitOpenError without calling fn while the breaker is open, and
+    DeadlineExceeded when the budget runs out between attempts.
+    """
+    policy = get_policy(site)
+    breaker = get_breaker(site)
+    tracker = get_latency_tracker(site)
+
+    if not breaker.allow():
+        raise CircuitOpenError(f"LLM circuit open for {site}")
+
+    deadline = time.monotonic() + policy["deadline"]
+    attempt = 0
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            breaker.record_failure()
+            raise DeadlineExceeded(f"{site} exceeded its {policy['deadline']:.1f}s budget")
+
+        start = time.monotonic()
+        try:
+            response = _attempt(fn, remaining, policy, tracker)
+        except DeadlineExceeded:
+            breaker.record_failure()
+            raise
+        except RETRYABLE_ERRORS:
+            attempt += 1
+            remaining = deadline - time.monotonic()
+            if attempt > policy["retries"] or remaining <= 0:
+                breaker.record_failure()
+                raise
+            # Full jitter keeps retrying sessions from synchronizing
+            backoff = policy["backoff"] * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            time.sleep(min(backoff, max(0.0, remaining - 0.05)))
+            continue
+        except Exception:
+            # Non-retryable (bad request, auth): not an upstream health signal
+            breaker.release_probe()
+            raise
+
+        tracker.add(time.monotonic() - start)
+        breaker.record_success()
+        return response
+
+
+def chat_completion(client, site: str, messages, **params):
+    """Create a chat completion for a call site through the router, rate limiter and resilience policy.
+
+    Model, temperature, max_tokens and the per-attempt timeout come from the
+    site's route; explicit keyword arguments override them.
+    """
+    route = resolve_request(site, get_latency_tracker(site))
+    route_timeout = route.pop("timeout")
+    params = {**route, **params}
+    limiter = get_rate_limiter()
+    estimated = estimate_request_tokens(messages, params.get("max_tokens"))
+
+    def attempt(timeout: float):
+        timeout = min(timeout, route_timeout)
+        if limiter is not None:
+            # Queue wait is taken out of this attempt's timeout
+            timeout -= limiter.acquire(site_priority(site), estimated, timeout)
+        try:
+            response = client.chat.completions.create(messages=messages, timeout=max(0.1, timeout), **params)
+        except openai.RateLimitError:
+            if limiter is not None:
+                limiter.penalize()
+            raise
+        usage = getattr(response, "usage", None)
+        if limiter is not None:
+            limiter.record_usage(estimated, getattr(usage, "total_tokens", None))
+        _collect_usage(usage)
+        return response
+
+    return call_with_resilience(site, attempt)
+
+
+@contextmanager
+def collect_usage():
+    """Accumulate call count and token usage of every completion made inside the block.
+
+    Collectors nest, and threads started with a copy of the current context
+    report into the same totals.
+    """
+    totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    token = _usage_collectors.set(_usage_collectors.get() + (totals,))
+    try:
+        yield totals
+    finally:
+        _usage_collectors.reset(token)
+
+
+def _collect_usage(usage):
+    collectors = _usage_collectors.get()
+    if not collectors:
+        return
+    with _usage_lock:
+        for totals in collectors:
+            totals["calls"] += 1
+            for field in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                totals[field] += int(getattr(usage, field, 0) or 0)
+
+
+def get_resilience_snapshot() -> Dict[str, Dict]:
+    """Per-site latency percentiles and breaker state, for dashboards"""
+    with _registry_lock:
+        sites = set(_trackers) | set(_breakers)
+    snapshot = {}
+    for site in sorted(sites):
+        tracker = get_latency_tracker(site)
+        p50, p95 = tracker.percentile(50), tracker.percentile(95)
+        snapshot[site] = {
+            "samples": tracker.count(),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "breaker": get_breaker(site).state,
+        }
+    return snapshot
@@ -0,0 +1,260 @@
+"""
+Load Test Harness
+Drives N simulated respondents through the survey with Streamlit's AppTest
+Author: Optimum AI Lab
+
+Each respondent logs in, answers Step 1, the 15 dynamic Step 2 questions and
+Step 3, then submits. OpenAI is replaced by a local fake server with
+configurable latency and MongoDB by mongomock, so runs are offline and
+repeatable. Concurrency is ramped through the given levels and each level
+reports throughput, per-step latency percentiles and process CPU/RSS.
+
+Usage (from the repository root):
+    python app/loadtest.py --levels 1,5,10,25 --latency-ms 800 --jitter-ms 200
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+APP_PATH = os.path.join(APP_DIR, "app.py")
+
+SAMPLE_ANSWER = (
+    "We run about 3000 Control-M jobs feeding an Oracle warehouse; failures are mostly late "
+    "upstream files and data quality breaks, detected by the on-call team and re-run manually."
+)
+STEP2_QUESTIONS = 15
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is the peak, in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ResourceSampler:
+    """Samples process CPU time and RSS while a concurrency level runs"""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, current_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        self._cpu_start = usage.ru_utime + usage.ru_stime
+        self._wall_start = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.cpu_seconds = usage.ru_utime + usage.ru_stime - self._cpu_start
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.peak_rss = max(self.peak_rss, current_rss_bytes())
+
+
+class SimulatedRespondent:
+    """One respondent completing the survey through AppTest"""
+
+    def __init__(self, timeout: float = 120.0):
+        from streamlit.testing.v1 import AppTest
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.timings: Dict[str, List[float]] = {}
+
+    def _timed(self, step: str, action):
+        start = time.perf_counter()
+        action()
+        self.timings.setdefault(step, []).append(time.perf_counter() - start)
+        if self.at.exception:
+            raise RuntimeError(f"{step}: {self.at.exception[0].value}")
+
+    def _button(self, label: str):
+        for button in self.at.button:
+            if button.label == label:
+                return button
+        return None
+
+    def _click(self, label: str):
+        button = self._button(label)
+        if button is None:
+            raise RuntimeError(f"Button not found: {label}")
+        button.click().run()
+
+    def _fill(self, key_prefix: str):
+        for area in self.at.text_area:
+            if area.key and area.key.startswith(key_prefix) and not area.value:
+                area.input(SAMPLE_ANSWER)
+
+    def _complete_questionnaire(self, key_prefix: str, single_page_button: str):
+        # Paged mode submits one form per category page
+        while self._button("Next page →") is not None:
+            self._fill(key_prefix)
+            self._click("Next page →")
+        self._fill(key_prefix)
+        if self._button("Complete →") is not None:
+            self._click("Complete →")
+        else:
+            self._click(single_page_button)
+
+    def run(self) -> Dict[str, List[float]]:
+        """Walk the full survey; returns per-step latency samples"""
+        at = self.at
+        self._timed("load", lambda: at.run())
+
+        def login():
+            at.text_input(key="login_userid").input("user")
+            at.text_input(key="login_password").input("user123$")
+            self._click("Login")
+        self._timed("login", login)
+
+        self._timed("start", lambda: self._click("Start Survey"))
+        self._timed("step1", lambda: self._complete_questionnaire("step1_", "Complete Step 1 →"))
+
+        for i in range(STEP2_QUESTIONS):
+            def next_question(i=i):
+                at.text_area(key=f"section2_answer_{i}").input(f"{SAMPLE_ANSWER} (answer {i + 1})")
+                self._click("Next →")
+            self._timed("step2_next", next_question)
+        self._timed("step2_complete", lambda: self._click("Complete Step 2 →"))
+
+        self._timed("step3", lambda: self._complete_questionnaire("step3_", "Complete Step 3 →"))
+        self._timed("submit", lambda: self._click("Submit Survey"))
+        return self.timings
+
+
+def run_level(concurrency: int, timeout: float) -> Dict:
+    """Run `concurrency` respondents at once and summarize"""
+    results: List[Dict[str, List[float]]] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def respondent(_):
+        try:
+            timings = SimulatedRespondent(timeout).run()
+            with lock:
+                results.append(timings)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+
+    with ResourceSampler() as sampler:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(respondent, range(concurrency)))
+
+    steps: Dict[str, List[float]] = {}
+    for timings in results:
+        for step, samples in timings.items():
+            steps.setdefault(step, []).extend(samples)
+
+    return {
+        "concurrency": concurrency,
+        "completed": len(results),
+        "failed": len(errors),
+        "errors": errors[:5],
+        "elapsed_s": round(sampler.wall_seconds, 2),
+        "throughput_per_min": round(len(results) / sampler.wall_seconds * 60, 2) if sampler.wall_seconds else 0.0,
+        "cpu_percent": round(sampler.cpu_seconds / sampler.wall_seconds * 100, 1) if sampler.wall_seconds else 0.0,
+        "peak_rss_mb": round(sampler.peak_rss / (1024 * 1024), 1),
+        "latency_ms": {
+            step: {
+                "p50": round(percentile(samples, 50) * 1000, 1),
+                "p95": round(percentile(samples, 95) * 1000, 1),
+                "p99": round(percentile(samples, 99) * 1000, 1),
+                "n": len(samples),
+            }
+            for step, samples in steps.items()
+        },
+    }
+
+
+def print_level(report: Dict):
+    """Print one level's summary"""
+    print(
+        f"\n=== concurrency {report['concurrency']}: {report['completed']} completed, "
+        f"{report['failed']} failed in {report['elapsed_s']}s "
+        f"({report['throughput_per_min']} surveys/min, CPU {report['cpu_percent']}%, "
+        f"peak RSS {report['peak_rss_mb']} MB)"
+    )
+    print(f"{'step':<16}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step, stats in report["latency_ms"].items():
+        print(f"{step:<16}{stats['n']:>6}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}")
+    for error in report["errors"]:
+        print(f"  error: {error}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Concurrent-respondent load test")
+    parser.add_argument("--levels", default="1,5,10", help="Comma-separated concurrency levels")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Fake LLM latency")
+    parser.add_argument("--jitter-ms", type=float, default=200.0, help="Fake LLM latency jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake LLM 5xx rate")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-rerun AppTest timeout")
+    parser.add_argument("--mongo-uri", default=None, help="Use a real MongoDB instead of mongomock")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    from fake_openai_server import FakeOpenAIServer
+
+    fake = FakeOpenAIServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            error_rate=args.error_rate).start()
+    os.environ["OPENAI_BASE_URL"] = fake.base_url
+    os.environ["OPENAI_API_KEY"] = "sk-loadtest"
+    if args.mongo_uri:
+        os.environ["MONGODB_URI"] = args.mongo_uri
+    else:
+        os.environ["MONGO_BACKEND"] = "mongomock"
+
+    # load_config/load_questions resolve paths relative to the repository root
+    os.chdir(REPO_ROOT)
+
+    reports = []
+    try:
+        for level in [int(x) for x in args.levels.split(",") if x.strip()]:
+            report = run_level(level, args.timeout)
+            report["llm_requests"] = fake.request_count
+            reports.append(report)
+            print_level(report)
+    finally:
+        fake.stop()
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(reports, f, indent=2)
+        print(f"\nResults written to {args.json_path}")
+
+    return 0 if all(r["failed"] == 0 for r in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, APP_DIR)
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Survey Migration
+Rewrites legacy survey documents in the compact schema 2 layout
+Author: Optimum AI Lab
+
+Documents without a schema_version are converted in batches with unordered
+bulk updates. Each converted document is decoded again and compared with its
+legacy decoding before it is written, so question text and answers are
+preserved exactly; documents that do not round-trip are skipped and reported.
+The filter on schema_version makes reruns and concurrent runs safe.
+
+Usage (from the repository root):
+    python app/migrate_surveys.py --dry-run
+    python app/migrate_surveys.py --batch-size 500
+"""
+
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from typing import List, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Migrate survey documents to the compact schema")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per bulk write")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many documents (0 = all)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the size reduction without writing")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    import bson
+    from pymongo import UpdateOne
+    from db_client import get_collection, close_clients
+    from question_catalog import get_current_catalog, register_catalog
+    from survey_schema import SCHEMA_VERSION, compact_legacy, decode_answers
+
+    collection = get_collection()
+    catalog = get_current_catalog()
+    if not args.dry_run:
+        register_catalog(catalog)
+
+    query = {"schema_version": {"$exists": False}}
+    cursor = collection.find(query).batch_size(args.batch_size)
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+
+    started = time.perf_counter()
+    migrated = skipped = bytes_before = bytes_after = 0
+    batch = []
+
+    def flush():
+        if batch and not args.dry_run:
+            collection.bulk_write(batch, ordered=False)
+        batch.clear()
+
+    for doc in cursor:
+        set_fields, unset = compact_legacy(doc, catalog)
+        compact = {k: v for k, v in doc.items() if k not in unset}
+        compact.update(set_fields)
+
+        if decode_answers(compact, catalog) != decode_answers(doc, catalog):
+            print(f"Skipping {doc['_id']}: compact form does not round-trip")
+            skipped += 1
+            continue
+
+        bytes_before += len(bson.encode(doc))
+        bytes_after += len(bson.encode(compact))
+        update = {"$set": {**set_fields, "updated_at": datetime.utcnow()}}
+        if unset:
+            update["$unset"] = unset
+        batch.append(UpdateOne({"_id": doc["_id"], **query}, update))
+        migrated += 1
+        if len(batch) >= args.batch_size:
+            flush()
+            print(f"{migrated} documents migrated...")
+    flush()
+
+    elapsed = time.perf_counter() - started
+    verb = "would be migrated" if args.dry_run else "migrated"
+    print(f"\n{migrated} documents {verb} to schema {SCHEMA_VERSION} (catalog {catalog.version}), "
+          f"{skipped} skipped, in {elapsed:.1f}s")
+    if migrated:
+        print(f"Size: {bytes_before / 1024:.1f} KB -> {bytes_after / 1024:.1f} KB "
+              f"({1 - bytes_after / bytes_before:.0%} smaller, {bytes_before / migrated:.0f} -> "
+              f"{bytes_after / migrated:.0f} bytes per survey)")
+    close_clients()
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, APP_DIR)
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Model Router Module
+Maps each LLM call site to a model, sampling settings and timeout from config
+Author: Optimum AI Lab
+
+Settings resolve in this order:
+    [MODEL_ROUTING] <site>_<setting>
+    [TOOLTIP_GENERATION] temperature / max_tokens   (tooltip site only)
+    SITE_DEFAULTS                                   (the values each call site was tuned with)
+    [OPENAI] model / temperature / max_tokens / timeout
+A route with latency_budget_ms switches to its fast_model while the site's
+observed p95 latency is over budget, and switches back once p95 falls below
+recover_ratio of the budget.
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from app_config import get_config
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# Sites whose defaults come from a dedicated config section
+SECTION_DEFAULTS = {
+    "tooltip": "TOOLTIP_GENERATION",
+}
+
+# Built-in per-site settings; config only overrides them, so a trimmed or
+# older config.ini never truncates a report section to the [OPENAI] max_tokens
+SITE_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "step2_question": {"temperature": 0.8, "max_tokens": 200, "timeout": 8},
+    "step2_followups": {"max_tokens": 800, "timeout": 15},
+    "tooltip": {"temperature": 0.5, "max_tokens": 150, "timeout": 5},
+    "insights_summary": {"temperature": 0.7, "max_tokens": 400},
+    "report_executive_summary": {"temperature": 0.3, "max_tokens": 1500, "timeout": 90},
+    "report_detailed_report": {"temperature": 0.3, "max_tokens": 4000, "timeout": 180},
+    "report_gap_analysis": {"temperature": 0.3, "max_tokens": 2000, "timeout": 120},
+    "report_recommendations": {"temperature": 0.3, "max_tokens": 3000, "timeout": 150},
+    "report_structured": {"temperature": 0.3, "max_tokens": 12000, "timeout": 240},
+    "report_condense": {"temperature": 0.2, "max_tokens": 900, "timeout": 60},
+    "report_amend": {"temperature": 0.2, "max_tokens": 1500, "timeout": 90},
+}
+
+
+class Route:
+    """Resolved settings for one call site"""
+
+    __slots__ = ("site", "model", "fast_model", "temperature", "max_tokens", "timeout", "latency_budget_ms")
+
+    def __init__(self, site: str, model: str, fast_model: str, temperature: float, max_tokens: int,
+                 timeout: float, latency_budget_ms: Optional[float]):
+        self.site = site
+        self.model = model
+        self.fast_model = fast_model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.latency_budget_ms = latency_budget_ms
+
+
+_degraded: Dict[str, bool] = {}
+_active_models: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def _unset(value: Any) -> bool:
+    return value is None or str(value).strip() == ""
+
+
+def _setting(cfg, site: str, setting: str, fallback: Any) -> Any:
+    """Per-route override, then the site's section, then SITE_DEFAULTS, then [OPENAI]"""
+    value = cfg.get("MODEL_ROUTING", f"{site}_{setting}", fallback=None)
+    if _unset(value) and site in SECTION_DEFAULTS:
+        value = cfg.get(SECTION_DEFAULTS[site], setting, fallback=None)
+    if _unset(value):
+        value = SITE_DEFAULTS.get(site, {}).get(setting)
+    if _unset(value):
+        value = cfg.get("OPENAI", setting, fallback=None)
+    return fallback if _unset(value) else value
+
+
+def get_route(site: str) -> Route:
+    """Configured route for a call site"""
+    cfg = get_config()
+    model = str(_setting(cfg, site, "model", DEFAULT_MODEL)).strip()
+    fast_model = cfg.get("MODEL_ROUTING", f"{site}_fast_model",
+                         fallback=cfg.get("MODEL_ROUTING", "fast_model", fallback=model)).strip()
+    budget = cfg.get("MODEL_ROUTING", f"{site}_latency_budget_ms", fallback=None)
+    return Route(
+        site=site,
+        model=model,
+        fast_model=fast_model or model,
+        temperature=float(_setting(cfg, site, "temperature", 0.7)),
+        max_tokens=int(_setting(cfg, site, "max_tokens", 250)),
+        timeout=float(_setting(cfg, site, "timeout", 30)),
+        latency_budget_ms=float(budget) if budget else None,
+    )
+
+
+def select_model(route: Route, tracker) -> str:
+    """Primary model, or the fast model while the route's p95 is over budget"""
+    if route.latency_budget_ms is None or route.fast_model == route.model:
+        return route.model
+
+    cfg = get_config()
+    min_samples = cfg.getint("MODEL_ROUTING", "min_samples", fallback=20)
+    recover_ratio = cfg.getfloat("MODEL_ROUTING", "recover_ratio", fallback=0.7)
+
+    with _lock:
+        degraded = _degraded.get(route.site, False)
+        if tracker.count() >= min_samples:
+            p95_ms = tracker.percentile(95) * 1000
+            if not degraded and p95_ms > route.latency_budget_ms:
+                degraded = True
+                print(f"Model router: {route.site} p95 {p95_ms:.0f}ms over budget, using {route.fast_model}")
+            elif degraded and p95_ms < route.latency_budget_ms * recover_ratio:
+                degraded = False
+                print(f"Model router: {route.site} p95 {p95_ms:.0f}ms recovered, using {route.model}")
+        _degraded[route.site] = degraded
+        model = route.fast_model if degraded else route.model
+        _active_models[route.site] = model
+        return model
+
+
+def resolve_request(site: str, tracker) -> Dict[str, Any]:
+    """Request parameters and per-attempt timeout for a call site"""
+    route = get_route(site)
+    return {
+        "model": select_model(route, tracker),
+        "temperature": route.temperature,
+        "max_tokens": route.max_tokens,
+        "timeout": route.timeout,
+    }
+
+
+def get_routing_snapshot() -> Dict[str, Dict]:
+    """Active model per site seen so far, for dashboards"""
+    with _lock:
+        sites = dict(_active_models)
+        degraded = dict(_degraded)
+    snapshot = {}
+    for site, model in sorted(sites.items()):
+        route = get_route(site)
+        snapshot[site] = {
+            "model": model,
+            "primary_model": route.model,
+            "fast_model": route.fast_model,
+            "latency_budget_ms": route.latency_budget_ms,
+            "degraded": degraded.get(site, False),
+        }
+    return snapshot
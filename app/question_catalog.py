@@ -0,0 +1,239 @@
+"""
+Question Catalog Module
+Fixed survey questions (Step 1 and Step 3) and versioned snapshots of their text
+Author: Optimum AI Lab
+
+Compact survey documents store fixed questions by id plus the catalog version
+they were answered against. Every catalog version is saved once to the
+`question_catalogs` collection, so an old document still decodes to the exact
+question text its respondent saw after the questions are edited.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app_config import get_config
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Same lookup order as the app's question loader, plus the repository's data directory
+QUESTION_FILE_PATHS = [
+    "questions_fixed.json",
+    "./questions_fixed.json",
+    "data/questions_fixed.json",
+    "../data/questions_fixed.json",
+    os.path.join(os.path.dirname(APP_DIR), "data", "questions_fixed.json"),
+]
+
+CATALOG_COLLECTION = "question_catalogs"
+
+# AI/GenAI discovery questions (Step 3), organized by category
+AI_GENAI_QUESTIONS = [
+    # Infrastructure (1-5)
+    {
+        "id": "AI_Q1",
+        "num": 1,
+        "category": "INFRASTRUCTURE",
+        "text": "What GPU and computing infrastructure do you currently have available, and is it sufficient to support GenAI model training and inference?",
+        "required": True
+    },
+    {
+        "id": "AI_Q2",
+        "num": 2,
+        "category": "INFRASTRUCTURE",
+        "text": "Do you have access to commercial LLMs (OpenAI, Azure OpenAI, Anthropic Claude, Google Gemini) or are you planning to use open-source models (Llama, Mistral, etc.)?",
+        "required": True
+    },
+    {
+        "id": "AI_Q3",
+        "num": 3,
+        "category": "INFRASTRUCTURE",
+        "text": "Which cloud environments (AWS, Azure, GCP) are approved for your organization, and do you have access to AI/ML platforms like AWS SageMaker, Azure AI Foundry, or Google Vertex AI?",
+        "required": True
+    },
+    {
+        "id": "AI_Q4",
+        "num": 4,
+        "category": "INFRASTRUCTURE",
+        "text": "What data storage infrastructure do you have (data lakes, data warehouses, databases), and can it support the data volumes required for GenAI model training and inference?",
+        "required": True
+    },
+    {
+        "id": "AI_Q5",
+        "num": 5,
+        "category": "INFRASTRUCTURE",
+        "text": "Do you have monitoring, logging, and observability infrastructure in place to support AI/GenAI model monitoring and governance?",
+        "required": True
+    },
+    # Governance & Approvals (6-10)
+    {
+        "id": "AI_Q6",
+        "num": 6,
+        "category": "GOVERNANCE & APPROVALS",
+        "text": "Does your organization have an AI Council, AI Governance Board, or similar body that reviews and approves AI/GenAI projects before they start?",
+        "required": True
+    },
+    {
+        "id": "AI_Q7",
+        "num": 7,
+        "category": "GOVERNANCE & APPROVALS",
+        "text": "Before starting an AI/GenAI project, do we need to get approval from the Security team, Compliance team, or other governance bodies? What's the typical lead time?",
+        "required": True
+    },
+    {
+        "id": "AI_Q8",
+        "num": 8,
+        "category": "GOVERNANCE & APPROVALS",
+        "text": "What data privacy and regulatory compliance requirements apply to AI/GenAI projects, especially regarding data usage, model transparency, and audit trails?",
+        "required": True
+    },
+    {
+        "id": "AI_Q9",
+        "num": 9,
+        "category": "GOVERNANCE & APPROVALS",
+        "text": "Does your organization have an AI Ethics framework or Responsible AI guidelines that AI/GenAI projects must follow?",
+        "required": True
+    },
+    {
+        "id": "AI_Q10",
+        "num": 10,
+        "category": "GOVERNANCE & APPROVALS",
+        "text": "What change management and organizational approval processes are required before deploying AI/GenAI solutions to production?",
+        "required": True
+    },
+    # Frameworks & Standards (11-15)
+    {
+        "id": "AI_Q11",
+        "num": 11,
+        "category": "FRAMEWORKS & STANDARDS",
+        "text": "Is there a common framework or standard that needs to be adopted to build GenAI applications, or can we write our own framework?",
+        "required": True
+    },
+    {
+        "id": "AI_Q12",
+        "num": 12,
+        "category": "FRAMEWORKS & STANDARDS",
+        "text": "Do you have a model registry or model management system in place, and what are the requirements for model versioning, documentation, and governance?",
+        "required": True
+    },
+    {
+        "id": "AI_Q13",
+        "num": 13,
+        "category": "FRAMEWORKS & STANDARDS",
+        "text": "What testing, validation, and quality assurance standards apply to AI/GenAI models before they're deployed to production?",
+        "required": True
+    },
+    {
+        "id": "AI_Q14",
+        "num": 14,
+        "category": "FRAMEWORKS & STANDARDS",
+        "text": "What documentation and audit trail requirements apply to AI/GenAI projects, especially for regulatory compliance and internal governance?",
+        "required": True
+    },
+    {
+        "id": "AI_Q15",
+        "num": 15,
+        "category": "FRAMEWORKS & STANDARDS",
+        "text": "How should AI/GenAI projects integrate with your existing development, testing, and deployment processes (CI/CD, DevOps)?",
+        "required": True
+    }
+]
+
+
+def load_fixed_questions(cfg=None) -> List[Dict]:
+    """Step 1 questions from config.ini [QUESTIONS], else questions_fixed.json"""
+    cfg = cfg if cfg is not None else get_config()
+    questions = []
+    if cfg.has_section("QUESTIONS"):
+        for key in cfg.options("QUESTIONS"):
+            try:
+                questions.append(json.loads(cfg.get("QUESTIONS", key)))
+            except json.JSONDecodeError:
+                pass
+    if questions:
+        return questions
+    for path in QUESTION_FILE_PATHS:
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+    return []
+
+
+class QuestionCatalog:
+    """Question id -> text for the fixed steps, identified by a content hash"""
+
+    __slots__ = ("version", "step1", "step3")
+
+    def __init__(self, step1: Dict[str, str], step3: Dict[str, str], version: Optional[str] = None):
+        self.step1 = step1
+        self.step3 = step3
+        self.version = version or hashlib.sha256(
+            json.dumps([list(step1.items()), list(step3.items())]).encode("utf-8")
+        ).hexdigest()[:12]
+
+    def texts(self, step: str) -> Dict[str, str]:
+        return self.step1 if step == "step1" else self.step3
+
+
+_catalogs: Dict[str, QuestionCatalog] = {}
+_registered = set()
+_current = None  # (config version, QuestionCatalog)
+_lock = threading.Lock()
+
+
+def get_current_catalog() -> QuestionCatalog:
+    """Catalog of the questions the app is serving now"""
+    global _current
+    cfg = get_config()
+    with _lock:
+        if _current is None or _current[0] != cfg.version:
+            catalog = QuestionCatalog(
+                {q.get("id"): q.get("text", "") for q in load_fixed_questions(cfg)},
+                {q["id"]: q["text"] for q in AI_GENAI_QUESTIONS},
+            )
+            _catalogs[catalog.version] = catalog
+            _current = (cfg.version, catalog)
+        return _current[1]
+
+
+def register_catalog(catalog: QuestionCatalog):
+    """Save a catalog version to MongoDB (once per process)"""
+    if catalog.version in _registered:
+        return
+    from db_client import get_collection
+    get_collection(None, CATALOG_COLLECTION).update_one(
+        {"_id": catalog.version},
+        {"$setOnInsert": {"step1": list(catalog.step1.items()), "step3": list(catalog.step3.items()),
+                          "created_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    _registered.add(catalog.version)
+
+
+def get_catalog(version: Optional[str]) -> QuestionCatalog:
+    """The catalog a document was encoded with (the current one if it cannot be found)"""
+    current = get_current_catalog()
+    if not version or version == current.version:
+        return current
+    with _lock:
+        catalog = _catalogs.get(version)
+    if catalog is not None:
+        return catalog
+    try:
+        from db_client import get_collection
+        doc = get_collection(None, CATALOG_COLLECTION).find_one({"_id": version})
+    except Exception as e:
+        print(f"Question catalog {version} unavailable: {e}")
+        doc = None
+    if doc is None:
+        print(f"Question catalog {version} not found; using current question text")
+        return current
+    # Catalog versions are immutable, so they are cached for the life of the process
+    catalog = QuestionCatalog(dict(doc["step1"]), dict(doc["step3"]), version)
+    with _lock:
+        _catalogs[version] = catalog
+    return catalog
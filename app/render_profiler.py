@@ -0,0 +1,270 @@
+"""
+Render Profiler Module
+Opt-in per-rerun timing of Streamlit render functions, aggregated per page
+Author: Optimum AI Lab
+
+Enable with the RENDER_PROFILE environment variable:
+    RENDER_PROFILE=timing        # perf_counter timings only (cheap, staging-safe)
+    RENDER_PROFILE=cprofile      # timings + cProfile dump of sampled reruns
+    RENDER_PROFILE=pyinstrument  # timings + pyinstrument HTML of sampled reruns
+
+When RENDER_PROFILE is unset the decorators return the original functions,
+so production reruns pay nothing.
+"""
+
+import os
+import time
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+PROFILE_MODE = os.getenv("RENDER_PROFILE", "").strip().lower()
+PROFILE_ENABLED = PROFILE_MODE in ("1", "true", "timing", "cprofile", "pyinstrument")
+PROFILE_DIR = os.getenv("RENDER_PROFILE_DIR", "profiles")
+# Only every Nth rerun is captured by cProfile/pyinstrument; timings cover all reruns
+PROFILE_EXPORT_EVERY = max(1, int(os.getenv("RENDER_PROFILE_EVERY", "20") or 20))
+
+# Number of recent samples kept per (page, function) for percentile estimates
+SAMPLE_WINDOW = 200
+
+_lock = threading.Lock()
+_page_stats: Dict[str, Dict[str, "TimingStats"]] = {}
+_last_exports: deque = deque(maxlen=10)
+_rerun_counter = 0
+
+# Streamlit runs each session's script in its own thread
+_local = threading.local()
+
+
+class TimingStats:
+    """Running timing statistics for one render function on one page"""
+
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def add(self, elapsed: float):
+        """Record one elapsed time in seconds"""
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.samples.append(elapsed)
+
+    def percentile(self, pct: float) -> float:
+        """Percentile over the recent sample window"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[idx]
+
+    def as_row(self, name: str) -> Dict:
+        """Summarize as a display row (milliseconds)"""
+        mean = self.total / self.count if self.count else 0.0
+        return {
+            "Function": name,
+            "Calls": self.count,
+            "Mean (ms)": round(mean * 1000, 2),
+            "p50 (ms)": round(self.percentile(50) * 1000, 2),
+            "p95 (ms)": round(self.percentile(95) * 1000, 2),
+            "Max (ms)": round(self.max * 1000, 2),
+        }
+
+
+def _record(name: str, elapsed: float):
+    """Attach a timing to the current rerun, or straight to the aggregate"""
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        timings.append((name, elapsed))
+    else:
+        _commit(getattr(_local, "page", "unknown"), [(name, elapsed)])
+
+
+def _commit(page: str, timings: List):
+    """Merge a rerun's timings into the per-page aggregate"""
+    with _lock:
+        stats = _page_stats.setdefault(page, {})
+        for name, elapsed in timings:
+            entry = stats.get(name)
+            if entry is None:
+                entry = stats[name] = TimingStats()
+            entry.add(elapsed)
+
+
+def profiled(name: Optional[str] = None):
+    """Decorator timing a render function on every rerun when profiling is on"""
+    def decorator(func):
+        if not PROFILE_ENABLED:
+            return func
+
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(label, time.perf_counter() - start)
+
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profile_block(name: str):
+    """Time an inline block, e.g. the body of an admin tab"""
+    if not PROFILE_ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+def set_page(page: str):
+    """Label the current rerun with the page being rendered"""
+    _local.page = page
+
+
+def _start_export_profiler():
+    """Start cProfile/pyinstrument for a sampled rerun, if configured"""
+    global _rerun_counter
+    with _lock:
+        _rerun_counter += 1
+        sampled = _rerun_counter % PROFILE_EXPORT_EVERY == 0
+
+    if not sampled:
+        return None
+
+    if PROFILE_MODE == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    if PROFILE_MODE == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            return None
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+
+    return None
+
+
+def _stop_export_profiler(profiler, page: str):
+    """Stop the sampling profiler and write its output under PROFILE_DIR"""
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        safe_page = page.replace(":", "_").replace("/", "_")
+
+        if PROFILE_MODE == "cprofile":
+            profiler.disable()
+            path = os.path.join(PROFILE_DIR, f"{safe_page}_{stamp}.prof")
+            profiler.dump_stats(path)
+        else:
+            profiler.stop()
+            path = os.path.join(PROFILE_DIR, f"{safe_page}_{stamp}.html")
+            with open(path, "w") as f:
+                f.write(profiler.output_html())
+
+        with _lock:
+            _last_exports.append(path)
+    except Exception as e:
+        print(f"Error exporting render profile: {e}")
+
+
+@contextmanager
+def profile_rerun():
+    """Collect all timings of one script rerun and commit them under its page"""
+    if not PROFILE_ENABLED:
+        yield
+        return
+
+    _local.timings = []
+    _local.page = "unknown"
+    profiler = _start_export_profiler()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        # st.rerun()/st.stop() raise through here, so the finally still commits
+        elapsed = time.perf_counter() - start
+        page = getattr(_local, "page", "unknown")
+        timings = _local.timings
+        timings.append(("rerun_total", elapsed))
+        _local.timings = None
+        _commit(page, timings)
+        if profiler is not None:
+            _stop_export_profiler(profiler, page)
+
+
+def get_profile_snapshot() -> Dict[str, List[Dict]]:
+    """Per-page rows of timing statistics, slowest mean first"""
+    with _lock:
+        snapshot = {
+            page: [entry.as_row(name) for name, entry in stats.items()]
+            for page, stats in _page_stats.items()
+        }
+    for rows in snapshot.values():
+        rows.sort(key=lambda r: r["Mean (ms)"], reverse=True)
+    return snapshot
+
+
+def reset_profile():
+    """Clear all aggregated timings"""
+    with _lock:
+        _page_stats.clear()
+        _last_exports.clear()
+
+
+def render_profiler_panel():
+    """Render the debug panel with per-page timings in the sidebar"""
+    if not PROFILE_ENABLED:
+        return
+
+    import streamlit as st
+
+    with st.sidebar:
+        with st.expander("⏱️ Render Profiler", expanded=False):
+            snapshot = get_profile_snapshot()
+            if not snapshot:
+                st.caption("No reruns recorded yet.")
+                return
+
+            st.caption(f"Mode: {PROFILE_MODE} (process-wide, last {SAMPLE_WINDOW} samples per function)")
+            page = st.selectbox("Page", sorted(snapshot.keys()), key="_profiler_page")
+            st.table(snapshot.get(page, []))
+
+            with _lock:
+                exports = list(_last_exports)
+            if exports:
+                latest = exports[-1]
+                try:
+                    with open(latest, "rb") as f:
+                        st.download_button(
+                            label=f"📥 {os.path.basename(latest)}",
+                            data=f.read(),
+                            file_name=os.path.basename(latest),
+                            key="_profiler_download"
+                        )
+                except OSError:
+                    pass
+
+            if st.button("Reset profiler", key="_profiler_reset"):
+                reset_profile()
@@ -0,0 +1,333 @@
+"""
+Report Batch Module
+Offline report generation through a batch completion endpoint
+Author: Optimum AI Lab
+
+Reports are not urgent, so a backlog of them can go through a batch API
+(discounted, no open connections, no share of interactive rate limits)
+instead of the live report queue. A run has three stages, each resumable:
+
+    compile   surveys without an up-to-date report -> batches/<name>/requests.jsonl,
+              one chat completion request per stale section (the same prompts,
+              models and limits as live generation) plus plan.jsonl with the
+              section fingerprints each request was built from
+    submit    upload the file to the backend: "openai" (Files + Batches API) or
+              "local" (answers every line in-process with the synthetic replies
+              of fake_openai_server, for tests and demos)
+    ingest    once the backend has finished, stream the results back; a survey's
+              report is written only when all of its sections succeeded and its
+              answers have not changed since compile
+
+Each batch directory holds a state.json with its status
+(compiled -> submitted -> completed -> ingested, or failed).
+
+Usage (from the repository root; suitable for cron):
+    python app/report_batch.py compile --limit 200
+    python app/report_batch.py submit
+    python app/report_batch.py ingest --wait
+    python app/report_batch.py run --wait        # all three
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+
+ENDPOINT = "/v1/chat/completions"
+PENDING = ("compiled", "submitted", "completed")
+# Batches API statuses after which no more output will appear
+TERMINAL = ("completed", "failed", "expired", "cancelled")
+
+
+def _read_state(batch_path: str) -> Dict[str, Any]:
+    with open(os.path.join(batch_path, "state.json"), "r") as f:
+        return json.load(f)
+
+
+def _write_state(batch_path: str, state: Dict[str, Any]):
+    state["updated_at"] = datetime.utcnow().isoformat()
+    tmp_path = os.path.join(batch_path, "state.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, os.path.join(batch_path, "state.json"))
+
+
+def _read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def list_batches(status: Optional[tuple] = None) -> List[str]:
+    """Batch directories, oldest first, optionally only those in the given statuses"""
+    from app_config import get_config
+    batch_dir = get_config().report_batch.batch_dir
+    if not os.path.isdir(batch_dir):
+        return []
+    paths = sorted(
+        os.path.join(batch_dir, name) for name in os.listdir(batch_dir)
+        if os.path.exists(os.path.join(batch_dir, name, "state.json"))
+    )
+    return [path for path in paths if status is None or _read_state(path)["status"] in status]
+
+
+def _pending_survey_ids() -> set:
+    """Surveys already waiting in an unfinished batch"""
+    ids = set()
+    for path in list_batches(PENDING):
+        ids.update(entry["survey_id"] for entry in _read_jsonl(os.path.join(path, "plan.jsonl")))
+    return ids
+
+
+def _queued_survey_ids() -> set:
+    """Surveys with a live report job queued or running"""
+    try:
+        from report_jobs import get_jobs_collection
+        return {str(job["survey_id"]) for job in get_jobs_collection().find({"active": True}, {"survey_id": 1})}
+    except Exception as e:
+        print(f"Report queue unavailable, not excluding queued surveys: {e}")
+        return set()
+
+
+def compile_batch(limit: Optional[int] = None, collection=None) -> Optional[str]:
+    """Write the requests for up to `limit` surveys with stale reports; returns the batch directory"""
+    from app_config import get_config
+    from model_router import get_route
+    from report_generator import (SECTION_MESSAGES, estimate_tokens, format_qa_pairs, plan_report_update)
+
+    cfg = get_config()
+    settings = cfg.report_batch
+    limit = limit or settings.max_surveys
+    if collection is None:
+        from db_client import get_collection
+        collection = get_collection(cfg)
+
+    excluded = _pending_survey_ids() | _queued_survey_ids()
+    name = datetime.utcnow().strftime("batch-%Y%m%dT%H%M%S%fZ")
+    batch_path = os.path.join(settings.batch_dir, name)
+    os.makedirs(batch_path, exist_ok=True)
+
+    surveys = requests = oversized = 0
+    with open(os.path.join(batch_path, "requests.jsonl"), "w", encoding="utf-8") as request_file, \
+            open(os.path.join(batch_path, "plan.jsonl"), "w", encoding="utf-8") as plan_file:
+        for doc in collection.find({}).sort("_id", 1):
+            if surveys >= limit:
+                break
+            survey_id = str(doc["_id"])
+            if survey_id in excluded:
+                continue
+            plan = plan_report_update(doc, doc.get("report"))
+            stale = [section for section, action in plan["actions"].items() if action != "reuse"]
+            if not stale:
+                continue
+            qa_pairs = format_qa_pairs(doc)
+            if estimate_tokens(qa_pairs) > cfg.report.max_prompt_tokens:
+                # Condensing needs a completion before the section prompts; left to the live queue
+                oversized += 1
+                continue
+
+            for section in stale:
+                route = get_route(f"report_{section}")
+                request_file.write(json.dumps({
+                    "custom_id": f"{survey_id}|{section}",
+                    "method": "POST",
+                    "url": ENDPOINT,
+                    "body": {
+                        "model": route.model,
+                        "temperature": route.temperature,
+                        "max_tokens": route.max_tokens,
+                        "messages": SECTION_MESSAGES[section](doc, qa_pairs),
+                    },
+                }) + "\n")
+                requests += 1
+            plan_file.write(json.dumps({
+                "survey_id": survey_id,
+                "sections": {section: plan["fingerprints"][section] for section in stale},
+            }) + "\n")
+            surveys += 1
+
+    if not surveys:
+        for file_name in ("requests.jsonl", "plan.jsonl"):
+            os.remove(os.path.join(batch_path, file_name))
+        os.rmdir(batch_path)
+        print(f"No surveys need a report ({oversized} oversized left to the report queue)")
+        return None
+    _write_state(batch_path, {
+        "name": name, "status": "compiled", "backend": settings.backend,
+        "surveys": surveys, "requests": requests, "oversized_skipped": oversized,
+        "created_at": datetime.utcnow().isoformat(),
+    })
+    print(f"{name}: {requests} requests for {surveys} surveys ({oversized} oversized left to the report queue)")
+    return batch_path
+
+
+def _run_local(batch_path: str):
+    """Answer every request in-process with synthetic completions (stand-in for a batch endpoint)"""
+    from fake_openai_server import build_completion, synthetic_reply
+    with open(os.path.join(batch_path, "results.jsonl"), "w", encoding="utf-8") as out:
+        for i, request in enumerate(_read_jsonl(os.path.join(batch_path, "requests.jsonl"))):
+            body = request["body"]
+            completion = build_completion(body["model"], body["messages"], synthetic_reply(body["messages"]))
+            out.write(json.dumps({
+                "id": f"batch_req_local_{i}",
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": completion},
+                "error": None,
+            }) + "\n")
+
+
+def submit_batch(batch_path: str) -> Dict[str, Any]:
+    """Hand a compiled batch to its backend"""
+    state = _read_state(batch_path)
+    if state["status"] != "compiled":
+        return state
+    if state["backend"] == "local":
+        _run_local(batch_path)
+        state.update(status="completed", provider_status="completed")
+    else:
+        import llm_client
+        from app_config import get_config
+        client = llm_client.get_openai_client(timeout=300.0)
+        with open(os.path.join(batch_path, "requests.jsonl"), "rb") as f:
+            uploaded = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=uploaded.id, endpoint=ENDPOINT,
+            completion_window=get_config().report_batch.completion_window,
+            metadata={"source": "uob-survey-reports", "name": state["name"]},
+        )
+        state.update(status="submitted", provider_batch_id=batch.id, provider_status=batch.status,
+                     input_file_id=uploaded.id)
+    state["submitted_at"] = datetime.utcnow().isoformat()
+    _write_state(batch_path, state)
+    return state
+
+
+def poll_batch(batch_path: str) -> Dict[str, Any]:
+    """Check a submitted batch; downloads its results once the backend has finished"""
+    state = _read_state(batch_path)
+    if state["status"] != "submitted":
+        return state
+    import llm_client
+    client = llm_client.get_openai_client(timeout=300.0)
+    batch = client.batches.retrieve(state["provider_batch_id"])
+    counts = getattr(batch, "request_counts", None)
+    state["provider_status"] = batch.status
+    if counts is not None:
+        state["provider_counts"] = {"completed": counts.completed, "failed": counts.failed, "total": counts.total}
+    if batch.status in TERMINAL:
+        if batch.output_file_id:
+            # Streamed to disk; expired batches still return the requests that finished
+            client.files.content(batch.output_file_id).write_to_file(os.path.join(batch_path, "results.jsonl"))
+            state["status"] = "completed"
+        else:
+            state["status"] = "failed"
+            state["error"] = f"batch {batch.status} without output"
+    _write_state(batch_path, state)
+    return state
+
+
+def ingest_batch(batch_path: str, collection=None) -> Dict[str, Any]:
+    """Store the reports of a completed batch on their surveys"""
+    from bson import ObjectId
+    from report_generator import REPORT_SECTIONS, build_report_record, plan_report_update
+
+    state = _read_state(batch_path)
+    if state["status"] != "completed":
+        return state
+    if collection is None:
+        from db_client import get_collection
+        collection = get_collection()
+
+    results: Dict[str, Dict[str, str]] = {}
+    failed_requests = prompt_tokens = completion_tokens = 0
+    for line in _read_jsonl(os.path.join(batch_path, "results.jsonl")):
+        survey_id, section = line["custom_id"].split("|", 1)
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            failed_requests += 1
+            continue
+        body = response["body"]
+        results.setdefault(survey_id, {})[section] = body["choices"][0]["message"]["content"]
+        usage = body.get("usage") or {}
+        prompt_tokens += usage.get("prompt_tokens", 0)
+        completion_tokens += usage.get("completion_tokens", 0)
+
+    stored = incomplete = changed = 0
+    for entry in _read_jsonl(os.path.join(batch_path, "plan.jsonl")):
+        survey_id = entry["survey_id"]
+        generated = results.pop(survey_id, {})
+        if set(generated) != set(entry["sections"]):
+            incomplete += 1
+            continue
+        doc = collection.find_one({"_id": ObjectId(survey_id)})
+        if doc is None:
+            changed += 1
+            continue
+        previous = doc.get("report")
+        plan = plan_report_update(doc, previous)
+        stale = {section for section, action in plan["actions"].items() if action != "reuse"}
+        if stale != set(entry["sections"]) or any(
+                plan["fingerprints"][section] != fingerprint for section, fingerprint in entry["sections"].items()):
+            # Answers or settings changed after compile; the next batch picks the survey up again
+            changed += 1
+            continue
+        sections = {key: (generated[key] if key in generated else previous["sections"][key]) for key in REPORT_SECTIONS}
+        # Skip if a live report job stored a newer report meanwhile
+        guard = {"report.generated_at": previous["generated_at"]} if previous else {"report": {"$exists": False}}
+        update = {"$set": {"report": build_report_record(sections, plan), "updated_at": datetime.utcnow()}}
+        result = collection.update_one({"_id": doc["_id"], **guard}, update)
+        if result.modified_count:
+            stored += 1
+        else:
+            changed += 1
+
+    state.update(status="ingested", ingested_at=datetime.utcnow().isoformat(), reports_stored=stored,
+                 surveys_incomplete=incomplete, surveys_changed=changed, failed_requests=failed_requests,
+                 prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+    _write_state(batch_path, state)
+    print(f"{state['name']}: {stored} reports stored, {incomplete} incomplete, {changed} changed since compile, "
+          f"{failed_requests} failed requests ({prompt_tokens} prompt + {completion_tokens} completion tokens)")
+    return state
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate reports offline through a batch completion endpoint")
+    parser.add_argument("command", choices=("compile", "submit", "ingest", "run"))
+    parser.add_argument("--limit", type=int, default=None, help="Surveys per batch (default [REPORT_BATCH] max_surveys)")
+    parser.add_argument("--wait", action="store_true", help="Keep polling until submitted batches finish")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    from app_config import get_config
+    from db_client import close_clients
+
+    if args.command in ("compile", "run"):
+        compile_batch(args.limit)
+    if args.command in ("submit", "run"):
+        for path in list_batches(("compiled",)):
+            state = submit_batch(path)
+            print(f"{state['name']}: {state['status']} ({state.get('provider_batch_id', state['backend'])})")
+    if args.command in ("ingest", "run"):
+        while True:
+            for path in list_batches(("submitted",)):
+                state = poll_batch(path)
+                print(f"{state['name']}: {state.get('provider_status')} {state.get('provider_counts', '')}")
+            for path in list_batches(("completed",)):
+                ingest_batch(path)
+            if not args.wait or not list_batches(("submitted",)):
+                break
+            time.sleep(get_config().report_batch.poll_seconds)
+    close_clients()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, APP_DIR)
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Report Mode Benchmark
+Compares token spend and latency of the multi-call and structured report modes
+Author: Optimum AI Lab
+
+Runs every selected survey through each report mode and prints calls, prompt
+and completion tokens and wall time per mode. Surveys come from a JSON export
+(one document or a list) or from the configured MongoDB collection.
+
+Usage (from the repository root):
+    python app/report_benchmark.py --limit 5
+    python app/report_benchmark.py --survey-file export.json --modes structured,multi_call
+    LLM_TRANSPORT=synthetic python app/report_benchmark.py --survey-file export.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+
+
+def load_surveys(survey_file: Optional[str], limit: int) -> List[Dict]:
+    """Surveys from a JSON export, or the most recent ones in MongoDB"""
+    if survey_file:
+        with open(survey_file, "r") as f:
+            data = json.load(f)
+        surveys = data if isinstance(data, list) else [data]
+        return surveys[:limit]
+
+    from db_client import get_collection
+    collection = get_collection()
+    return list(collection.find({}).sort("_id", -1).limit(limit))
+
+
+def run_mode(survey: Dict, mode: str) -> Dict:
+    """Generate one report and measure it"""
+    from llm_resilience import collect_usage
+    from report_generator import generate_full_report
+
+    started = time.perf_counter()
+    with collect_usage() as usage:
+        generate_full_report(survey, mode=mode)
+    return {**usage, "seconds": time.perf_counter() - started}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare report generation modes")
+    parser.add_argument("--survey-file", default=None, help="JSON export of survey documents")
+    parser.add_argument("--limit", type=int, default=3, help="Number of surveys to run")
+    parser.add_argument("--modes", default="multi_call,structured", help="Comma-separated report modes")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write per-survey results as JSON")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    surveys = load_surveys(args.survey_file, args.limit)
+    if not surveys:
+        print("No surveys found")
+        return 1
+
+    results: Dict[str, List[Dict]] = {mode: [] for mode in modes}
+    for i, survey in enumerate(surveys, 1):
+        for mode in modes:
+            print(f"[{i}/{len(surveys)}] {mode}...")
+            results[mode].append(run_mode(survey, mode))
+
+    print(f"\n{'mode':<12}{'calls':>8}{'prompt tok':>12}{'compl tok':>12}{'seconds':>10}   (mean per report)")
+    means = {}
+    for mode, runs in results.items():
+        means[mode] = {
+            field: sum(r[field] for r in runs) / len(runs)
+            for field in ("calls", "prompt_tokens", "completion_tokens", "seconds")
+        }
+        m = means[mode]
+        print(f"{mode:<12}{m['calls']:>8.1f}{m['prompt_tokens']:>12.0f}{m['completion_tokens']:>12.0f}{m['seconds']:>10.1f}")
+
+    if "multi_call" in means and "structured" in means and means["structured"]["prompt_tokens"]:
+        ratio = means["multi_call"]["prompt_tokens"] / means["structured"]["prompt_tokens"]
+        print(f"\nPrompt tokens, multi_call / structured: {ratio:.2f}x")
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, APP_DIR)
+    sys.exit(main())
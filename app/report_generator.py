@@ -5,90 +5,78 @@ Author: Optimum AI Lab
 """
 
 import json
-import os
-from typing import Dict, List, Any
+import re
+import time
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
-import httpx
 from openai import OpenAI
+import llm_client
+from app_config import get_config
+from llm_resilience import chat_completion, collect_usage
+from model_router import get_route
+from survey_schema import decode_answers
+
+REPORT_MODES = ("multi_call", "structured")
+
+STEP_TITLES = {
+    "step1": "STEP 1: BASELINE ASSESSMENT",
+    "step2": "STEP 2: DEEP DIVE (DYNAMIC QUESTIONS)",
+    "step3": "STEP 3: AI/GENAI DISCOVERY",
+}
+
+# Section keys, in report order, as format_report_as_markdown expects them
+REPORT_SECTIONS = ("executive_summary", "detailed_report", "gap_analysis", "recommendations")
+
+# What each section covers, for the single-call structured prompt
+STRUCTURED_SECTION_BRIEFS = {
+    "executive_summary": "1-2 page Executive Summary: overview of the current state across all three steps, "
+                         "3-4 key strengths, 3-4 critical challenges and gaps, 3-4 priority areas, and the "
+                         "expected business impact.",
+    "detailed_report": "5-10 page Detailed Assessment Report covering: architecture & scale; job orchestration "
+                       "& operations; ETL, development & tooling; data quality, governance & testing (incl. "
+                       "BCBS 239); reporting & strategic direction; AI/GenAI infrastructure, governance and "
+                       "frameworks; a 1-5 maturity rating with stage (Nascent/Emerging/Developing/Advanced/"
+                       "Leading) per pillar; and the top 5 key findings.",
+    "gap_analysis": "Gap Analysis: contradictions across the three steps and the clarification needed; "
+                    "capability, process, compliance (BCBS 239, AI governance), technology and AI/GenAI "
+                    "readiness gaps, each with recommendations.",
+    "recommendations": "Recommendations & Roadmap: immediate (0-3 months), short-term (3-6), medium-term "
+                       "(6-12) and long-term (12+) actions with effort and impact; current/12-month/24-month "
+                       "maturity per pillar; a 4-phase AI/GenAI enablement roadmap; success metrics with "
+                       "baselines and targets; and key risks with mitigations.",
+}
 
 # Initialize OpenAI client
 def get_openai_client():
-    """Get OpenAI client with API key from environment"""
-    api_key = os.getenv("OPENAI_API_KEY", "")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY not set in environment")
-    http_client = httpx.Client(timeout=60.0, trust_env=False)
-    return OpenAI(api_key=api_key, http_client=http_client)
+    """Get OpenAI client with API key from environment (honours LLM_TRANSPORT)"""
+    return llm_client.get_openai_client(timeout=60.0)
 
 def format_qa_pairs(survey_data: Dict[str, Any]) -> str:
     """Format Q&A pairs for OpenAI analysis including all steps"""
     qa_text = "SURVEY RESPONSES:\n\n"
     
-    # Handle MongoDB document format with nested answers
-    step1_answers = survey_data.get("step1_answers", [])
-    step2_answers = survey_data.get("step2_answers", [])
-    step3_answers = survey_data.get("step3_answers", [])
-    
-    # Handle legacy format
-    if not step1_answers:
-        step1_answers = survey_data.get("answers", {}).get("fixed", [])
-    if not step2_answers:
-        step2_answers = survey_data.get("answers", {}).get("section2", [])
-    
-    # Step 1: Fixed Questions
-    qa_text += "=== STEP 1: BASELINE ASSESSMENT ===\n\n"
-    if step1_answers:
-        for i, qa in enumerate(step1_answers, 1):
-            # Handle both dict and string formats
-            if isinstance(qa, dict):
-                question_text = qa.get('question_text') or qa.get('question', 'N/A')
-                answer_text = qa.get('answer', 'N/A')
-            else:
-                question_text = str(qa)
-                answer_text = "N/A"
-            qa_text += f"Q{i}: {question_text}\n"
-            qa_text += f"A{i}: {answer_text}\n\n"
-    else:
-        qa_text += "No Step 1 answers found.\n\n"
-    
-    # Step 2: Open-Ended Questions
-    qa_text += "=== STEP 2: DEEP DIVE (DYNAMIC QUESTIONS) ===\n\n"
-    if step2_answers:
-        for i, qa in enumerate(step2_answers, 1):
-            # Handle both dict and string formats
-            if isinstance(qa, dict):
-                question_text = qa.get('question_text') or qa.get('question', 'N/A')
-                answer_text = qa.get('answer', 'N/A')
-            else:
-                question_text = str(qa)
-                answer_text = "N/A"
-            qa_text += f"Q{i}: {question_text}\n"
-            qa_text += f"A{i}: {answer_text}\n\n"
-    else:
-        qa_text += "No Step 2 answers found.\n\n"
-    
-    # Step 3: AI/GenAI Questions
-    qa_text += "=== STEP 3: AI/GENAI DISCOVERY ===\n\n"
-    if step3_answers:
-        for i, qa in enumerate(step3_answers, 1):
-            # Handle both dict and string formats
-            if isinstance(qa, dict):
-                question_text = qa.get('question_text') or qa.get('question', 'N/A')
-                answer_text = qa.get('answer', 'N/A')
-            else:
-                question_text = str(qa)
-                answer_text = "N/A"
-            qa_text += f"Q{i}: {question_text}\n"
-            qa_text += f"A{i}: {answer_text}\n\n"
-    else:
-        qa_text += "No Step 3 answers found.\n\n"
+    # One decoder for the compact schema and every legacy document shape
+    steps = decode_answers(survey_data)
+    for step, title in STEP_TITLES.items():
+        qa_text += f"=== {title} ===\n\n"
+        if steps[step]:
+            for i, (_, question_text, answer_text) in enumerate(steps[step], 1):
+                qa_text += f"Q{i}: {question_text}\n"
+                qa_text += f"A{i}: {answer_text}\n\n"
+        else:
+            qa_text += f"No Step {step[-1]} answers found.\n\n"
     
     return qa_text
 
-def generate_executive_summary(survey_data: Dict[str, Any], client: OpenAI) -> str:
-    """Generate 1-2 page executive summary using OpenAI"""
+def executive_summary_messages(survey_data: Dict[str, Any], qa_pairs: Optional[str] = None) -> List[Dict[str, str]]:
+    """Chat messages for the executive summary section (shared by live calls and offline batches)"""
     
-    qa_pairs = format_qa_pairs(survey_data)
+    qa_pairs = qa_pairs or format_qa_pairs(survey_data)
     org_name = survey_data.get("org", {}).get("name", "Organization")
     
     prompt = f"""
@@ -112,25 +100,24 @@ Please create an Executive Summary that includes:
 Format as professional business document. Be specific and reference actual answers from ALL THREE SURVEY SECTIONS.
 """
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.3,
-        max_tokens=1500,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a senior data infrastructure consultant for regulated banking systems. Generate professional, insightful reports based on survey data."
-            },
-            {"role": "user", "content": prompt}
-        ]
-    )
+    return [
+        {
+            "role": "system",
+            "content": "You are a senior data infrastructure consultant for regulated banking systems. Generate professional, insightful reports based on survey data."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+def generate_executive_summary(survey_data: Dict[str, Any], client: OpenAI, qa_pairs: Optional[str] = None) -> str:
+    """Generate 1-2 page executive summary using OpenAI"""
     
+    response = chat_completion(client, "report_executive_summary", messages=executive_summary_messages(survey_data, qa_pairs))
     return response.choices[0].message.content
 
-def generate_detailed_report(survey_data: Dict[str, Any], client: OpenAI) -> str:
-    """Generate 5-10 page detailed report using OpenAI"""
+def detailed_report_messages(survey_data: Dict[str, Any], qa_pairs: Optional[str] = None) -> List[Dict[str, str]]:
+    """Chat messages for the detailed report section (shared by live calls and offline batches)"""
     
-    qa_pairs = format_qa_pairs(survey_data)
+    qa_pairs = qa_pairs or format_qa_pairs(survey_data)
     org_name = survey_data.get("org", {}).get("name", "Organization")
     
     prompt = f"""
@@ -214,25 +201,24 @@ Please create a comprehensive Detailed Report analyzing ALL three survey section
 Be specific, reference actual survey answers from ALL THREE STEPS, and provide actionable insights.
 """
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.3,
-        max_tokens=4000,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a senior data infrastructure consultant for regulated banking systems. Generate professional, detailed, and insightful reports based on survey data."
-            },
-            {"role": "user", "content": prompt}
-        ]
-    )
+    return [
+        {
+            "role": "system",
+            "content": "You are a senior data infrastructure consultant for regulated banking systems. Generate professional, detailed, and insightful reports based on survey data."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+def generate_detailed_report(survey_data: Dict[str, Any], client: OpenAI, qa_pairs: Optional[str] = None) -> str:
+    """Generate 5-10 page detailed report using OpenAI"""
     
+    response = chat_completion(client, "report_detailed_report", messages=detailed_report_messages(survey_data, qa_pairs))
     return response.choices[0].message.content
 
-def generate_gap_analysis(survey_data: Dict[str, Any], client: OpenAI) -> str:
-    """Generate gap analysis identifying contradictions and inconsistencies"""
+def gap_analysis_messages(survey_data: Dict[str, Any], qa_pairs: Optional[str] = None) -> List[Dict[str, str]]:
+    """Chat messages for the gap analysis section (shared by live calls and offline batches)"""
     
-    qa_pairs = format_qa_pairs(survey_data)
+    qa_pairs = qa_pairs or format_qa_pairs(survey_data)
     
     prompt = f"""
 Based on the following comprehensive survey responses including Baseline Assessment, Deep Dive Questions, and AI/GenAI Discovery, identify and analyze gaps, contradictions, and inconsistencies.
@@ -277,25 +263,24 @@ Please provide a thorough gap analysis that includes:
 Be specific and reference actual survey answers from ALL THREE ASSESSMENT STAGES.
 """
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.3,
-        max_tokens=2000,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a senior data infrastructure consultant. Identify gaps and contradictions in survey responses."
-            },
-            {"role": "user", "content": prompt}
-        ]
-    )
+    return [
+        {
+            "role": "system",
+            "content": "You are a senior data infrastructure consultant. Identify gaps and contradictions in survey responses."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+def generate_gap_analysis(survey_data: Dict[str, Any], client: OpenAI, qa_pairs: Optional[str] = None) -> str:
+    """Generate gap analysis identifying contradictions and inconsistencies"""
     
+    response = chat_completion(client, "report_gap_analysis", messages=gap_analysis_messages(survey_data, qa_pairs))
     return response.choices[0].message.content
 
-def generate_recommendations(survey_data: Dict[str, Any], client: OpenAI) -> str:
-    """Generate prioritized recommendations with maturity roadmap"""
+def recommendations_messages(survey_data: Dict[str, Any], qa_pairs: Optional[str] = None) -> List[Dict[str, str]]:
+    """Chat messages for the recommendations section (shared by live calls and offline batches)"""
     
-    qa_pairs = format_qa_pairs(survey_data)
+    qa_pairs = qa_pairs or format_qa_pairs(survey_data)
     
     prompt = f"""
 Based on the comprehensive survey responses including Baseline Assessment, Deep Dive Questions, and AI/GenAI Discovery, generate prioritized recommendations with a maturity roadmap.
@@ -361,48 +346,538 @@ Please provide comprehensive recommendations that include:
 Be specific with timelines, effort estimates, and business impact. Reference actual survey answers from ALL THREE ASSESSMENT STAGES in your recommendations.
 """
     
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.3,
-        max_tokens=3000,
+    return [
+        {
+            "role": "system",
+            "content": "You are a senior data infrastructure consultant. Generate detailed, prioritized recommendations with realistic timelines and effort estimates."
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+def generate_recommendations(survey_data: Dict[str, Any], client: OpenAI, qa_pairs: Optional[str] = None) -> str:
+    """Generate prioritized recommendations with maturity roadmap"""
+    
+    response = chat_completion(client, "report_recommendations", messages=recommendations_messages(survey_data, qa_pairs))
+    return response.choices[0].message.content
+
+SECTION_MESSAGES = {
+    "executive_summary": executive_summary_messages,
+    "detailed_report": detailed_report_messages,
+    "gap_analysis": gap_analysis_messages,
+    "recommendations": recommendations_messages,
+}
+
+SECTION_GENERATORS = {
+    "executive_summary": generate_executive_summary,
+    "detailed_report": generate_detailed_report,
+    "gap_analysis": generate_gap_analysis,
+    "recommendations": generate_recommendations,
+}
+
+CONDENSE_CACHE_SIZE = 256
+_condense_cache: "OrderedDict[str, str]" = OrderedDict()
+_condense_lock = threading.Lock()
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return len(text) // 4
+
+def build_survey_chunks(survey_data: Dict[str, Any], chunk_tokens: int, max_chunks: int = 0) -> List[Tuple[str, str]]:
+    """Split the survey into (heading, Q&A text) chunks of ~chunk_tokens each.
+
+    Chunks are cut at step boundaries. With max_chunks set, the smallest
+    adjacent chunks are then merged until no more than max_chunks remain, so
+    an oversized survey gets fewer, larger chunks rather than more calls.
+    """
+    chunks = []
+    for step, title in STEP_TITLES.items():
+        pairs = [(question, answer) for _, dep, question, answer in _iter_inputs(survey_data) if dep == step]
+        current, first, size = [], 1, 0
+        for i, (question, answer) in enumerate(pairs, 1):
+            text = f"Q{i}: {question}\nA{i}: {answer}\n"
+            if current and size + estimate_tokens(text) > chunk_tokens:
+                chunks.append((f"{title} (Q{first}-Q{i - 1})", "\n".join(current)))
+                current, first, size = [], i, 0
+            current.append(text)
+            size += estimate_tokens(text)
+        if current:
+            chunks.append((f"{title} (Q{first}-Q{len(pairs)})", "\n".join(current)))
+    
+    while max_chunks > 0 and len(chunks) > max_chunks:
+        i = min(range(len(chunks) - 1),
+                key=lambda j: estimate_tokens(chunks[j][1]) + estimate_tokens(chunks[j + 1][1]))
+        (heading_a, text_a), (heading_b, text_b) = chunks[i], chunks[i + 1]
+        # Q numbers restart in every step, so merged parts keep their headings
+        text_a = text_a if text_a.startswith("[") else f"[{heading_a}]\n{text_a}"
+        text_b = text_b if text_b.startswith("[") else f"[{heading_b}]\n{text_b}"
+        chunks[i:i + 2] = [(f"{heading_a}; {heading_b}", f"{text_a}\n{text_b}")]
+    return chunks
+
+def condense_chunk(heading: str, text: str, client: OpenAI) -> str:
+    """Summarize one chunk of survey answers, keeping the specifics the report sections cite"""
+    key = _hash([heading, text])
+    with _condense_lock:
+        if key in _condense_cache:
+            _condense_cache.move_to_end(key)
+            return _condense_cache[key]
+    
+    prompt = f"""
+Condense the following survey answers ({heading}) for use in an assessment report.
+
+For every question keep its Q number and preserve: named systems, tools and vendors; volumes, counts, SLAs and other metrics; owners and teams; stated pain points, risks, priorities and timelines; and any statements that conflict with each other.
+Drop repetition and filler. Use terse bullet points under each Q number.
+
+{text}
+"""
+    
+    response = chat_completion(client, "report_condense",
         messages=[
             {
                 "role": "system",
-                "content": "You are a senior data infrastructure consultant. Generate detailed, prioritized recommendations with realistic timelines and effort estimates."
+                "content": "You are a senior data infrastructure consultant. Condense survey answers without losing specific facts."
             },
             {"role": "user", "content": prompt}
         ]
     )
     
-    return response.choices[0].message.content
+    summary = response.choices[0].message.content.strip()
+    with _condense_lock:
+        _condense_cache[key] = summary
+        while len(_condense_cache) > CONDENSE_CACHE_SIZE:
+            _condense_cache.popitem(last=False)
+    return summary
+
+def prepare_qa_context(survey_data: Dict[str, Any], client: OpenAI) -> str:
+    """Survey text for the section prompts: the full Q&A, or a map-reduce condensation when it is oversized.
+
+    Oversized surveys are split into at most max_chunks chunks that are
+    summarized in parallel; the section generators then read the joined summaries, so
+    prompt size and latency stay bounded however long the answers are.
+    """
+    qa_pairs = format_qa_pairs(survey_data)
+    settings = get_config().report
+    if estimate_tokens(qa_pairs) <= settings.max_prompt_tokens:
+        return qa_pairs
+    
+    chunks = build_survey_chunks(survey_data, settings.chunk_tokens, settings.max_chunks)
+    print(f"Survey is ~{estimate_tokens(qa_pairs)} tokens; condensing {len(chunks)} chunks in parallel...")
+    
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, condense_chunk, heading, text, client)
+                   for heading, text in chunks]
+        summaries = [future.result() for future in futures]
+    
+    condensed = "SURVEY RESPONSES (CONDENSED - the full survey exceeded the prompt budget):\n\n"
+    for (heading, _), summary in zip(chunks, summaries):
+        condensed += f"=== {heading} ===\n\n{summary}\n\n"
+    return condensed
+
+def get_report_mode() -> str:
+    """Configured report mode: multi_call (one completion per section) or structured (one JSON completion)"""
+    return get_config().report.mode
+
+def _close_truncated_json(text: str) -> str:
+    """Close any open string, arrays and objects left by a truncated response"""
+    stack = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+    
+    closed = text + ('"' if in_string else "")
+    closed = re.sub(r"[,:\s]+$", "", closed)
+    return closed + "".join(reversed(stack))
+
+def repair_json_object(content: str) -> Optional[Dict[str, Any]]:
+    """Parse a JSON object from model output, repairing code fences, stray text and truncation"""
+    text = (content or "").strip()
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text)
+    
+    start = text.find("{")
+    if start == -1:
+        return None
+    end = text.rfind("}")
+    candidates = [text[start:end + 1]] if end > start else []
+    candidates.append(_close_truncated_json(text[start:]))
+    
+    for candidate in candidates:
+        # Trailing commas are the most common hand-written-JSON slip
+        candidate = re.sub(r",\s*([}\]])", r"\1", candidate)
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+def _section_text(value: Any, level: int = 3) -> str:
+    """Render a section value as Markdown (models sometimes return lists or nested objects)"""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return "\n".join(f"- {_section_text(item, level + 1)}" for item in value)
+    if isinstance(value, dict):
+        heading = "#" * min(level, 6)
+        return "\n\n".join(
+            f"{heading} {str(key).replace('_', ' ').title()}\n\n{_section_text(item, level + 1)}"
+            for key, item in value.items()
+        )
+    return str(value)
+
+def parse_structured_report(content: str, truncated: bool = False) -> Tuple[Dict[str, str], List[str]]:
+    """Validate a structured report response; returns the usable sections and the keys still missing"""
+    data = repair_json_object(content) or {}
+    
+    sections = {}
+    for key in REPORT_SECTIONS:
+        text = _section_text(data.get(key))
+        if text:
+            sections[key] = text
+    
+    # A response cut off at max_tokens ends mid-section: don't keep the partial one
+    if truncated and sections:
+        last_key = [key for key in REPORT_SECTIONS if key in sections][-1]
+        sections.pop(last_key)
+    
+    missing = [key for key in REPORT_SECTIONS if key not in sections]
+    return sections, missing
 
-def generate_full_report(survey_data: Dict[str, Any]) -> Dict[str, str]:
+def generate_structured_report(survey_data: Dict[str, Any], client: OpenAI, qa_pairs: Optional[str] = None) -> Dict[str, str]:
+    """Generate all report sections in one JSON completion, regenerating any section that cannot be recovered"""
+    
+    qa_pairs = qa_pairs or format_qa_pairs(survey_data)
+    org_name = survey_data.get("org", {}).get("name", "Organization")
+    section_specs = "\n".join(f'- "{key}": {brief}' for key, brief in STRUCTURED_SECTION_BRIEFS.items())
+    
+    prompt = f"""
+Based on the following comprehensive survey responses from {org_name}, generate a complete Data Infrastructure Assessment Report.
+
+This survey includes THREE critical assessment areas:
+- STEP 1: BASELINE ASSESSMENT - Fixed foundational questions about architecture, jobs, ETL, data quality, and reporting
+- STEP 2: DEEP DIVE (DYNAMIC QUESTIONS) - Contextual follow-up questions generated based on Step 1 responses
+- STEP 3: AI/GENAI DISCOVERY - Infrastructure and governance readiness for AI/ML and GenAI initiatives
+
+Survey Data (ALL STEPS):
+{qa_pairs}
+
+Respond with a single JSON object with exactly these keys, each a Markdown-formatted string:
+{section_specs}
+
+Be specific and reference actual answers from ALL THREE SURVEY SECTIONS in every section.
+"""
+    
+    response = chat_completion(client, "report_structured",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a senior data infrastructure consultant for regulated banking systems. Generate professional, insightful reports based on survey data. Always answer with valid JSON."
+            },
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"}
+    )
+    
+    choice = response.choices[0]
+    sections, missing = parse_structured_report(choice.message.content, truncated=choice.finish_reason == "length")
+    
+    for key in missing:
+        print(f"Structured report missing '{key}', regenerating it separately...")
+        sections[key] = SECTION_GENERATORS[key](survey_data, client, qa_pairs)
+    
+    return {key: sections[key] for key in REPORT_SECTIONS}
+
+def generate_full_report(survey_data: Dict[str, Any], mode: Optional[str] = None) -> Dict[str, str]:
     """Generate complete report with all sections"""
     
+    mode = mode or get_report_mode()
     try:
         client = get_openai_client()
+        started = time.perf_counter()
         
-        print("Generating Executive Summary...")
-        executive_summary = generate_executive_summary(survey_data, client)
+        with collect_usage() as usage:
+            qa_pairs = prepare_qa_context(survey_data, client)
+            
+            if mode == "structured":
+                print("Generating all sections in one structured call...")
+                report = generate_structured_report(survey_data, client, qa_pairs)
+            else:
+                print("Generating Executive Summary...")
+                executive_summary = generate_executive_summary(survey_data, client, qa_pairs)
+                
+                print("Generating Detailed Report...")
+                detailed_report = generate_detailed_report(survey_data, client, qa_pairs)
+                
+                print("Generating Gap Analysis...")
+                gap_analysis = generate_gap_analysis(survey_data, client, qa_pairs)
+                
+                print("Generating Recommendations...")
+                recommendations = generate_recommendations(survey_data, client, qa_pairs)
+                
+                report = {
+                    "executive_summary": executive_summary,
+                    "detailed_report": detailed_report,
+                    "gap_analysis": gap_analysis,
+                    "recommendations": recommendations
+                }
         
-        print("Generating Detailed Report...")
-        detailed_report = generate_detailed_report(survey_data, client)
+        print(f"Report generated in {mode} mode: {usage['calls']} calls, "
+              f"{usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion tokens, "
+              f"{time.perf_counter() - started:.1f}s")
+        return report
+    
+    except Exception as e:
+        raise Exception(f"Error generating report: {str(e)}")
+
+# Bump a section's version when its prompt changes so stored copies are regenerated
+SECTION_PROMPT_VERSIONS = {
+    "executive_summary": 1,
+    "detailed_report": 1,
+    "gap_analysis": 1,
+    "recommendations": 1,
+}
+
+# Survey inputs each section's prompt reads. Every prompt embeds the full
+# format_qa_pairs() output, so a corrected answer touches every section; amend_sections()
+# patches them together in one call whose output is only the changed passages.
+SECTION_DEPENDENCIES = {
+    "executive_summary": ("org", "step1", "step2", "step3"),
+    "detailed_report": ("org", "step1", "step2", "step3"),
+    "gap_analysis": ("step1", "step2", "step3"),
+    "recommendations": ("step1", "step2", "step3"),
+}
+
+SECTION_TITLES = {
+    "executive_summary": "Executive Summary",
+    "detailed_report": "Detailed Assessment Report",
+    "gap_analysis": "Gap Analysis",
+    "recommendations": "Recommendations & Roadmap",
+}
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+def _iter_inputs(survey_data: Dict[str, Any]):
+    """Yield (key, dependency, question, answer) for every input the report prompts read"""
+    yield "org:name", "org", "Organization", survey_data.get("org", {}).get("name", "Organization")
+    
+    for step, answers in decode_answers(survey_data).items():
+        for key_id, question_text, answer_text in answers:
+            yield f"{step}:{key_id}", step, question_text, answer_text
+
+def compute_input_fingerprints(survey_data: Dict[str, Any]) -> Dict[str, str]:
+    """Fingerprint of every question/answer the report prompts read"""
+    return {key: _hash([question, answer]) for key, _, question, answer in _iter_inputs(survey_data)}
+
+def compute_section_fingerprints(input_fingerprints: Dict[str, str]) -> Dict[str, str]:
+    """Fingerprint of each section's inputs: its dependencies, prompt version and route settings"""
+    fingerprints = {}
+    for section, deps in SECTION_DEPENDENCIES.items():
+        route = get_route(f"report_{section}")
+        fingerprints[section] = _hash({
+            "inputs": {k: v for k, v in sorted(input_fingerprints.items()) if k.split(":", 1)[0] in deps},
+            "version": SECTION_PROMPT_VERSIONS[section],
+            "route": [route.model, route.temperature, route.max_tokens],
+        })
+    return fingerprints
+
+def _replace_passage(text: str, find: str, replace: str) -> Optional[str]:
+    """`text` with the first occurrence of `find` replaced (whitespace may differ), or None if absent"""
+    if not find.strip():
+        return None
+    if find in text:
+        return text.replace(find, replace, 1)
+    match = re.search(r"\s+".join(re.escape(part) for part in find.split()), text)
+    if match is None:
+        return None
+    return text[:match.start()] + replace + text[match.end():]
+
+def amend_sections(previous_sections: Dict[str, str], changed: List[Tuple[str, str, str]],
+                   removed: List[str], survey_data: Dict[str, Any], client: OpenAI) -> Dict[str, str]:
+    """Patch stored sections for a handful of corrected answers in one completion.
+    
+    The model returns only the passages to change, as find/replace edits, so the
+    output follows the size of the correction rather than of the report. Sections
+    whose edits cannot be applied are left out of the result for the caller to
+    regenerate.
+    """
+    
+    org_name = survey_data.get("org", {}).get("name", "Organization")
+    changed_text = "\n\n".join(f"[{label}] Q: {question}\nA: {answer}" for label, question, answer in changed) or "None"
+    removed_text = "\n".join(f"- {label}" for label in removed) or "None"
+    sections_text = "\n\n".join(f"=== SECTION {key}: {SECTION_TITLES[key]} ===\n{text}"
+                                 for key, text in previous_sections.items())
+    
+    prompt = f"""
+You previously wrote the following sections of an assessment report for {org_name}.
+The respondent has since corrected some survey answers. Work out which passages the corrections affect.
+
+CORRECTED ANSWERS:
+{changed_text}
+
+REMOVED ANSWERS:
+{removed_text}
+
+{sections_text}
+
+Respond with a JSON object {{"edits": [{{"section": "<section key>", "find": "<passage>", "replace": "<revised passage>"}}]}}.
+- "find" must be copied exactly from that section: a whole sentence, bullet or table row, long enough to occur only once.
+- Include only passages the corrections make wrong or incomplete; keep the section's formatting in "replace".
+- Sections the corrections don't affect get no edits. Return {{"edits": []}} if nothing needs to change.
+"""
+    
+    response = chat_completion(client, "report_amend",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a senior data infrastructure consultant for regulated banking systems. Revise report sections precisely when survey answers change. Always answer with valid JSON."
+            },
+            {"role": "user", "content": prompt}
+        ],
+        response_format={"type": "json_object"}
+    )
+    
+    choice = response.choices[0]
+    edits = (repair_json_object(choice.message.content) or {}).get("edits")
+    if choice.finish_reason == "length" or not isinstance(edits, list):
+        # Incomplete edits could leave a section half revised
+        return {}
+    
+    patched = dict(previous_sections)
+    failed = set()
+    for edit in edits:
+        section = edit.get("section") if isinstance(edit, dict) else None
+        if section not in patched:
+            continue
+        text = _replace_passage(patched[section], str(edit.get("find") or ""), str(edit.get("replace") or ""))
+        if text is None:
+            failed.add(section)
+        else:
+            patched[section] = text
+    return {section: text for section, text in patched.items() if section not in failed}
+
+def plan_report_update(survey_data: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Decide per section whether to reuse, amend or regenerate it"""
+    inputs = compute_input_fingerprints(survey_data)
+    fingerprints = compute_section_fingerprints(inputs)
+    previous = previous or {}
+    old_sections = previous.get("sections", {})
+    old_fingerprints = previous.get("fingerprints", {})
+    old_inputs = previous.get("input_fingerprints", {})
+    old_routes = previous.get("routes", {})
+    amend_limit = get_config().report.amend_max_changed_answers
+    
+    changed_keys = [k for k, v in inputs.items() if old_inputs.get(k) != v]
+    removed_keys = [k for k in old_inputs if k not in inputs]
+    
+    actions = {}
+    for section, deps in SECTION_DEPENDENCIES.items():
+        route = get_route(f"report_{section}")
+        section_changes = [k for k in changed_keys + removed_keys if k.split(":", 1)[0] in deps]
+        if old_sections.get(section) and old_fingerprints.get(section) == fingerprints[section]:
+            actions[section] = "reuse"
+        elif (old_sections.get(section) and old_inputs and 0 < len(section_changes) <= amend_limit
+              and old_routes.get(section) == [route.model, route.temperature, route.max_tokens]
+              and previous.get("versions", {}).get(section) == SECTION_PROMPT_VERSIONS[section]):
+            actions[section] = "amend"
+        else:
+            actions[section] = "regenerate"
+    
+    return {
+        "actions": actions,
+        "input_fingerprints": inputs,
+        "fingerprints": fingerprints,
+        "changed_keys": changed_keys,
+        "removed_keys": removed_keys,
+    }
+
+def regenerate_report(survey_data: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, str], Dict[str, Any]]:
+    """Bring a stored report up to date with the survey, recomputing only sections whose inputs changed.
+
+    `previous` defaults to the report stored on the survey document. Returns the
+    sections and the record to store back as the document's `report` field.
+    """
+    if previous is None:
+        previous = survey_data.get("report")
+    plan = plan_report_update(survey_data, previous)
+    actions = plan["actions"]
+    
+    if not previous or all(action == "regenerate" for action in actions.values()):
+        sections = generate_full_report(survey_data)
+    else:
+        sections = {k: v for k, v in previous["sections"].items() if actions.get(k) == "reuse"}
+        labels = {key: (f"{dep.title()} {key.split(':', 1)[1]}", question, answer)
+                  for key, dep, question, answer in _iter_inputs(survey_data)}
+        changed = [labels[k] for k in plan["changed_keys"] if k in labels]
+        client = get_openai_client()
+        amend = [section for section in REPORT_SECTIONS if actions[section] == "amend"]
+        regenerate = [section for section in REPORT_SECTIONS if actions[section] == "regenerate"]
+        qa_pairs = prepare_qa_context(survey_data, client) if regenerate else None
         
-        print("Generating Gap Analysis...")
-        gap_analysis = generate_gap_analysis(survey_data, client)
+        def generate(section: str) -> str:
+            print(f"Regenerating {SECTION_TITLES[section]}...")
+            return SECTION_GENERATORS[section](survey_data, client, qa_pairs)
         
-        print("Generating Recommendations...")
-        recommendations = generate_recommendations(survey_data, client)
+        # Regenerated sections run in parallel with a single amend call covering every amended section
+        fallback = []
+        with ThreadPoolExecutor(max_workers=len(regenerate) + 1) as pool:
+            amended = None
+            if amend:
+                print(f"Amending {', '.join(SECTION_TITLES[s] for s in amend)} for {len(changed)} corrected answer(s)...")
+                amended = pool.submit(contextvars.copy_context().run, amend_sections,
+                                      {section: previous["sections"][section] for section in amend},
+                                      changed, plan["removed_keys"], survey_data, client)
+            futures = {section: pool.submit(contextvars.copy_context().run, generate, section) for section in regenerate}
+            for section, future in futures.items():
+                sections[section] = future.result()
+            if amended is not None:
+                patched = amended.result()
+                sections.update(patched)
+                fallback = [section for section in amend if section not in patched]
         
-        return {
-            "executive_summary": executive_summary,
-            "detailed_report": detailed_report,
-            "gap_analysis": gap_analysis,
-            "recommendations": recommendations
-        }
+        if fallback:
+            # Edits that did not match the stored text: rewrite those sections instead
+            for section in fallback:
+                actions[section] = "regenerate"
+            if qa_pairs is None:
+                qa_pairs = prepare_qa_context(survey_data, client)
+            with ThreadPoolExecutor(max_workers=len(fallback)) as pool:
+                futures = {section: pool.submit(contextvars.copy_context().run, generate, section) for section in fallback}
+                for section, future in futures.items():
+                    sections[section] = future.result()
+        print("Report updated: " + ", ".join(f"{section}={action}" for section, action in actions.items()))
     
-    except Exception as e:
-        raise Exception(f"Error generating report: {str(e)}")
+    record = build_report_record(sections, plan)
+    return record["sections"], record
+
+def build_report_record(sections: Dict[str, str], plan: Dict[str, Any]) -> Dict[str, Any]:
+    """The `report` field stored on a survey for these sections and their update plan"""
+    return {
+        "sections": {key: sections[key] for key in REPORT_SECTIONS},
+        "fingerprints": plan["fingerprints"],
+        "input_fingerprints": plan["input_fingerprints"],
+        "versions": dict(SECTION_PROMPT_VERSIONS),
+        "routes": {
+            section: [route.model, route.temperature, route.max_tokens]
+            for section, route in ((s, get_route(f"report_{s}")) for s in REPORT_SECTIONS)
+        },
+        "actions": plan["actions"],
+        "generated_at": datetime.utcnow(),
+    }
 
 def format_report_as_markdown(report_sections: Dict[str, str], survey_data: Dict[str, Any]) -> str:
     """Format report sections as professional Markdown"""
@@ -0,0 +1,226 @@
+"""
+Report Jobs Module
+MongoDB-backed queue that moves report generation off the Streamlit script thread
+Author: Optimum AI Lab
+
+"Generate Report" inserts a job document and returns immediately. Workers
+claim queued jobs with an atomic find-and-update that sets a lease, renew the
+lease while the report is generated, and write the result to the survey's
+`report` field. A job whose worker dies is claimed again once its lease
+expires, up to max_attempts. At most one job per survey is active at a time.
+
+Workers run as separate processes (python app/report_worker.py) and/or as
+daemon threads inside the app ([REPORT_QUEUE] embedded_workers), so
+throughput scales with the number of workers, not web sessions.
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app_config import get_config
+
+ACTIVE_STATUSES = ("queued", "running")
+JOB_STATUS_PROJECTION = {"status": 1, "attempts": 1, "worker": 1, "error": 1, "result": 1,
+                         "created_at": 1, "started_at": 1, "finished_at": 1}
+QUEUE_STATS_PIPELINE = [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+
+_indexed = False
+_embedded_lock = threading.Lock()
+_embedded_threads = []
+
+
+def new_worker_id() -> str:
+    """host:pid:suffix, unique per worker loop"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def get_jobs_collection():
+    """The job collection, with its indexes"""
+    global _indexed
+    from db_client import get_collection
+    collection = get_collection(None, get_config().report_queue.collection)
+    if not _indexed:
+        collection.create_index([("status", 1), ("created_at", 1)])
+        collection.create_index([("survey_id", 1), ("created_at", -1)])
+        # One queued/running job per survey; finished jobs drop the `active` flag
+        collection.create_index("survey_id", name="one_active_job_per_survey", unique=True,
+                                partialFilterExpression={"active": True})
+        _indexed = True
+    return collection
+
+
+def enqueue_report_job(survey_id, requested_by: Optional[str] = None) -> Dict[str, Any]:
+    """Queue a report for a survey, or return the job already queued/running for it"""
+    from pymongo.errors import DuplicateKeyError
+
+    collection = get_jobs_collection()
+    now = datetime.utcnow()
+    job = {
+        "survey_id": survey_id,
+        "status": "queued",
+        "active": True,
+        "requested_by": requested_by,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+    }
+    start_embedded_workers()
+    try:
+        job["_id"] = collection.insert_one(job).inserted_id
+    except DuplicateKeyError:
+        return collection.find_one({"survey_id": survey_id, "active": True}) or job
+    return job
+
+
+def get_latest_job(survey_id) -> Optional[Dict[str, Any]]:
+    """Most recent job for a survey (status fields only; cheap enough to poll)"""
+    return get_jobs_collection().find_one({"survey_id": survey_id}, JOB_STATUS_PROJECTION, sort=[("created_at", -1)])
+
+
+def get_queue_stats() -> Dict[str, int]:
+    """Job counts by status"""
+    return queue_stats_from_rows(get_jobs_collection().aggregate(QUEUE_STATS_PIPELINE))
+
+
+def queue_stats_from_rows(rows) -> Dict[str, int]:
+    """{status: count} from QUEUE_STATS_PIPELINE rows"""
+    return {row["_id"]: row["count"] for row in rows}
+
+
+def claim_job(worker_id: str) -> Optional[Dict[str, Any]]:
+    """Lease the oldest queued job (or one whose lease expired)"""
+    from pymongo import ReturnDocument
+
+    settings = get_config().report_queue
+    collection = get_jobs_collection()
+    now = datetime.utcnow()
+
+    # Jobs that keep killing their workers are given up on
+    collection.update_many(
+        {"status": "running", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": settings.max_attempts}},
+        {"$set": {"status": "failed", "error": "Lease expired after the last attempt", "finished_at": now,
+                  "updated_at": now},
+         "$unset": {"active": ""}},
+    )
+    return collection.find_one_and_update(
+        {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_expires_at": {"$lt": now}},
+        ]},
+        {"$set": {"status": "running", "worker": worker_id, "started_at": now, "updated_at": now,
+                  "lease_expires_at": now + timedelta(seconds=settings.lease_seconds)},
+         "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _keep_leased(job_id, worker_id: str, done: threading.Event):
+    """Renew the lease until the job finishes (runs in a helper thread)"""
+    lease_seconds = get_config().report_queue.lease_seconds
+    while not done.wait(lease_seconds / 3):
+        now = datetime.utcnow()
+        get_jobs_collection().update_one(
+            {"_id": job_id, "worker": worker_id, "status": "running"},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=lease_seconds), "updated_at": now}},
+        )
+
+
+def process_job(job: Dict[str, Any], worker_id: str):
+    """Generate the report for a claimed job and record the outcome"""
+    from db_client import get_collection
+    from report_generator import regenerate_report
+
+    collection = get_jobs_collection()
+    surveys = get_collection()
+    done = threading.Event()
+    heartbeat = threading.Thread(target=_keep_leased, args=(job["_id"], worker_id, done), daemon=True)
+    heartbeat.start()
+    started = time.perf_counter()
+    try:
+        survey = surveys.find_one({"_id": job["survey_id"]})
+        if survey is None:
+            raise LookupError("Survey no longer exists")
+        previous = survey.get("report")
+        _, record = regenerate_report(survey)
+
+        # A lease that expired mid-generation may have handed the job to another worker
+        now = datetime.utcnow()
+        owned = collection.update_one(
+            {"_id": job["_id"], "worker": worker_id, "status": "running"},
+            {"$set": {"lease_expires_at": now + timedelta(seconds=get_config().report_queue.lease_seconds),
+                      "updated_at": now}},
+        )
+        if not owned.modified_count:
+            print(f"Report job {job['_id']} lost its lease; discarding the report")
+            return
+        # Skip if another writer stored a newer report meanwhile
+        guard = {"report.generated_at": previous["generated_at"]} if previous else {"report": {"$exists": False}}
+        stored = surveys.update_one({"_id": survey["_id"], **guard},
+                                    {"$set": {"report": record, "updated_at": datetime.utcnow()}})
+
+        now = datetime.utcnow()
+        collection.update_one(
+            {"_id": job["_id"], "worker": worker_id, "status": "running"},
+            {"$set": {"status": "done", "finished_at": now, "updated_at": now,
+                      "result": {"actions": record["actions"], "stored": bool(stored.modified_count),
+                                 "seconds": round(time.perf_counter() - started, 1)}},
+             "$unset": {"active": "", "error": ""}},
+        )
+        print(f"Report job {job['_id']} done in {time.perf_counter() - started:.1f}s")
+    except Exception as e:
+        retry = not isinstance(e, LookupError) and job.get("attempts", 1) < get_config().report_queue.max_attempts
+        now = datetime.utcnow()
+        update = {"$set": {"status": "queued" if retry else "failed", "error": str(e), "updated_at": now}}
+        if not retry:
+            update["$set"]["finished_at"] = now
+            update["$unset"] = {"active": ""}
+        collection.update_one({"_id": job["_id"], "worker": worker_id}, update)
+        print(f"Report job {job['_id']} failed (attempt {job.get('attempts', 1)}): {e}")
+    finally:
+        done.set()
+
+
+def run_worker(stop: threading.Event, worker_id: Optional[str] = None, once: bool = False) -> int:
+    """Claim and process jobs until `stop` is set (or the queue is empty, with once=True)"""
+    worker_id = worker_id or new_worker_id()
+    processed = 0
+    while not stop.is_set():
+        try:
+            job = claim_job(worker_id)
+        except Exception as e:
+            print(f"Report worker {worker_id}: queue unavailable: {e}")
+            job = None
+        if job is None:
+            if once:
+                break
+            stop.wait(get_config().report_queue.poll_seconds)
+            continue
+        process_job(job, worker_id)
+        processed += 1
+    return processed
+
+
+def start_embedded_workers():
+    """Start [REPORT_QUEUE] embedded_workers daemon threads in this process (once).
+
+    Called at app startup, not only on enqueue, so jobs left queued (or with
+    an expired lease) by a restarted process are picked up without waiting
+    for a new report request.
+    """
+    settings = get_config().report_queue
+    if settings.mode != "queue":
+        return
+    with _embedded_lock:
+        if _embedded_threads:
+            return
+        for _ in range(settings.embedded_workers):
+            thread = threading.Thread(target=run_worker, args=(threading.Event(),), daemon=True,
+                                      name="report-worker")
+            thread.start()
+            _embedded_threads.append(thread)
@@ -0,0 +1,61 @@
+"""
+Report Worker
+Standalone process that generates queued assessment reports
+Author: Optimum AI Lab
+
+Claims jobs from the [REPORT_QUEUE] collection with leases and runs the report
+generator for each. Start as many as needed; on SIGINT/SIGTERM each thread
+finishes its current report and exits.
+
+Usage (from the repository root):
+    python app/report_worker.py --concurrency 2
+    python app/report_worker.py --once            # drain the queue, then exit
+"""
+
+import os
+import sys
+import signal
+import argparse
+import threading
+from typing import List, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Process queued report jobs")
+    parser.add_argument("--concurrency", type=int, default=1, help="Jobs processed in parallel")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    from report_jobs import new_worker_id, run_worker
+    from db_client import close_clients
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    counts = [0] * args.concurrency
+
+    def loop(i: int):
+        counts[i] = run_worker(stop, new_worker_id(), once=args.once)
+
+    threads = [threading.Thread(target=loop, args=(i,), name=f"report-worker-{i}") for i in range(args.concurrency)]
+    print(f"Report worker started with {args.concurrency} thread(s)")
+    for thread in threads:
+        thread.start()
+    # Join with a timeout so signals are handled promptly in the main thread
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=0.5)
+
+    close_clients()
+    print(f"Report worker stopped after {sum(counts)} job(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, APP_DIR)
+    sys.exit(main())
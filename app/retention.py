@@ -0,0 +1,182 @@
+"""
+Retention Module
+Archives surveys older than the retention period to compressed JSONL, then deletes them
+Author: Optimum AI Lab
+
+Expired surveys are selected by _id range (ObjectIds embed their creation time,
+so the query uses the primary index every collection already has) and streamed
+in batches. Each batch is written to its own gzip JSONL part, read back and
+counted, and only then deleted with a bounded delete_many on exactly those
+_ids, pausing between batches so live traffic is not starved. A manifest with
+per-part counts and SHA-256 checksums is written next to the parts.
+
+Usage (from the repository root; suitable for cron):
+    python app/retention.py --dry-run
+    python app/retention.py --days 180 --archive-dir archives
+    python app/retention.py --archive-only
+"""
+
+import os
+import sys
+import json
+import gzip
+import time
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def expiry_query(days: float) -> Dict:
+    """Surveys created more than `days` ago"""
+    from bson import ObjectId
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return {"_id": {"$lt": ObjectId.from_datetime(cutoff)}}
+
+
+def count_expired(days: float, collection=None) -> int:
+    """Number of surveys the next run would archive"""
+    if collection is None:
+        from db_client import get_collection
+        collection = get_collection()
+    return collection.count_documents(expiry_query(days))
+
+
+def _write_part(path: str, docs: List[Dict]) -> Dict:
+    """Write one gzip JSONL part, then read it back to verify the line count"""
+    from bson import json_util
+
+    with open(path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            for doc in docs:
+                f.write((json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS) + "\n").encode("utf-8"))
+        raw.flush()
+        # On disk before anything is deleted
+        os.fsync(raw.fileno())
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = sum(1 for _ in f)
+    if lines != len(docs):
+        raise IOError(f"{path}: wrote {len(docs)} documents but read back {lines}")
+    return {"file": os.path.basename(path), "documents": lines, "sha256": digest.hexdigest()}
+
+
+def run_retention(days: Optional[float] = None, archive_dir: Optional[str] = None,
+                  batch_size: Optional[int] = None, pause_seconds: Optional[float] = None,
+                  delete: bool = True, limit: int = 0, collection=None,
+                  progress: Optional[ProgressCallback] = None) -> Dict:
+    """Archive (and by default delete) expired surveys; returns the run manifest"""
+    from app_config import get_config
+
+    settings = get_config().retention
+    days = settings.retention_days if days is None else days
+    archive_dir = archive_dir or settings.archive_dir
+    batch_size = batch_size or settings.batch_size
+    pause_seconds = settings.pause_seconds if pause_seconds is None else pause_seconds
+    if collection is None:
+        from db_client import get_collection
+        collection = get_collection()
+
+    query = expiry_query(days)
+    total = collection.count_documents(query)
+    if limit:
+        total = min(total, limit)
+
+    run_dir = os.path.join(archive_dir, f"{collection.name}-{datetime.utcnow():%Y%m%dT%H%M%SZ}")
+    manifest = {
+        "collection": collection.name,
+        "retention_days": days,
+        "cutoff_id": str(query["_id"]["$lt"]),
+        "started_at": datetime.utcnow().isoformat(),
+        "deleted": 0,
+        "archived": 0,
+        "parts": [],
+    }
+    if total == 0:
+        manifest["finished_at"] = manifest["started_at"]
+        return manifest
+    os.makedirs(run_dir, exist_ok=True)
+
+    def save_manifest():
+        with open(os.path.join(run_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    # Oldest first; each pass resumes after the last archived _id
+    last_id = None
+    while manifest["archived"] < total:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query = {"_id": {"$lt": query["_id"]["$lt"], "$gt": last_id}}
+        size = min(batch_size, total - manifest["archived"])
+        docs = list(collection.find(batch_query).sort("_id", 1).limit(size))
+        if not docs:
+            break
+
+        part = _write_part(os.path.join(run_dir, f"part-{len(manifest['parts']) + 1:05d}.jsonl.gz"), docs)
+        ids = [doc["_id"] for doc in docs]
+        part["first_id"], part["last_id"] = str(ids[0]), str(ids[-1])
+        if delete:
+            part["deleted"] = collection.delete_many({"_id": {"$in": ids}}).deleted_count
+            manifest["deleted"] += part["deleted"]
+        manifest["parts"].append(part)
+        manifest["archived"] += len(docs)
+        last_id = ids[-1]
+        save_manifest()
+
+        if progress:
+            progress(manifest["archived"], total)
+        if pause_seconds and manifest["archived"] < total:
+            time.sleep(pause_seconds)
+
+    manifest["archive_dir"] = run_dir
+    manifest["finished_at"] = datetime.utcnow().isoformat()
+    save_manifest()
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Archive and delete surveys past the retention period")
+    parser.add_argument("--days", type=float, default=None, help="Retention period (default [RETENTION] retention_days)")
+    parser.add_argument("--archive-dir", default=None, help="Archive root (default [RETENTION] archive_dir)")
+    parser.add_argument("--batch-size", type=int, default=None, help="Documents per archive part / delete")
+    parser.add_argument("--pause", type=float, default=None, help="Seconds to pause between batches")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many documents (0 = all)")
+    parser.add_argument("--archive-only", action="store_true", help="Write archives but keep the documents")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the expired surveys")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    from app_config import get_config
+    from db_client import close_clients
+
+    days = get_config().retention.retention_days if args.days is None else args.days
+    if args.dry_run:
+        print(f"{count_expired(days)} surveys are older than {days:g} days")
+        close_clients()
+        return 0
+
+    started = time.perf_counter()
+
+    def report(done: int, total: int):
+        print(f"{done}/{total} archived ({done / total:.0%}, {time.perf_counter() - started:.1f}s)")
+
+    manifest = run_retention(days, args.archive_dir, args.batch_size, args.pause,
+                             delete=not args.archive_only, limit=args.limit, progress=report)
+    print(f"Archived {manifest['archived']} and deleted {manifest['deleted']} surveys older than {days:g} days"
+          + (f" into {manifest['archive_dir']}" if manifest.get("archive_dir") else ""))
+    close_clients()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, APP_DIR)
+    sys.exit(main())
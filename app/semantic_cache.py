@@ -0,0 +1,168 @@
+"""
+Semantic Cache Module
+Reuses Step 2 follow-up questions for near-identical recent conversations
+Author: Optimum AI Lab
+
+The last few question/answer turns are embedded locally as hashed character
+n-gram vectors (no external service). A lookup compares the embedding against
+earlier conversations at the same question number; when cosine similarity
+reaches the threshold, the follow-up generated for that conversation is reused
+instead of calling the LLM. Entries are bounded and evicted least recently used.
+"""
+
+import math
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app_config import get_config
+
+NGRAM_SIZES = (3, 4, 5)
+HASH_DIMENSIONS = 1 << 16
+
+
+def embed_text(text: str) -> Dict[int, float]:
+    """L2-normalized sparse vector of hashed character n-grams (sublinear tf)"""
+    text = re.sub(r"\s+", " ", text.lower()).strip()
+    counts: Dict[int, int] = {}
+    padded = f" {text} "
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            bucket = zlib.crc32(padded[i:i + n].encode("utf-8")) % HASH_DIMENSIONS
+            counts[bucket] = counts.get(bucket, 0) + 1
+
+    vector = {k: 1.0 + math.log(c) for k, c in counts.items()}
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    if not norm:
+        return {}
+    return {k: w / norm for k, w in vector.items()}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    """Cosine similarity of two normalized sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(k, 0.0) for k, w in a.items())
+
+
+class CacheEntry:
+    """One cached follow-up question"""
+
+    __slots__ = ("depth", "vector", "question", "generation_seconds", "hits")
+
+    def __init__(self, depth: int, vector: Dict[int, float], question: str, generation_seconds: float):
+        self.depth = depth
+        self.vector = vector
+        self.question = question
+        self.generation_seconds = generation_seconds
+        self.hits = 0
+
+
+class SemanticCache:
+    """Bounded LRU of (recent conversation embedding -> generated follow-up)"""
+
+    def __init__(self, max_entries: int = 2000, threshold: float = 0.92, context_turns: int = 2):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.context_turns = context_turns
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._by_depth: Dict[int, Dict[int, CacheEntry]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self.lookup_seconds = 0.0
+        self.config_version = 0
+
+    def _context_text(self, conversation_history: List[Dict]) -> str:
+        """The recent turns that the next question mostly depends on"""
+        recent = conversation_history[-self.context_turns:] if self.context_turns > 0 else conversation_history
+        return "\n".join(f"Q: {item.get('question', '')}\nA: {item.get('answer', '')}" for item in recent)
+
+    def lookup(self, conversation_history: List[Dict]) -> Optional[Tuple[str, float]]:
+        """Cached follow-up and its similarity, or None on a miss"""
+        start = time.perf_counter()
+        depth = len(conversation_history)
+        vector = embed_text(self._context_text(conversation_history))
+        asked = {item.get("question", "") for item in conversation_history}
+
+        best_id, best_score = None, 0.0
+        with self._lock:
+            self.lookups += 1
+            for entry_id, entry in self._by_depth.get(depth, {}).items():
+                # Never hand back a question this respondent has already seen
+                if entry.question in asked:
+                    continue
+                score = cosine(vector, entry.vector)
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            result = None
+            if best_id is not None and best_score >= self.threshold:
+                entry = self._entries[best_id]
+                self._entries.move_to_end(best_id)
+                entry.hits += 1
+                self.hits += 1
+                self.saved_seconds += entry.generation_seconds
+                result = (entry.question, best_score)
+            self.lookup_seconds += time.perf_counter() - start
+        return result
+
+    def store(self, conversation_history: List[Dict], question: str, generation_seconds: float):
+        """Remember a freshly generated follow-up"""
+        depth = len(conversation_history)
+        vector = embed_text(self._context_text(conversation_history))
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            entry = CacheEntry(depth, vector, question, generation_seconds)
+            self._entries[entry_id] = entry
+            self._by_depth.setdefault(depth, {})[entry_id] = entry
+            while len(self._entries) > self.max_entries:
+                old_id, old = self._entries.popitem(last=False)
+                self._by_depth[old.depth].pop(old_id, None)
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        """Hit rate and latency savings"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+                "evictions": self.evictions,
+                "saved_seconds": round(self.saved_seconds, 2),
+                "avg_lookup_ms": round(self.lookup_seconds / self.lookups * 1000, 2) if self.lookups else 0.0,
+            }
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Process-wide cache from [SEMANTIC_CACHE], or None when disabled.
+
+    Threshold and size changes in a reloaded config apply to the existing
+    entries (the size bound takes effect on the next store).
+    """
+    global _cache
+    cfg = get_config()
+    settings = cfg.semantic_cache
+    if not settings.enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache(settings.max_entries, settings.similarity_threshold, settings.context_turns)
+        elif _cache.config_version != cfg.version:
+            _cache.max_entries = settings.max_entries
+            _cache.threshold = settings.similarity_threshold
+            _cache.context_turns = settings.context_turns
+        _cache.config_version = cfg.version
+        return _cache
@@ -0,0 +1,320 @@
+"""
+Session Model Module
+Compact per-session survey state, shared report cache and memory accounting
+Author: Optimum AI Lab
+"""
+
+import sys
+import hashlib
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import streamlit as st
+
+SURVEY_STATE_KEY = "survey"
+SESSION_ID_PARAM = "sid"
+_RESTORED_KEY = "_session_restored"
+_SESSION_ID_KEY = "_session_id"
+_DIGEST_KEY = "_session_digest"
+
+
+class SurveyState:
+    """All survey progress for one respondent, each piece stored once.
+
+    Step 2 keeps parallel question/answer lists; the conversation history the
+    question generator needs is derived from them on demand instead of being
+    stored a second time.
+    """
+
+    __slots__ = (
+        "user_role",
+        "survey_started",
+        "current_step",
+        "step1_complete",
+        "step2_complete",
+        "step3_complete",
+        "survey_complete",
+        "step1_answers",
+        "step3_answers",
+        "section2_questions",
+        "section2_answers",
+        "section2_index",
+        "section2_plan",
+        "section2_plan_anchor",
+        "section2_llm_calls",
+        "section2_replans",
+        "step1_page",
+        "step3_page",
+        "survey_reruns",
+        "survey_id",
+    )
+
+    def __init__(self):
+        self.user_role = None
+        self.survey_started = False
+        self.current_step = 0
+        self.step1_complete = False
+        self.step2_complete = False
+        self.step3_complete = False
+        self.survey_complete = False
+        self.step1_answers: Dict[str, str] = {}
+        self.step3_answers: Dict[str, str] = {}
+        self.section2_questions: List[str] = []
+        self.section2_answers: List[str] = []
+        self.section2_index = 0
+        self.section2_plan: List[str] = []  # queued follow-ups in batched mode
+        self.section2_plan_anchor = ""  # answer the plan was generated from
+        self.section2_llm_calls = 0
+        self.section2_replans = 0  # plans dropped because an answer diverged
+        self.step1_page = 0
+        self.step3_page = 0
+        self.survey_reruns: Dict[str, int] = {}  # step number -> script reruns
+        self.survey_id = None
+
+    @property
+    def section2_history(self) -> List[Dict[str, str]]:
+        """Answered Step 2 turns as [{"question", "answer"}, ...]"""
+        return [
+            {"question": q, "answer": a}
+            for q, a in zip(self.section2_questions, self.section2_answers)
+        ]
+
+    def record_section2_answer(self, index: int, answer: str) -> bool:
+        """Store the answer for question `index`.
+
+        Returns True when later questions must be (re)generated, i.e. the
+        answer is new or changed; follow-ups built on an edited answer are
+        dropped (with any batched plan) since they no longer match the
+        conversation.
+        """
+        if index < len(self.section2_answers):
+            if self.section2_answers[index] == answer:
+                return False
+            del self.section2_answers[index:]
+            del self.section2_questions[index + 1:]
+            self.section2_plan = []
+            self.section2_plan_anchor = ""
+        self.section2_answers.append(answer)
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Fields that differ from a fresh state (everything is JSON-native)"""
+        defaults = SurveyState()
+        return {
+            slot: getattr(self, slot)
+            for slot in self.__slots__
+            if getattr(self, slot) != getattr(defaults, slot)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SurveyState":
+        """Rebuild from to_dict output, ignoring fields this version no longer has"""
+        state = cls()
+        for slot, value in data.items():
+            if slot in cls.__slots__:
+                setattr(state, slot, value)
+        return state
+
+
+def get_survey_state() -> SurveyState:
+    """Get or create the current session's survey state"""
+    state = st.session_state.get(SURVEY_STATE_KEY)
+    if state is None:
+        state = SurveyState()
+        st.session_state[SURVEY_STATE_KEY] = state
+    return state
+
+
+# ===== EXTERNAL SESSION STORE =====
+
+def _get_session_id() -> Optional[str]:
+    """Session id from the page URL"""
+    values = st.experimental_get_query_params().get(SESSION_ID_PARAM)
+    return values[0] if values else None
+
+
+def restore_session():
+    """Load the logged-in respondent's survey state from the session store.
+
+    Runs once per login, i.e. on the first authenticated rerun a replica serves
+    for a respondent; later reruns use the in-process copy. The sid travels in
+    the URL (history, shared links, proxy logs), so it only locates stored
+    progress: the state is restored only for the user who wrote it, and the sid
+    is replaced on every login, so an id left behind stops working once its
+    owner logs in again. The login itself is never stored.
+    """
+    if not st.session_state.get("authenticated") or st.session_state.get(_RESTORED_KEY):
+        return
+    st.session_state[_RESTORED_KEY] = True
+
+    session_id = _get_session_id()
+    if not session_id:
+        return
+    # Never write to a sid from the URL: persist_session() picks a fresh one
+    st.experimental_set_query_params()
+    from session_store import decode_payload, get_session_store
+    store = get_session_store()
+    try:
+        blob = store.get(session_id)
+        if blob is None:
+            return
+        payload = decode_payload(blob)
+        if payload.get("owner") != st.session_state.get("current_user"):
+            return
+        store.delete(session_id)
+    except Exception as e:
+        print(f"Session restore failed: {e}")
+        return
+
+    st.session_state[SURVEY_STATE_KEY] = SurveyState.from_dict(payload.get("survey", {}))
+
+
+def persist_session():
+    """Write this session to the session store if it changed since the last write"""
+    if not st.session_state.get("authenticated") or not st.session_state.get(_RESTORED_KEY):
+        return
+    from session_store import encode_payload, get_session_store
+
+    payload = {"owner": st.session_state.get("current_user"), "survey": get_survey_state().to_dict()}
+    blob = encode_payload(payload)
+    digest = hashlib.sha1(blob).hexdigest()
+    if st.session_state.get(_DIGEST_KEY) == digest:
+        return
+
+    session_id = st.session_state.get(_SESSION_ID_KEY)
+    if not session_id:
+        session_id = secrets.token_urlsafe(24)
+        st.session_state[_SESSION_ID_KEY] = session_id
+        st.experimental_set_query_params(**{SESSION_ID_PARAM: session_id})
+    try:
+        get_session_store().put(session_id, blob)
+        st.session_state[_DIGEST_KEY] = digest
+    except Exception as e:
+        print(f"Session persist failed: {e}")
+
+
+def clear_session():
+    """Forget this session in the store and drop its id from the URL (logout / reset)"""
+    session_id = st.session_state.get(_SESSION_ID_KEY)
+    if session_id:
+        from session_store import get_session_store
+        try:
+            get_session_store().delete(session_id)
+        except Exception as e:
+            print(f"Session delete failed: {e}")
+    st.experimental_set_query_params()
+
+
+class SharedReportCache:
+    """Process-wide LRU of generated report markdown, keyed by survey id.
+
+    Reports are large and identical for every admin viewing the same survey,
+    so they live here instead of in each admin's session.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, doc_id: Optional[str]) -> Optional[str]:
+        """Get a cached report, refreshing its recency"""
+        if not doc_id:
+            return None
+        with self._lock:
+            report = self._items.get(doc_id)
+            if report is not None:
+                self._items.move_to_end(doc_id)
+            return report
+
+    def put(self, doc_id: str, report: str):
+        """Cache a report, evicting the least recently used beyond capacity"""
+        with self._lock:
+            self._items[doc_id] = report
+            self._items.move_to_end(doc_id)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def pop(self, doc_id: str):
+        """Drop a cached report, e.g. after the survey is deleted"""
+        with self._lock:
+            self._items.pop(doc_id, None)
+
+
+report_cache = SharedReportCache()
+
+
+# ===== MEMORY ACCOUNTING =====
+
+_SKIP_TYPES = (type, type(sys), type(len), type(lambda: None))
+
+
+def deep_sizeof(obj: Any, _seen: Optional[set] = None) -> int:
+    """Approximate retained size of an object graph in bytes"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or isinstance(obj, _SKIP_TYPES):
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += deep_sizeof(key, _seen) + deep_sizeof(value, _seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += deep_sizeof(item, _seen)
+    elif hasattr(obj, "__slots__"):
+        for slot in obj.__slots__:
+            if hasattr(obj, slot):
+                size += deep_sizeof(getattr(obj, slot), _seen)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), _seen)
+    return size
+
+
+def estimate_session_bytes() -> int:
+    """Estimate the memory held by the current Streamlit session's state"""
+    seen: set = set()
+    total = 0
+    for key in list(st.session_state.keys()):
+        total += deep_sizeof(key, seen) + deep_sizeof(st.session_state[key], seen)
+    return total
+
+
+_estimates_lock = threading.Lock()
+_session_estimates: "OrderedDict[int, int]" = OrderedDict()
+_MAX_TRACKED_SESSIONS = 1000
+
+
+def track_session_memory() -> int:
+    """Record this session's estimate in the process-wide sample"""
+    size = estimate_session_bytes()
+    key = id(get_survey_state())
+    with _estimates_lock:
+        _session_estimates[key] = size
+        _session_estimates.move_to_end(key)
+        while len(_session_estimates) > _MAX_TRACKED_SESSIONS:
+            _session_estimates.popitem(last=False)
+    return size
+
+
+def get_memory_report(budget_mb: float) -> Dict[str, Any]:
+    """Summarize tracked session sizes and the respondent capacity of a budget"""
+    with _estimates_lock:
+        sizes = list(_session_estimates.values())
+
+    if not sizes:
+        return {"sessions_sampled": 0, "avg_bytes": 0, "max_bytes": 0, "capacity": None}
+
+    avg_bytes = sum(sizes) / len(sizes)
+    max_bytes = max(sizes)
+    return {
+        "sessions_sampled": len(sizes),
+        "avg_bytes": int(avg_bytes),
+        "max_bytes": max_bytes,
+        # Size against the largest session seen, not the average
+        "capacity": int(budget_mb * 1024 * 1024 // max_bytes) if max_bytes else None,
+    }
@@ -0,0 +1,192 @@
+"""
+Session Store Module
+Pluggable external storage for survey progress so any replica can serve a respondent
+Author: Optimum AI Lab
+
+Streamlit keeps st.session_state in the process that served the first request,
+which forces sticky sessions and loses in-flight interviews on restart or
+scale-down. Each session's survey state (never its login) is instead serialized
+to compact zlib-compressed JSON and written to a shared store under a random
+session id carried in the page URL, together with the user who wrote it. A
+replica that has never seen the session loads it on the first rerun after that
+user logs in, moving it to a fresh id; afterwards a write happens only when the
+state actually changed.
+
+Backends ([SESSION_STORE] backend):
+    memory  per-process dict (default; survives browser refresh, not restarts)
+    sqlite  a file shared by replicas on the same host or volume
+    redis   any Redis-compatible server (requires the optional `redis` package)
+    mongo   a collection in the survey database, expired by a TTL index
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app_config import get_config
+
+BACKENDS = ("memory", "sqlite", "redis", "mongo")
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    """Compact JSON, compressed"""
+    return zlib.compress(json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def decode_payload(blob: bytes) -> Dict[str, Any]:
+    """Inverse of encode_payload"""
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class MemorySessionStore:
+    """Bounded per-process store with expiry"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._items.get(session_id)
+            if item is None:
+                return None
+            blob, expires_at = item
+            if expires_at < time.time():
+                del self._items[session_id]
+                return None
+            return blob
+
+    def put(self, session_id: str, blob: bytes):
+        with self._lock:
+            self._items[session_id] = (blob, time.time() + self.ttl_seconds)
+            self._items.move_to_end(session_id)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._items.pop(session_id, None)
+
+
+class SQLiteSessionStore:
+    """Single-table store in a SQLite file (WAL mode, safe for several processes)"""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS survey_sessions "
+            "(session_id TEXT PRIMARY KEY, data BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM survey_sessions WHERE expires_at < ?", (time.time(),))
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM survey_sessions WHERE session_id = ? AND expires_at >= ?",
+                (session_id, time.time()),
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put(self, session_id: str, blob: bytes):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO survey_sessions (session_id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, sqlite3.Binary(blob), time.time() + self.ttl_seconds),
+            )
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM survey_sessions WHERE session_id = ?", (session_id,))
+
+
+class RedisSessionStore:
+    """Keys with a server-side TTL on a Redis-compatible server"""
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "survey:session:"):
+        import redis
+        self._redis = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        return self._redis.get(self.prefix + session_id)
+
+    def put(self, session_id: str, blob: bytes):
+        self._redis.set(self.prefix + session_id, blob, ex=self.ttl_seconds)
+
+    def delete(self, session_id: str):
+        self._redis.delete(self.prefix + session_id)
+
+
+class MongoSessionStore:
+    """Documents in the survey database; MongoDB's TTL monitor removes expired ones"""
+
+    def __init__(self, collection_name: str, ttl_seconds: float):
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self._indexed = False
+
+    def _collection(self):
+        from db_client import get_collection
+        collection = get_collection(None, self.collection_name)
+        if not self._indexed:
+            collection.create_index("expires_at", expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def get(self, session_id: str) -> Optional[bytes]:
+        doc = self._collection().find_one({"_id": session_id, "expires_at": {"$gte": datetime.utcnow()}})
+        return bytes(doc["data"]) if doc else None
+
+    def put(self, session_id: str, blob: bytes):
+        self._collection().replace_one(
+            {"_id": session_id},
+            {"data": blob, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_seconds)},
+            upsert=True,
+        )
+
+    def delete(self, session_id: str):
+        self._collection().delete_one({"_id": session_id})
+
+
+def build_store(settings):
+    """Store for a SessionStoreSettings, falling back to memory if the backend is unavailable"""
+    ttl = settings.ttl_hours * 3600
+    try:
+        if settings.backend == "sqlite":
+            return SQLiteSessionStore(settings.sqlite_path, ttl)
+        if settings.backend == "redis":
+            return RedisSessionStore(settings.redis_url, ttl)
+        if settings.backend == "mongo":
+            return MongoSessionStore(settings.collection, ttl)
+    except Exception as e:
+        print(f"Session store '{settings.backend}' unavailable, using memory: {e}")
+    return MemorySessionStore(ttl)
+
+
+_store = None
+_store_key = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """Process-wide store from [SESSION_STORE], rebuilt when its settings change"""
+    global _store, _store_key
+    settings = get_config().session_store
+    key = (settings.backend, settings.ttl_hours, settings.sqlite_path, settings.redis_url, settings.collection)
+    with _store_lock:
+        if _store is None or key != _store_key:
+            _store = build_store(settings)
+            _store_key = key
+        return _store
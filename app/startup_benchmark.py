@@ -0,0 +1,138 @@
+"""
+Startup Benchmark
+Measures app cold start: import time and time to first render of the login page
+Author: Optimum AI Lab
+
+Each run starts a fresh interpreter, imports Streamlit's AppTest and renders
+app.py once, the way a new pod or Streamlit Cloud container serves its first
+visitor. The median over the runs is compared against thresholds (and an
+optional saved baseline); the exit code is 1 on regression, so it can gate CI.
+The run also fails if a heavy dependency is loaded by the login page.
+
+Usage (from the repository root):
+    python app/startup_benchmark.py --runs 5
+    python app/startup_benchmark.py --save-baseline startup_baseline.json
+    python app/startup_benchmark.py --baseline startup_baseline.json --tolerance 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Dict, List, Optional
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+APP_PATH = os.path.join(APP_DIR, "app.py")
+
+# Modules the login page must not pull in
+HEAVY_MODULES = ("pandas", "openai", "httpx", "pymongo", "fpdf", "report_generator", "dynamic_questions_enhanced")
+
+# Runs in a fresh interpreter; prints one JSON line of timings
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+before = set(sys.modules)
+at = AppTest.from_file({app_path!r}, default_timeout=120)
+at.run()
+rendered = time.perf_counter()
+print(json.dumps({{
+    "streamlit_import_ms": (imported - started) * 1000,
+    "first_render_ms": (rendered - imported) * 1000,
+    "script_modules": sorted(m.split(".")[0] for m in set(sys.modules) - before),
+    "exception": str(at.exception[0].value) if at.exception else None,
+}}))
+"""
+
+
+def measure_once() -> Dict:
+    """One cold start in a new process"""
+    env = dict(os.environ)
+    # Measure a real cold start: no bytecode cache warm-up differences between runs
+    env.setdefault("PYTHONDONTWRITEBYTECODE", "1")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT.format(app_path=APP_PATH)],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    total_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"Benchmark run failed:\n{proc.stderr.strip()[-2000:]}")
+
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["cold_start_ms"] = total_ms
+    result["heavy_modules"] = [m for m in HEAVY_MODULES if m in result.pop("script_modules")]
+    return result
+
+
+def median(values: List[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="App cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh-process runs (median is reported)")
+    parser.add_argument("--max-cold-start-ms", type=float, default=4000.0,
+                        help="Fail if median process start to first render exceeds this")
+    parser.add_argument("--max-first-render-ms", type=float, default=1500.0,
+                        help="Fail if median first script run exceeds this")
+    parser.add_argument("--baseline", default=None, help="Baseline JSON from --save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression vs baseline (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", default=None, help="Write the measured medians as a baseline")
+    args = parser.parse_args(argv)
+
+    runs = []
+    for i in range(args.runs):
+        run = measure_once()
+        runs.append(run)
+        print(f"run {i + 1}: cold start {run['cold_start_ms']:.0f} ms, streamlit import "
+              f"{run['streamlit_import_ms']:.0f} ms, first render {run['first_render_ms']:.0f} ms")
+
+    summary = {
+        field: round(median([r[field] for r in runs]), 1)
+        for field in ("cold_start_ms", "streamlit_import_ms", "first_render_ms")
+    }
+    heavy = sorted({m for r in runs for m in r["heavy_modules"]})
+    print(f"\nmedian: cold start {summary['cold_start_ms']} ms, streamlit import "
+          f"{summary['streamlit_import_ms']} ms, first render {summary['first_render_ms']} ms")
+
+    failures = []
+    errors = {r["exception"] for r in runs if r["exception"]}
+    if errors:
+        failures.append(f"login page raised: {'; '.join(errors)}")
+    if heavy:
+        failures.append(f"heavy modules loaded on the login page: {', '.join(heavy)}")
+    if summary["cold_start_ms"] > args.max_cold_start_ms:
+        failures.append(f"cold start {summary['cold_start_ms']} ms > {args.max_cold_start_ms} ms")
+    if summary["first_render_ms"] > args.max_first_render_ms:
+        failures.append(f"first render {summary['first_render_ms']} ms > {args.max_first_render_ms} ms")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        for field in ("cold_start_ms", "first_render_ms"):
+            limit = baseline[field] * (1 + args.tolerance)
+            if summary[field] > limit:
+                failures.append(f"{field} {summary[field]} ms regressed beyond {limit:.1f} ms "
+                                f"(baseline {baseline[field]} ms + {args.tolerance:.0%})")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,7 +6,6 @@ Version: 2.2 (Fixed)
 """
 
 import streamlit as st
-import os
 
 # Load environment variables - handle gracefully if dotenv not available
 try:
@@ -22,15 +21,17 @@ from dynamic_questions_enhanced import (
     FIRST_QUESTION,
     get_dynamic_question_manager,
     generate_next_question,
+    generate_followup_batch,
+    answer_diverges,
     generate_insights_summary,
     validate_answer
 )
+from session_model import get_survey_state
+from llm_client import llm_available
 
 def check_api_key():
-    """Check if OpenAI API key is available"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    
-    if not api_key:
+    """Check if OpenAI API key is available (or an offline LLM transport is set)"""
+    if not llm_available():
         st.warning("""
         ⚠️ **OpenAI API Key Not Found**
         
@@ -52,6 +53,42 @@ def check_api_key():
     
     return True
 
+def get_followup_mode(cfg) -> str:
+    """Step 2 generation mode: per_answer (one call per question) or batched (k follow-ups per call)"""
+    return cfg.followups.mode
+
+def next_batched_question(state, cfg) -> str:
+    """Next question from the batched follow-up plan.
+
+    A new batch is requested only when the plan is used up or the latest
+    answer clearly moves to topics the plan does not cover, and replans for
+    divergence are capped per interview.
+    """
+    settings = cfg.followups
+    answer = state.section2_answers[-1]
+    if (state.section2_plan and state.section2_replans < settings.max_replans
+            and answer_diverges(answer, [state.section2_plan_anchor, state.section2_questions[-1], *state.section2_plan],
+                                settings.divergence_threshold, settings.divergence_min_terms)):
+        state.section2_plan = []
+        state.section2_replans += 1
+    
+    if not state.section2_plan:
+        state.section2_llm_calls += 1
+        state.section2_plan = generate_followup_batch(
+            answer,
+            cfg.app.num_followups_per_open,
+            list(state.section2_questions),
+            cfg.followups.system_prompt,
+            cfg.followups.user_template
+        )
+        state.section2_plan_anchor = answer
+    
+    if not state.section2_plan:
+        # Batch unavailable: fall back to a single generated question
+        state.section2_llm_calls += 1
+        return generate_next_question(state.section2_history)
+    return state.section2_plan.pop(0)
+
 def render_step2_dynamic_questions_enhanced(cfg, role):
     """Render Step 2 with dynamic questions"""
     st.subheader("Step 2 — Deep Dive: Intelligent Discovery Conversation")
@@ -65,24 +102,14 @@ def render_step2_dynamic_questions_enhanced(cfg, role):
     # Check API key availability
     has_api_key = check_api_key()
     
-    # Initialize session state for Step 2
-    if "section2_questions" not in st.session_state:
-        st.session_state["section2_questions"] = []
-    
-    if "section2_answers" not in st.session_state:
-        st.session_state["section2_answers"] = []
-    
-    if "section2_current_index" not in st.session_state:
-        st.session_state["section2_current_index"] = 0
-    
-    if "section2_conversation_history" not in st.session_state:
-        st.session_state["section2_conversation_history"] = []
+    # Step 2 state: questions and answers are stored once on the survey state
+    state = get_survey_state()
     
     # Initialize first question
-    if len(st.session_state["section2_questions"]) == 0:
-        st.session_state["section2_questions"].append(FIRST_QUESTION)
+    if len(state.section2_questions) == 0:
+        state.section2_questions.append(FIRST_QUESTION)
     
-    current_index = st.session_state["section2_current_index"]
+    current_index = state.section2_index
     total_questions = 15
     
     # Progress bar
@@ -93,7 +120,7 @@ def render_step2_dynamic_questions_enhanced(cfg, role):
     
     # Display current question
     if current_index < total_questions:
-        current_question = st.session_state["section2_questions"][current_index]
+        current_question = state.section2_questions[current_index]
 
         # Display question number and text
         st.markdown(f"### Question {current_index + 1} of {total_questions}")
@@ -109,6 +136,7 @@ def render_step2_dynamic_questions_enhanced(cfg, role):
         # Answer input
         answer = st.text_area(
             label="Your answer",
+            value=state.section2_answers[current_index] if current_index < len(state.section2_answers) else "",
             key=f"section2_answer_{current_index}",
             height=150,
             placeholder="Please provide a detailed answer...",
@@ -129,7 +157,7 @@ def render_step2_dynamic_questions_enhanced(cfg, role):
         with col1:
             if current_index > 0:
                 if st.button("← Previous", use_container_width=True):
-                    st.session_state["section2_current_index"] -= 1
+                    state.section2_index -= 1
                     st.rerun()
         
         with col3:
@@ -139,23 +167,18 @@ def render_step2_dynamic_questions_enhanced(cfg, role):
                 if not is_valid:
                     st.error(f"❌ {message}")
                 else:
-                    # Save answer
-                    st.session_state["section2_answers"].append(answer)
-                    
-                    # Add to conversation history
-                    st.session_state["section2_conversation_history"].append({
-                        "question": current_question,
-                        "answer": answer
-                    })
+                    # Save answer (conversation history is derived from it)
+                    needs_next_question = state.record_section2_answer(current_index, answer)
                     
                     # Generate next question if not at the end
-                    if current_index + 1 < total_questions:
+                    if needs_next_question and current_index + 1 < total_questions:
                         with st.spinner("Generating next question..."):
                             try:
-                                if has_api_key:
-                                    next_q = generate_next_question(
-                                        st.session_state["section2_conversation_history"]
-                                    )
+                                if has_api_key and get_followup_mode(cfg) == "batched":
+                                    next_q = next_batched_question(state, cfg)
+                                elif has_api_key:
+                                    state.section2_llm_calls += 1
+                                    next_q = generate_next_question(state.section2_history)
                                 else:
                                     # Use fallback questions
                                     fallback_questions = [
@@ -177,16 +200,16 @@ def render_step2_dynamic_questions_enhanced(cfg, role):
                                     ]
                                     next_q = fallback_questions[current_index]
                                 
-                                st.session_state["section2_questions"].append(next_q)
+                                state.section2_questions.append(next_q)
                             except Exception as e:
                                 st.error(f"Error generating question: {str(e)}")
                                 # Use fallback
-                                st.session_state["section2_questions"].append(
+                                state.section2_questions.append(
                                     "Please elaborate on your previous answer with more specific details."
                                 )
                     
                     # Move to next question
-                    st.session_state["section2_current_index"] += 1
+                    state.section2_index += 1
                     st.rerun()
     
     else:
@@ -195,7 +218,7 @@ def render_step2_dynamic_questions_enhanced(cfg, role):
         st.markdown("### Summary of Your Responses")
         
         # Display conversation history
-        for i, item in enumerate(st.session_state["section2_conversation_history"], 1):
+        for i, item in enumerate(state.section2_history, 1):
             st.markdown(f"**Q{i}:** {item['question']}")
             st.markdown(f"**A:** {item['answer']}")
             st.divider()
@@ -206,8 +229,8 @@ def render_step2_dynamic_questions_enhanced(cfg, role):
                 try:
                     if has_api_key:
                         insights = generate_insights_summary(
-                            st.session_state["section2_questions"],
-                            st.session_state["section2_answers"]
+                            state.section2_questions,
+                            state.section2_answers
                         )
                     else:
                         insights = """## Survey Summary
@@ -236,8 +259,8 @@ Thank you for completing this survey. Your responses have been recorded and will
         
         # Complete button
         if st.button("Complete Step 2 →", type="primary", use_container_width=True):
-            st.session_state["step2_complete"] = True
-            st.session_state["current_step"] = 2
+            state.step2_complete = True
+            state.current_step = 2
             st.rerun()
 
 
@@ -0,0 +1,215 @@
+"""
+Survey Metrics Module
+Cheap, local per-survey scores computed once at write time and stored as small numbers
+Author: Optimum AI Lab
+
+score_survey() reads a survey's answers through the shared decoder and returns
+a compact `metrics` sub-document:
+
+    {"v": 1, "completeness": 0.94, "maturity": 0.61,
+     "answered": {"step1": 17, "step2": 10, "step3": 15},
+     "words": {"step1": 23.5, "step2": 14.0, "step3": 11.2},
+     "categories": {"architecture_scale": {"c": 1.0, "m": 0.68}, ...},
+     "pillars": {"infrastructure": {"c": 1.0, "m": 0.55}, ...}}
+
+`c` is the share of the category's questions that were answered and `m` a
+keyword-based maturity signal in [0, 1] (0.5 when an answer has no signal
+either way; null when nothing in the category was answered, so $avg skips it).
+No LLM is involved. Dashboards and cohort comparisons aggregate
+these fields server-side instead of re-reading answer text.
+
+Usage (from the repository root; backfills surveys saved before scoring existed):
+    python app/survey_metrics.py --dry-run
+    python app/survey_metrics.py --batch-size 500
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(APP_DIR)
+
+METRICS_VERSION = 1
+
+# Step 3 categories reported as pillars
+PILLARS = {
+    "INFRASTRUCTURE": "infrastructure",
+    "GOVERNANCE & APPROVALS": "governance",
+    "FRAMEWORKS & STANDARDS": "frameworks",
+}
+
+POSITIVE_SIGNALS = (
+    r"in place", r"implemented", r"established", r"automat\w*", r"standardi[sz]ed", r"documented",
+    r"approved", r"monitor(ed|ing)", r"governed", r"centrali[sz]ed", r"production", r"enterprise",
+    r"framework", r"polic(y|ies)", r"registry", r"ci/cd", r"pipelines?", r"dashboards?", r"slas?",
+    r"audit(ed|s)?", r"yes", r"mature", r"defined", r"certified", r"version(ed|ing)",
+)
+NEGATIVE_SIGNALS = (
+    r"no", r"not", r"none", r"manual(ly)?", r"ad[ -]hoc", r"planning", r"planned", r"plan to",
+    r"lack(s|ing)?", r"gaps?", r"unknown", r"unclear", r"tbd", r"pilot", r"poc", r"legacy",
+    r"limited", r"spreadsheets?", r"excel", r"evaluating", r"exploring", r"don'?t",
+)
+
+_POSITIVE = re.compile(r"\b(?:" + "|".join(POSITIVE_SIGNALS) + r")\b", re.IGNORECASE)
+_NEGATIVE = re.compile(r"\b(?:" + "|".join(NEGATIVE_SIGNALS) + r")\b", re.IGNORECASE)
+_EMPTY_ANSWERS = {"", "n/a", "na", "-", "none provided"}
+
+
+def slug(category: str) -> str:
+    """Field-safe key for a category name ("ETL, Dev & Tooling" -> "etl_dev_tooling")"""
+    return re.sub(r"[^a-z0-9]+", "_", category.lower()).strip("_") or "other"
+
+
+def is_answered(answer: Any) -> bool:
+    return str(answer or "").strip().lower() not in _EMPTY_ANSWERS
+
+
+def maturity_signal(answer: str) -> float:
+    """Positive vs gap keywords in one answer, smoothed so an answer without either scores 0.5"""
+    positive = len(_POSITIVE.findall(answer))
+    negative = len(_NEGATIVE.findall(answer))
+    return (positive + 1) / (positive + negative + 2)
+
+
+_categories = None  # (config version, {question id: category})
+
+
+def question_categories() -> Dict[str, str]:
+    """Category of every fixed Step 1 and Step 3 question the app serves now"""
+    global _categories
+    from app_config import get_config
+    from question_catalog import AI_GENAI_QUESTIONS, load_fixed_questions
+
+    cfg = get_config()
+    if _categories is None or _categories[0] != cfg.version:
+        categories = {q["id"]: q.get("category") or "General" for q in load_fixed_questions(cfg) if q.get("id")}
+        categories.update({q["id"]: q["category"] for q in AI_GENAI_QUESTIONS})
+        _categories = (cfg.version, categories)
+    return _categories[1]
+
+
+def _group_scores(rows: List[Tuple[Any, str, str]], categories: Dict[str, str], totals: Dict[str, int],
+                  names: Optional[Dict[str, str]] = None) -> Dict[str, Dict[str, float]]:
+    """{category key: {"c": completeness, "m": mean maturity}} for the categories in `totals`"""
+    signals: Dict[str, List[float]] = {}
+    for key, _, answer in rows:
+        category = categories.get(key) if isinstance(key, str) else None
+        if category in totals and is_answered(answer):
+            signals.setdefault(category, []).append(maturity_signal(str(answer)))
+    scores = {}
+    for category, total in totals.items():
+        answered = signals.get(category, [])
+        scores[(names or {}).get(category) or slug(category)] = {
+            "c": round(min(len(answered) / total, 1.0), 3),
+            "m": round(sum(answered) / len(answered), 3) if answered else None,
+        }
+    return scores
+
+
+def score_survey(doc: Dict[str, Any], catalog=None) -> Dict[str, Any]:
+    """The `metrics` sub-document for one survey (schema 2 or legacy)"""
+    from survey_schema import decode_answers
+
+    decoded = decode_answers(doc, catalog)
+    categories = question_categories()
+    totals: Dict[str, Dict[str, int]] = {"step1": {}, "step3": {}}
+    for category in categories.values():
+        step = "step3" if category in PILLARS else "step1"
+        totals[step][category] = totals[step].get(category, 0) + 1
+
+    answered = {step: [row for row in rows if is_answered(row[2])] for step, rows in decoded.items()}
+    fixed_total = sum(sum(step.values()) for step in totals.values())
+    fixed_answered = len(answered["step1"]) + len(answered["step3"])
+    fixed_signals = [maturity_signal(str(row[2])) for step in ("step1", "step3") for row in answered[step]]
+
+    return {
+        "v": METRICS_VERSION,
+        "completeness": round(min(fixed_answered / fixed_total, 1.0), 3) if fixed_total else 0.0,
+        "maturity": round(sum(fixed_signals) / len(fixed_signals), 3) if fixed_signals else None,
+        "answered": {step: len(rows) for step, rows in answered.items()},
+        "words": {
+            step: round(sum(len(str(row[2]).split()) for row in rows) / len(rows), 1) if rows else 0.0
+            for step, rows in answered.items()
+        },
+        "categories": _group_scores(decoded["step1"], categories, totals["step1"]),
+        "pillars": _group_scores(decoded["step3"], categories, totals["step3"], PILLARS),
+    }
+
+
+def cohort_pipeline(group_by: str = "user_role") -> List[Dict[str, Any]]:
+    """Aggregation pipeline for mean scores per cohort"""
+    return [
+        {"$match": {"metrics.v": {"$exists": True}}},
+        {"$group": {
+            "_id": f"${group_by}",
+            "surveys": {"$sum": 1},
+            "completeness": {"$avg": "$metrics.completeness"},
+            "maturity": {"$avg": "$metrics.maturity"},
+            **{pillar: {"$avg": f"$metrics.pillars.{pillar}.m"} for pillar in PILLARS.values()},
+        }},
+        {"$sort": {"surveys": -1}},
+    ]
+
+
+def cohort_metrics(collection, group_by: str = "user_role") -> List[Dict[str, Any]]:
+    """Mean scores per cohort, aggregated server-side from the stored metrics"""
+    return list(collection.aggregate(cohort_pipeline(group_by)))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compute stored metrics for surveys that have none (or are outdated)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Documents per bulk write")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many documents (0 = all)")
+    parser.add_argument("--rescore", action="store_true", help="Recompute metrics for every survey")
+    parser.add_argument("--dry-run", action="store_true", help="Score without writing")
+    args = parser.parse_args(argv)
+
+    os.chdir(REPO_ROOT)
+    from pymongo import UpdateOne
+    from db_client import get_collection, close_clients
+
+    collection = get_collection()
+    query = {} if args.rescore else {"metrics.v": {"$ne": METRICS_VERSION}}
+    # Stored reports are the largest field and are not scored
+    cursor = collection.find(query, {"report": 0}).batch_size(args.batch_size)
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+
+    started = time.perf_counter()
+    scored = failed = 0
+    batch = []
+
+    def flush():
+        if batch and not args.dry_run:
+            collection.bulk_write(batch, ordered=False)
+        batch.clear()
+
+    for doc in cursor:
+        try:
+            metrics = score_survey(doc)
+        except Exception as e:
+            print(f"Skipping {doc['_id']}: {e}")
+            failed += 1
+            continue
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"metrics": metrics, "updated_at": datetime.utcnow()}}))
+        scored += 1
+        if len(batch) >= args.batch_size:
+            flush()
+            print(f"{scored} surveys scored...")
+    flush()
+
+    elapsed = time.perf_counter() - started
+    verb = "would be scored" if args.dry_run else "scored"
+    print(f"\n{scored} surveys {verb} (metrics v{METRICS_VERSION}), {failed} skipped, in {elapsed:.1f}s")
+    close_clients()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, APP_DIR)
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Survey Schema Module
+Compact, versioned survey answer encoding and the one decoder every reader uses
+Author: Optimum AI Lab
+
+Schema 2 stores fixed-question answers by question id against a catalog
+version, and keeps full text only for the generated Step 2 questions:
+
+    {"schema_version": 2, "catalog_version": "3f9c0a1b2c4d",
+     "step1": [["AS_Q1", "answer"], ...],
+     "step2": [["generated question", "answer"], ...],
+     "step3": [["AI_Q1", "answer"], ...], ...}
+
+A fixed entry carries a third element only when its text differs from the
+catalog (documents migrated from older shapes). decode_answers() reads schema
+2 and every legacy shape (step*_answers lists of dicts or strings,
+answers.fixed / answers.section2) into the same
+{step: [(key, question, answer), ...]} form.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from question_catalog import QuestionCatalog, get_catalog, get_current_catalog
+
+SCHEMA_VERSION = 2
+STEPS = ("step1", "step2", "step3")
+LEGACY_FIELDS = ("step1_answers", "step2_answers", "step3_answers")
+
+Decoded = Dict[str, List[Tuple[Any, str, str]]]
+
+
+def encode_answers(catalog: QuestionCatalog, step1: Dict[str, str],
+                   step2: Iterable[Tuple[str, str]], step3: Dict[str, str]) -> Dict[str, Any]:
+    """Schema 2 answer fields for a new submission"""
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "catalog_version": catalog.version,
+        "step1": [[q_id, answer] for q_id, answer in step1.items()],
+        "step2": [[question, answer] for question, answer in step2],
+        "step3": [[q_id, answer] for q_id, answer in step3.items()],
+    }
+
+
+def _decode_fixed(entries: List[list], texts: Dict[str, str]) -> List[Tuple[Any, str, str]]:
+    decoded = []
+    for i, entry in enumerate(entries, 1):
+        q_id = entry[0]
+        question = entry[2] if len(entry) > 2 else texts.get(q_id, q_id)
+        decoded.append((q_id or i, question, entry[1]))
+    return decoded
+
+
+def _decode_legacy(doc: Dict[str, Any], catalog: QuestionCatalog) -> Decoded:
+    legacy = doc.get("answers") if isinstance(doc.get("answers"), dict) else {}
+    sources = {
+        "step1": doc.get("step1_answers") or legacy.get("fixed") or [],
+        "step2": doc.get("step2_answers") or legacy.get("section2") or [],
+        "step3": doc.get("step3_answers") or [],
+    }
+    decoded: Decoded = {}
+    for step, answers in sources.items():
+        texts = catalog.texts(step) if step != "step2" else {}
+        rows = []
+        for i, qa in enumerate(answers, 1):
+            if isinstance(qa, dict):
+                question = qa.get("question_text") or qa.get("question", "N/A")
+                answer = qa.get("answer", "N/A")
+                # Generated Step 2 questions are keyed by position
+                q_id = qa.get("question_id") if step != "step2" else None
+                if q_id and question == q_id:
+                    # Saved while the question text could not be loaded
+                    question = texts.get(q_id, question)
+                rows.append((q_id or i, question, answer))
+            else:
+                rows.append((i, str(qa), "N/A"))
+        decoded[step] = rows
+    return decoded
+
+
+def decode_answers(doc: Dict[str, Any], catalog: Optional[QuestionCatalog] = None) -> Decoded:
+    """Every answer in a survey document as {step: [(key, question, answer), ...]}.
+
+    `key` is the question id for fixed questions and the 1-based position for
+    Step 2 (or for legacy entries without an id).
+    """
+    if doc.get("schema_version") == SCHEMA_VERSION:
+        catalog = catalog or get_catalog(doc.get("catalog_version"))
+        return {
+            "step1": _decode_fixed(doc.get("step1", []), catalog.step1),
+            "step2": [(i, entry[0], entry[1]) for i, entry in enumerate(doc.get("step2", []), 1)],
+            "step3": _decode_fixed(doc.get("step3", []), catalog.step3),
+        }
+    return _decode_legacy(doc, catalog or get_current_catalog())
+
+
+def compact_legacy(doc: Dict[str, Any], catalog: QuestionCatalog) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """($set, $unset) that rewrite a legacy document as schema 2 without losing any text"""
+    decoded = _decode_legacy(doc, catalog)
+    set_fields: Dict[str, Any] = {"schema_version": SCHEMA_VERSION, "catalog_version": catalog.version}
+    for step in STEPS:
+        if step == "step2":
+            set_fields[step] = [[question, answer] for _, question, answer in decoded[step]]
+            continue
+        texts = catalog.texts(step)
+        entries = []
+        for key, question, answer in decoded[step]:
+            q_id = key if isinstance(key, str) else None
+            entry = [q_id, answer]
+            if q_id is None or texts.get(q_id) != question:
+                entry.append(question)
+            entries.append(entry)
+        set_fields[step] = entries
+
+    unset = {field: "" for field in LEGACY_FIELDS if field in doc}
+    if isinstance(doc.get("answers"), dict):
+        remaining = {k: v for k, v in doc["answers"].items() if k not in ("fixed", "section2")}
+        if remaining:
+            set_fields["answers"] = remaining
+        else:
+            unset["answers"] = ""
+    return set_fields, unset
@@ -0,0 +1,63 @@
+"""
+Change stream handling of the admin dashboard snapshot.
+"""
+
+from datetime import datetime
+
+from bson import ObjectId
+
+from dashboard_cache import SUMMARY_PROJECTION, DashboardSnapshot
+
+
+class FakeStream(list):
+    """A finished change stream: iterates its events, then closes"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeCollection:
+    def __init__(self, events):
+        self.events = events
+        self.pipeline = None
+
+    def watch(self, pipeline, full_document=None):
+        self.pipeline = pipeline
+        return FakeStream(self.events)
+
+
+def projected(operation, doc_id, **fields):
+    """An event as the $project stage delivers it: no _id inside fullDocument"""
+    event = {"operationType": operation, "documentKey": {"_id": doc_id}}
+    if fields:
+        event["fullDocument"] = fields
+    return event
+
+
+def test_projection_keeps_the_document_id():
+    snapshot = DashboardSnapshot(FakeCollection([]))
+    snapshot._start_change_stream()
+    project = snapshot.collection.pipeline[0]["$project"]
+    assert project["fullDocument._id"] == 1
+    assert all(project[f"fullDocument.{field}"] == 1 for field in SUMMARY_PROJECTION)
+
+
+def test_consume_applies_projected_events():
+    first, second = ObjectId(), ObjectId()
+    created = datetime(2026, 1, 5)
+    events = [
+        projected("insert", first, status="submitted", user_role="Architect", created_at=created),
+        projected("insert", second, status="submitted", user_role="Developer"),
+        projected("update", first, status="reviewed", user_role="Architect", created_at=created),
+        projected("delete", second),
+    ]
+    snapshot = DashboardSnapshot(FakeCollection(events))
+    snapshot._consume(FakeStream(events))
+
+    rows = snapshot.rows()
+    assert [row["_id"] for row in rows] == [first]
+    assert rows[0]["status"] == "reviewed"
+    assert snapshot.watermark == second
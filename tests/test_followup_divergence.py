@@ -0,0 +1,65 @@
+"""
+Calibration of the batched Step 2 replan signal ([DYNAMIC_FOLLOWUPS] divergence_*).
+
+On-topic answers to a planned follow-up add new specifics but share some terms
+with the plan; an answer that changes the subject shares none. Short answers
+never replan.
+"""
+
+import configparser
+
+import pytest
+
+from app_config import FollowupSettings
+from dynamic_questions_enhanced import answer_diverges
+
+SETTINGS = FollowupSettings(configparser.ConfigParser())
+
+ANCHOR = (
+    "Our main objective is to modernise the ETL estate: 3000 Informatica jobs feeding the regulatory "
+    "reporting warehouse on Oracle Exadata. High priority is reducing batch overruns and MAS 610 reporting "
+    "delays; medium is data lineage; low is moving to cloud."
+)
+QUESTION = "Which Informatica workflows most often overrun the batch window, and what is the usual cause?"
+PLAN = [
+    "How do you trace lineage today from source systems to MAS 610 returns?",
+    "What SLAs apply to the overnight batch, and how are breaches escalated?",
+    "Which parts of the Oracle Exadata warehouse are the biggest bottlenecks?",
+    "What cloud platforms are approved for regulatory data, if any?",
+]
+CONTEXT = [ANCHOR, QUESTION, *PLAN]
+
+ON_TOPIC = [
+    "Mostly the GL reconciliation workflows; they overrun when upstream core banking extracts arrive late.",
+    "About 40 workflows, mostly the liquidity and capital ones. The cause is usually late source files and "
+    "long-running lookups against Exadata.",
+    "Lineage is tracked manually in Excel spreadsheets maintained by the reporting team, with some Collibra pilots.",
+    "The overnight batch has a 6am SLA; breaches go to the production support lead and then the CIO.",
+    "Azure is approved for non-customer data only. We have no approval yet for regulatory data in the cloud.",
+    "Yes, we use Control-M for scheduling and Splunk for monitoring job failures and overruns across the estate.",
+    "Ten.",
+    "On premise.",
+]
+
+OFF_TOPIC = [
+    "Honestly the bigger issue is our HR onboarding process, new joiners wait six weeks for laptops and "
+    "access badges, and recruitment of graduates keeps slipping.",
+    "We are also launching a mobile payments app for retail customers next quarter with a new loyalty "
+    "programme and marketing campaign.",
+    "Our procurement team negotiates vendor contracts annually and legal review of contracts takes months, "
+    "office relocation is also distracting everyone.",
+]
+
+
+def diverges(answer):
+    return answer_diverges(answer, CONTEXT, SETTINGS.divergence_threshold, SETTINGS.divergence_min_terms)
+
+
+@pytest.mark.parametrize("answer", ON_TOPIC)
+def test_on_topic_answers_keep_the_plan(answer):
+    assert not diverges(answer)
+
+
+@pytest.mark.parametrize("answer", OFF_TOPIC)
+def test_off_topic_answers_replan(answer):
+    assert diverges(answer)
@@ -0,0 +1,39 @@
+"""
+The process-wide question manager must recover once a client can be built.
+"""
+
+import dynamic_questions_enhanced
+from dynamic_questions_enhanced import DynamicQuestionManagerEnhanced
+
+
+def test_manager_retries_client_setup(monkeypatch):
+    key = {"value": ""}
+    client = object()
+    monkeypatch.setattr(dynamic_questions_enhanced, "get_api_key", lambda: key["value"])
+    monkeypatch.setattr(dynamic_questions_enhanced, "get_openai_client", lambda timeout: client)
+
+    manager = DynamicQuestionManagerEnhanced()
+    assert manager.client is None
+    assert not manager.ensure_client()
+
+    key["value"] = "sk-test"
+    assert manager.ensure_client()
+    assert manager.client is client
+
+
+def test_manager_retries_after_client_errors(monkeypatch):
+    attempts = []
+
+    def flaky_client(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            raise RuntimeError("transport unavailable")
+        return "client"
+
+    monkeypatch.setattr(dynamic_questions_enhanced, "get_api_key", lambda: "sk-test")
+    monkeypatch.setattr(dynamic_questions_enhanced, "get_openai_client", flaky_client)
+
+    manager = DynamicQuestionManagerEnhanced()
+    assert manager.client is None
+    assert manager.ensure_client() and manager.client == "client"
+    assert manager.ensure_client() and len(attempts) == 2
@@ -0,0 +1,68 @@
+"""
+Targeted amendments: the model returns find/replace edits and only sections
+whose edits apply to the stored text are patched.
+"""
+
+import json
+from types import SimpleNamespace
+
+import report_generator
+from report_generator import _replace_passage, amend_sections
+
+SECTIONS = {
+    "executive_summary": "The bank runs **40 applications** on Oracle.\nGPU capacity: none yet.",
+    "gap_analysis": "| Area | Gap |\n|---|---|\n| GPUs | No GPU capacity |",
+}
+CHANGED = [("Step3 AI_Q1", "What GPU infrastructure do you have?", "Eight A100s")]
+
+
+def reply(payload, finish_reason="stop"):
+    message = SimpleNamespace(content=json.dumps(payload))
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+
+def amend_with(monkeypatch, payload, finish_reason="stop"):
+    calls = []
+
+    def fake_completion(client, site, **params):
+        calls.append(site)
+        return reply(payload, finish_reason)
+
+    monkeypatch.setattr(report_generator, "chat_completion", fake_completion)
+    patched = amend_sections(dict(SECTIONS), CHANGED, [], {"org": {"name": "Bank"}}, client=None)
+    assert calls == ["report_amend"]
+    return patched
+
+
+def test_replace_passage_tolerates_whitespace_differences():
+    assert _replace_passage("a  b\nc d", "b c", "x") == "a  x d"
+    assert _replace_passage("a b", "a b", "c") == "c"
+    assert _replace_passage("a b", "z", "c") is None
+    assert _replace_passage("a b", "  ", "c") is None
+
+
+def test_edits_patch_only_the_passages_returned(monkeypatch):
+    patched = amend_with(monkeypatch, {"edits": [
+        {"section": "executive_summary", "find": "GPU capacity: none yet.", "replace": "GPU capacity: eight A100s."},
+        {"section": "gap_analysis", "find": "| GPUs | No GPU capacity |", "replace": "| GPUs | Limited GPU capacity |"},
+    ]})
+    assert patched == {
+        "executive_summary": "The bank runs **40 applications** on Oracle.\nGPU capacity: eight A100s.",
+        "gap_analysis": "| Area | Gap |\n|---|---|\n| GPUs | Limited GPU capacity |",
+    }
+
+
+def test_sections_without_edits_are_kept(monkeypatch):
+    assert amend_with(monkeypatch, {"edits": []}) == SECTIONS
+
+
+def test_sections_whose_edits_do_not_apply_are_left_for_regeneration(monkeypatch):
+    patched = amend_with(monkeypatch, {"edits": [
+        {"section": "executive_summary", "find": "text that is not there", "replace": "x"},
+        {"section": "unknown_section", "find": "GPU", "replace": "x"},
+    ]})
+    assert patched == {"gap_analysis": SECTIONS["gap_analysis"]}
+
+
+def test_truncated_edits_are_discarded(monkeypatch):
+    assert amend_with(monkeypatch, {"edits": []}, finish_reason="length") == {}
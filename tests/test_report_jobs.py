@@ -0,0 +1,66 @@
+"""
+A worker stores its report only while it still holds the job's lease, and
+never over a report another writer stored meanwhile.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import db_client
+import report_generator
+import report_jobs
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient().survey
+    monkeypatch.setattr(report_jobs, "get_jobs_collection", lambda: db.report_jobs)
+    monkeypatch.setattr(db_client, "get_collection", lambda: db.surveys)
+    db.surveys.insert_one({"_id": "s1"})
+    db.report_jobs.insert_one({"_id": "j1", "survey_id": "s1", "status": "running", "worker": "w1",
+                               "attempts": 1, "active": True,
+                               "lease_expires_at": datetime.utcnow() + timedelta(minutes=5)})
+    return db
+
+
+def generate_with(monkeypatch, side_effect=None):
+    def fake_regenerate(survey):
+        if side_effect:
+            side_effect()
+        record = {"sections": {}, "actions": {"executive_summary": "regenerate"}, "generated_at": datetime.utcnow()}
+        return record["sections"], record
+
+    monkeypatch.setattr(report_generator, "regenerate_report", fake_regenerate)
+
+
+def test_worker_stores_the_report(monkeypatch, db):
+    generate_with(monkeypatch)
+    report_jobs.process_job(db.report_jobs.find_one({"_id": "j1"}), "w1")
+
+    assert "report" in db.surveys.find_one({"_id": "s1"})
+    job = db.report_jobs.find_one({"_id": "j1"})
+    assert job["status"] == "done" and job["result"]["stored"]
+
+
+def test_worker_that_lost_its_lease_discards_the_report(monkeypatch, db):
+    # Another worker reclaimed the job while this one was generating
+    generate_with(monkeypatch, lambda: db.report_jobs.update_one(
+        {"_id": "j1"}, {"$set": {"worker": "w2"}, "$inc": {"attempts": 1}}))
+    report_jobs.process_job(db.report_jobs.find_one({"_id": "j1"}), "w1")
+
+    assert "report" not in db.surveys.find_one({"_id": "s1"})
+    job = db.report_jobs.find_one({"_id": "j1"})
+    assert job["status"] == "running" and job["worker"] == "w2"
+
+
+def test_worker_keeps_a_newer_stored_report(monkeypatch, db):
+    newer = {"sections": {"executive_summary": "newer"}, "generated_at": datetime.utcnow()}
+    generate_with(monkeypatch, lambda: db.surveys.update_one({"_id": "s1"}, {"$set": {"report": newer}}))
+    report_jobs.process_job(db.report_jobs.find_one({"_id": "j1"}), "w1")
+
+    assert db.surveys.find_one({"_id": "s1"})["report"]["sections"] == newer["sections"]
+    job = db.report_jobs.find_one({"_id": "j1"})
+    assert job["status"] == "done" and not job["result"]["stored"]
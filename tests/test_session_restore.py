@@ -0,0 +1,89 @@
+"""
+Stored survey progress is restored only for its owner, after login, and the
+sid from the URL is replaced on every login.
+"""
+
+import pytest
+
+import session_model
+import session_store
+from session_model import SESSION_ID_PARAM, get_survey_state, persist_session, restore_session
+from session_store import MemorySessionStore
+
+
+class FakeStreamlit:
+    """The slice of streamlit the session helpers use; one instance per browser session"""
+
+    def __init__(self, query_params=None):
+        self.session_state = {}
+        self.query_params = dict(query_params or {})
+
+    def experimental_get_query_params(self):
+        return {key: [value] for key, value in self.query_params.items()}
+
+    def experimental_set_query_params(self, **params):
+        self.query_params = params
+
+    def login(self, user):
+        self.session_state.update(authenticated=True, current_user=user)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemorySessionStore(ttl_seconds=3600)
+    monkeypatch.setattr(session_store, "get_session_store", lambda: store)
+    return store
+
+
+def use(monkeypatch, fake):
+    monkeypatch.setattr(session_model, "st", fake)
+    return fake
+
+
+def start_survey(monkeypatch, user):
+    """A session that answered part of the survey; returns the sid it left in the URL"""
+    st = use(monkeypatch, FakeStreamlit())
+    st.login(user)
+    restore_session()
+    get_survey_state().survey_started = True
+    persist_session()
+    return st.query_params[SESSION_ID_PARAM]
+
+
+def test_owner_resumes_under_a_new_sid(monkeypatch, store):
+    sid = start_survey(monkeypatch, "user")
+
+    st = use(monkeypatch, FakeStreamlit({SESSION_ID_PARAM: sid}))
+    restore_session()
+    assert "survey" not in st.session_state
+
+    st.login("user")
+    restore_session()
+    assert get_survey_state().survey_started
+    assert store.get(sid) is None
+
+    persist_session()
+    assert st.query_params[SESSION_ID_PARAM] != sid
+
+
+def test_other_users_cannot_restore_a_sid(monkeypatch, store):
+    sid = start_survey(monkeypatch, "user")
+
+    st = use(monkeypatch, FakeStreamlit({SESSION_ID_PARAM: sid}))
+    st.login("admin")
+    restore_session()
+    assert not get_survey_state().survey_started
+    assert store.get(sid) is not None
+    assert SESSION_ID_PARAM not in st.query_params
+
+
+def test_nothing_is_written_before_restore(monkeypatch, store):
+    sid = start_survey(monkeypatch, "user")
+
+    # The login rerun ends before restore_session() runs
+    st = use(monkeypatch, FakeStreamlit({SESSION_ID_PARAM: sid}))
+    st.login("user")
+    persist_session()
+    assert st.query_params == {SESSION_ID_PARAM: sid}
+    restore_session()
+    assert get_survey_state().survey_started
@@ -0,0 +1,40 @@
+"""
+Oversized surveys are condensed in at most max_chunks chunks, even though
+chunks are first cut at step boundaries.
+"""
+
+from report_generator import build_survey_chunks, estimate_tokens
+
+ANSWER = "x" * 5000
+
+
+def survey(step1, step2, step3):
+    return {
+        "step1": [[f"AS_Q{i}", ANSWER, f"Question {i}"] for i in range(step1)],
+        "step2": [[f"Follow-up {i}", ANSWER] for i in range(step2)],
+        "step3": [[f"AI_Q{i}", ANSWER, f"AI question {i}"] for i in range(step3)],
+        "schema_version": 2,
+    }
+
+
+def test_chunks_respect_max_chunks_across_steps():
+    data = survey(30, 15, 15)
+    assert len(build_survey_chunks(data, 4000)) > 3
+
+    chunks = build_survey_chunks(data, 4000, max_chunks=3)
+    assert len(chunks) == 3
+    total = sum(estimate_tokens(text) for _, text in build_survey_chunks(data, 4000))
+    assert sum(estimate_tokens(text) for _, text in chunks) >= total
+
+
+def test_merged_chunks_keep_their_step_headings():
+    chunks = build_survey_chunks(survey(1, 1, 1), 4000, max_chunks=1)
+    assert len(chunks) == 1
+    heading, text = chunks[0]
+    assert heading.count(";") == 2
+    for part in heading.split("; "):
+        assert f"[{part}]" in text
+
+
+def test_small_surveys_are_left_alone():
+    assert len(build_survey_chunks(survey(1, 1, 1), 4000, max_chunks=12)) == 3
@@ -0,0 +1,137 @@
+"""
+Round trips of the survey answer encoding that migrate_surveys.py relies on.
+
+Every legacy shape must decode identically before and after compact_legacy()
+rewrites it, since the migration $unsets the legacy fields in place.
+"""
+
+import pytest
+
+from question_catalog import QuestionCatalog
+from survey_schema import LEGACY_FIELDS, SCHEMA_VERSION, compact_legacy, decode_answers, encode_answers
+
+CATALOG = QuestionCatalog(
+    {"AS_Q1": "How many applications do you run?", "AS_Q2": "Which databases do you use?"},
+    {"AI_Q1": "What GPU infrastructure do you have?", "AI_Q2": "Do you use commercial LLMs?"},
+)
+
+
+def migrate(doc, catalog=CATALOG):
+    """The document migrate_surveys.py would leave behind"""
+    set_fields, unset = compact_legacy(doc, catalog)
+    compact = {key: value for key, value in doc.items() if key not in unset}
+    compact.update(set_fields)
+    return compact
+
+
+LEGACY_DOCS = {
+    "step_answers_dicts": {
+        "user_role": "Architect",
+        "step1_answers": [
+            {"question_id": "AS_Q1", "question_text": "How many applications do you run?", "answer": "About 40"},
+            {"question_id": "AS_Q2", "question_text": "Which databases do you use?", "answer": "Oracle"},
+        ],
+        "step2_answers": [
+            {"question": "Which of those are customer facing?", "answer": "Ten"},
+            {"question": "How are they deployed?", "answer": "On premise"},
+        ],
+        "step3_answers": [
+            {"question_id": "AI_Q1", "question_text": "What GPU infrastructure do you have?", "answer": "None yet"},
+        ],
+    },
+    "step_answers_strings": {
+        "step1_answers": ["About 40 applications", "Oracle and Postgres"],
+        "step2_answers": ["Ten are customer facing"],
+        "step3_answers": ["No GPUs"],
+    },
+    "answers_fixed_and_section2": {
+        "answers": {
+            "fixed": [{"question_id": "AS_Q1", "question_text": "How many applications do you run?", "answer": "40"}],
+            "section2": [{"question": "Which are customer facing?", "answer": "Ten"}],
+        },
+    },
+    "answers_with_other_keys": {
+        "answers": {
+            "fixed": [{"question_id": "AS_Q2", "question": "Which databases do you use?", "answer": "Oracle"}],
+            "section2": [{"question": "Any NoSQL?", "answer": "MongoDB"}],
+            "notes": "entered by the admin",
+        },
+    },
+    "question_text_equal_to_id": {
+        "step1_answers": [{"question_id": "AS_Q1", "question_text": "AS_Q1", "answer": "About 40"}],
+        "step3_answers": [{"question_id": "AI_Q2", "question_text": "AI_Q2", "answer": "Azure OpenAI"}],
+    },
+    "text_differs_from_catalog": {
+        "step1_answers": [
+            {"question_id": "AS_Q1", "question_text": "How many apps does your team own?", "answer": "12"},
+            {"question_id": "AS_Q9", "question_text": "A question since removed", "answer": "Yes"},
+        ],
+        "step3_answers": [{"question_id": "AI_Q1", "question_text": "Which GPUs do you have?", "answer": "A100s"}],
+    },
+    "missing_ids_and_answers": {
+        "step1_answers": [{"question_text": "Untracked question"}, {"question": "Older key name", "answer": "x"}],
+        "step2_answers": [{"question_text": "Step 2 without answer"}],
+    },
+}
+
+
+@pytest.mark.parametrize("name", sorted(LEGACY_DOCS))
+def test_compact_legacy_round_trips(name):
+    legacy = LEGACY_DOCS[name]
+    compact = migrate(legacy)
+
+    assert compact["schema_version"] == SCHEMA_VERSION
+    assert compact["catalog_version"] == CATALOG.version
+    assert not any(field in compact for field in LEGACY_FIELDS)
+    assert decode_answers(compact, CATALOG) == decode_answers(legacy, CATALOG)
+
+
+def test_compact_legacy_keeps_other_answer_keys():
+    compact = migrate(LEGACY_DOCS["answers_with_other_keys"])
+    assert compact["answers"] == {"notes": "entered by the admin"}
+
+    set_fields, unset = compact_legacy(LEGACY_DOCS["answers_fixed_and_section2"], CATALOG)
+    assert "answers" in unset and "answers" not in set_fields
+
+
+def test_compact_legacy_stores_text_only_when_it_differs_from_the_catalog():
+    compact = migrate(LEGACY_DOCS["step_answers_dicts"])
+    assert compact["step1"] == [["AS_Q1", "About 40"], ["AS_Q2", "Oracle"]]
+
+    compact = migrate(LEGACY_DOCS["question_text_equal_to_id"])
+    assert compact["step1"] == [["AS_Q1", "About 40"]]
+    assert decode_answers(compact, CATALOG)["step1"] == [("AS_Q1", "How many applications do you run?", "About 40")]
+
+    compact = migrate(LEGACY_DOCS["text_differs_from_catalog"])
+    assert compact["step1"] == [
+        ["AS_Q1", "12", "How many apps does your team own?"],
+        ["AS_Q9", "Yes", "A question since removed"],
+    ]
+
+
+def test_compact_legacy_keeps_text_when_the_catalog_changes_later():
+    compact = migrate(LEGACY_DOCS["text_differs_from_catalog"])
+    edited = QuestionCatalog({"AS_Q1": "Rewritten question"}, {"AI_Q1": "Rewritten AI question"})
+    assert decode_answers(compact, edited) == decode_answers(LEGACY_DOCS["text_differs_from_catalog"], CATALOG)
+
+
+def test_encode_answers_round_trips():
+    step1 = {"AS_Q1": "About 40", "AS_Q2": "Oracle"}
+    step2 = [("Which are customer facing?", "Ten"), ("How are they deployed?", "On premise")]
+    step3 = {"AI_Q1": "None yet"}
+    doc = encode_answers(CATALOG, step1, step2, step3)
+
+    assert decode_answers(doc, CATALOG) == {
+        "step1": [("AS_Q1", "How many applications do you run?", "About 40"),
+                  ("AS_Q2", "Which databases do you use?", "Oracle")],
+        "step2": [(1, "Which are customer facing?", "Ten"), (2, "How are they deployed?", "On premise")],
+        "step3": [("AI_Q1", "What GPU infrastructure do you have?", "None yet")],
+    }
+
+
+def test_encode_answers_matches_an_equivalent_legacy_document():
+    legacy = LEGACY_DOCS["step_answers_dicts"]
+    step1 = {qa["question_id"]: qa["answer"] for qa in legacy["step1_answers"]}
+    step2 = [(qa["question"], qa["answer"]) for qa in legacy["step2_answers"]]
+    step3 = {qa["question_id"]: qa["answer"] for qa in legacy["step3_answers"]}
+    assert decode_answers(encode_answers(CATALOG, step1, step2, step3), CATALOG) == decode_answers(legacy, CATALOG)